@@ -501,6 +501,8 @@ class ProjectGroupIndexEndpoint(ProjectEndpoint):
                             group_tombstone_id=tombstone.id,
                         )
 
+            GroupHash.bump_cache_version(project.id)
+
             self._delete_groups(request, project, groups_to_delete)
 
             return Response(status=204)
@@ -919,6 +921,7 @@ class ProjectGroupIndexEndpoint(ProjectEndpoint):
             GroupStatus.DELETION_IN_PROGRESS,
         ]).update(status=GroupStatus.PENDING_DELETION)
         GroupHash.objects.filter(group__id__in=group_ids).delete()
+        GroupHash.bump_cache_version(project.id)
 
         transaction_id = uuid4().hex
 
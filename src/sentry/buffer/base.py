@@ -12,6 +12,7 @@ import six
 
 from django.db.models import F
 
+from sentry.db.models.query import bulk_increment
 from sentry.signals import buffer_incr_complete
 from sentry.tasks.process_buffer import process_incr
 from sentry.utils.services import Service
@@ -53,7 +54,7 @@ class Buffer(Service):
             }
         )
 
-    def process_pending(self):
+    def process_pending(self, partition=None):
         return []
 
     def process(self, model, columns, filters, extra=None):
@@ -71,3 +72,38 @@ class Buffer(Service):
             created=created,
             sender=model,
         )
+
+    def process_batch(self, model, items):
+        """
+        Applies a batch of buffered increments for ``model``, where ``items``
+        is a list of ``(columns, filters, extra)`` tuples.
+
+        Increments for existing rows are applied with as few statements as the
+        database allows, anything else goes through ``process``. If the bulk
+        statements fail, none of the increments have been applied and the
+        error is raised. Failures of individual increments after that are
+        logged, so that they don't affect the rest of the batch.
+        """
+        remaining = bulk_increment(model, items)
+        if len(remaining) != len(items):
+            remaining_ids = set(id(item) for item in remaining)
+            for item in items:
+                if id(item) in remaining_ids:
+                    continue
+                columns, filters, extra = item
+                buffer_incr_complete.send_robust(
+                    model=model,
+                    columns=columns,
+                    filters=filters,
+                    extra=extra,
+                    created=False,
+                    sender=model,
+                )
+
+        # subclasses (e.g. RedisBuffer) override ``process`` with their own
+        # signature, so always use the direct implementation here
+        for columns, filters, extra in remaining:
+            try:
+                Buffer.process(self, model, columns, filters, extra)
+            except Exception:
+                self.logger.exception('buffer.process.failed', extra={'model': model.__name__})
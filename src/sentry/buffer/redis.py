@@ -7,16 +7,21 @@ sentry.buffer.redis
 """
 from __future__ import absolute_import
 
+import atexit
+import math
 import six
+import threading
 
+from celery.signals import task_postrun
 from time import time
+from zlib import crc32
 
 from django.db import models
 from django.utils.encoding import force_bytes
 
 from sentry.buffer import Buffer
 from sentry.exceptions import InvalidConfiguration
-from sentry.tasks.process_buffer import process_incr
+from sentry.tasks.process_buffer import process_incr, process_pending
 from sentry.utils import metrics
 from sentry.utils.compat import pickle
 from sentry.utils.hashlib import md5_text
@@ -52,13 +57,56 @@ class PendingBuffer(object):
 
 
 class RedisBuffer(Buffer):
+    """
+    Stores pending increments in Redis hashes until ``process_pending`` picks
+    them up.
+
+    Increments can optionally be pre-aggregated within the worker before they
+    are sent to Redis by setting ``local_buffer_size``. Increments for the same
+    model and filters are then merged in memory (counters are summed, extra
+    values are last-write-wins) and written out once ``local_buffer_size``
+    distinct keys have been collected, ``local_buffer_interval`` seconds have
+    passed since the first pending increment (checked on every increment, and
+    by a timer for workers that go idle), or the current task finishes.
+
+    The set of pending keys can be split into ``pending_partitions`` sets which
+    are each locked and drained by their own ``process_pending`` task. The
+    unpartitioned set is still drained as well, so partitioning can be
+    enabled without losing pending keys. (Going back to a single partition
+    requires draining the partitioned sets first.)
+
+    With ``bulk_process`` enabled, a batch of keys is written to the database
+    with one statement per model where possible (see ``Buffer.process_batch``)
+    instead of one per key.
+    """
     key_expire = 60 * 60  # 1 hour
     pending_key = 'b:p'
+    # the smallest and largest number of keys processed by one ``process_incr``
+    # task, batches grow with the backlog to keep the number of tasks queued
+    # per ``process_pending`` run close to ``incr_batch_target``
     incr_batch_size = 2
+    max_incr_batch_size = 100
+    incr_batch_target = 1000
+    # number of pending keys read from each host at a time
+    pending_window_size = 1000
 
-    def __init__(self, **options):
+    def __init__(self, local_buffer_size=0, local_buffer_interval=1.0,
+                 pending_partitions=1, bulk_process=False, **options):
         self.cluster, options = get_cluster_from_options('SENTRY_BUFFER_OPTIONS', options)
 
+        assert pending_partitions > 0
+        self.pending_partitions = pending_partitions
+        self.bulk_process = bulk_process
+
+        self.local_buffer_size = local_buffer_size
+        self.local_buffer_interval = local_buffer_interval
+        self._local_buffer_lock = threading.Lock()
+        self._reset_local_buffer()
+
+        if self.local_buffer_size > 0:
+            task_postrun.connect(self._flush_local_buffer_on_task_exit, weak=False)
+            atexit.register(self.flush_local_buffer)
+
     def validate(self):
         try:
             with self.cluster.all() as client:
@@ -82,6 +130,23 @@ class RedisBuffer(Buffer):
             ).hexdigest(),
         )
 
+    def _make_pending_key(self, partition=None):
+        """
+        Returns the key of the pending set for the given partition.
+        """
+        if partition is None:
+            return self.pending_key
+        assert partition >= 0
+        return '%s:%d' % (self.pending_key, partition)
+
+    def _make_pending_key_from_key(self, key):
+        """
+        Returns the key of the pending set that ``key`` is tracked in.
+        """
+        if self.pending_partitions == 1:
+            return self.pending_key
+        return self._make_pending_key((crc32(key) & 0xffffffff) % self.pending_partitions)
+
     def _make_lock_key(self, key):
         return 'l:%s' % (key, )
 
@@ -97,59 +162,177 @@ class RedisBuffer(Buffer):
         # TODO(dcramer): longer term we'd rather not have to serialize values
         # here (unless it's to JSON)
         key = self._make_key(model, filters)
-        # We can't use conn.map() due to wanting to support multiple pending
-        # keys (one per Redis shard)
-        conn = self.cluster.get_local_client_for_key(key)
+        extra = {
+            column: pickle.dumps(value) for column, value in six.iteritems(extra or {})
+        }
 
-        pipe = conn.pipeline()
-        pipe.hsetnx(key, 'm', '%s.%s' % (model.__module__, model.__name__))
-        pipe.hsetnx(key, 'f', pickle.dumps(filters))
-        for column, amount in six.iteritems(columns):
-            pipe.hincrby(key, 'i+' + column, amount)
+        if self.local_buffer_size > 0:
+            self._incr_local(key, model, columns, filters, extra)
+        else:
+            self._incr_many([(key, model, columns, filters, extra)])
+
+    def _incr_many(self, items):
+        # We can't use conn.map() due to wanting to support multiple pending
+        # keys (one per Redis shard), so commands are pipelined per host
+        # instead.
+        router = self.cluster.get_router()
+        pipes = {}
+        for key, model, columns, filters, extra in items:
+            host_id = router.get_host_for_key(key)
+            pipe = pipes.get(host_id)
+            if pipe is None:
+                pipe = pipes[host_id] = self.cluster.get_local_client(host_id).pipeline()
+
+            pipe.hsetnx(key, 'm', '%s.%s' % (model.__module__, model.__name__))
+            pipe.hsetnx(key, 'f', pickle.dumps(filters))
+            for column, amount in six.iteritems(columns):
+                pipe.hincrby(key, 'i+' + column, amount)
 
-        if extra:
             for column, value in six.iteritems(extra):
-                pipe.hset(key, 'e+' + column, pickle.dumps(value))
-        pipe.expire(key, self.key_expire)
-        pipe.zadd(self.pending_key, time(), key)
-        pipe.execute()
+                pipe.hset(key, 'e+' + column, value)
+            pipe.expire(key, self.key_expire)
+            pipe.zadd(self._make_pending_key_from_key(key), time(), key)
+
+        for pipe in six.itervalues(pipes):
+            pipe.execute()
+
+    def _reset_local_buffer(self):
+        # key -> (model, columns, filters, extra)
+        self._local_buffer = {}
+        self._local_buffer_calls = 0
+        self._local_buffer_started = None
+        self._local_buffer_timer = None
+
+    def _incr_local(self, key, model, columns, filters, extra):
+        with self._local_buffer_lock:
+            pending = self._local_buffer.get(key)
+            if pending is None:
+                pending = self._local_buffer[key] = (model, {}, filters, {})
+
+            pending_columns, pending_extra = pending[1], pending[3]
+            for column, amount in six.iteritems(columns):
+                pending_columns[column] = pending_columns.get(column, 0) + amount
+            pending_extra.update(extra)
+
+            self._local_buffer_calls += 1
+            if self._local_buffer_started is None:
+                self._local_buffer_started = time()
+                # Flush even if nothing else is incremented in the meantime.
+                self._local_buffer_timer = threading.Timer(
+                    self.local_buffer_interval,
+                    self._flush_local_buffer_on_timer,
+                )
+                self._local_buffer_timer.daemon = True
+                self._local_buffer_timer.start()
+
+            should_flush = len(self._local_buffer) >= self.local_buffer_size or \
+                time() - self._local_buffer_started >= self.local_buffer_interval
+
+        if should_flush:
+            self.flush_local_buffer()
+
+    def _flush_local_buffer_on_task_exit(self, **kwargs):
+        self.flush_local_buffer()
+
+    def _flush_local_buffer_on_timer(self):
+        try:
+            self.flush_local_buffer()
+        except Exception:
+            self.logger.exception('buffer.local-flush.failed')
+
+    def flush_local_buffer(self):
+        """
+        Write all increments that have been pre-aggregated in this worker to
+        Redis.
+        """
+        with self._local_buffer_lock:
+            pending, calls = self._local_buffer, self._local_buffer_calls
+            timer = self._local_buffer_timer
+            self._reset_local_buffer()
+
+        if timer is not None:
+            timer.cancel()
+
+        if not pending:
+            return
+
+        metrics.timing('buffer.local-merge-ratio', float(calls) / len(pending))
+        self._incr_many(
+            [(key, model, columns, filters, extra)
+             for key, (model, columns, filters, extra) in six.iteritems(pending)]
+        )
+
+    def _get_incr_batch_size(self, pending_size):
+        batch_size = int(math.ceil(float(pending_size) / self.incr_batch_target))
+        return max(self.incr_batch_size, min(self.max_incr_batch_size, batch_size))
+
+    def process_pending(self, partition=None):
+        if partition is None and self.pending_partitions > 1:
+            # Fan out so that each partition is locked and drained by its own
+            # task.
+            for n in range(self.pending_partitions):
+                process_pending.apply_async(kwargs={'partition': n})
+            # Keys that were added before partitioning was enabled are still
+            # tracked in the unpartitioned set, so keep draining it here.
 
-    def process_pending(self):
         client = self.cluster.get_routing_client()
-        lock_key = self._make_lock_key(self.pending_key)
+        pending_key = self._make_pending_key(partition)
+        lock_key = self._make_lock_key(pending_key)
         # prevent a stampede due to celerybeat + periodic task
         if not client.set(lock_key, '1', nx=True, ex=60):
             return
 
-        pending_buffer = PendingBuffer(self.incr_batch_size)
+        tags = None if partition is None else {'partition': partition}
 
         try:
-            keycount = 0
+            now = time()
             with self.cluster.all() as conn:
-                results = conn.zrange(self.pending_key, 0, -1)
+                sizes = conn.zcard(pending_key)
+                oldest = conn.zrange(pending_key, 0, 0, withscores=True)
 
-            with self.cluster.all() as conn:
-                for host_id, keys in six.iteritems(results.value):
-                    if not keys:
-                        continue
-                    keycount += len(keys)
-                    for key in keys:
-                        pending_buffer.append(key)
-                        if pending_buffer.full():
-                            process_incr.apply_async(
-                                kwargs={
-                                    'batch_keys': pending_buffer.flush(),
-                                }
-                            )
-                    conn.target([host_id]).zrem(self.pending_key, *keys)
+            pending_size = sum(six.itervalues(sizes.value))
+            metrics.timing('buffer.pending-size', pending_size, tags=tags)
+
+            oldest_scores = [values[0][1] for values in six.itervalues(oldest.value) if values]
+            if oldest_scores:
+                metrics.timing('buffer.drain-lag', now - min(oldest_scores), tags=tags)
+
+            if not pending_size:
+                return
+
+            pending_buffer = PendingBuffer(self._get_incr_batch_size(pending_size))
+
+            # Only drain keys that were pending when we started, anything that
+            # is added (or updated) while we are running is picked up on the
+            # next run.
+            while True:
+                with self.cluster.all() as conn:
+                    results = conn.zrangebyscore(
+                        pending_key, '-inf', now, start=0, num=self.pending_window_size
+                    )
+
+                if not any(six.itervalues(results.value)):
+                    break
+
+                with self.cluster.all() as conn:
+                    for host_id, keys in six.iteritems(results.value):
+                        if not keys:
+                            continue
+                        for key in keys:
+                            pending_buffer.append(key)
+                            if pending_buffer.full():
+                                process_incr.apply_async(
+                                    kwargs={
+                                        'batch_keys': pending_buffer.flush(),
+                                    }
+                                )
+                        conn.target([host_id]).zrem(pending_key, *keys)
 
             # queue up remainder of pending keys
             if not pending_buffer.empty():
                 process_incr.apply_async(kwargs={
                     'batch_keys': pending_buffer.flush(),
                 })
-
-            metrics.timing('buffer.pending-size', keycount)
         finally:
             client.delete(lock_key)
 
@@ -160,42 +343,100 @@ class RedisBuffer(Buffer):
         if key is not None:
             batch_keys = [key]
 
+        if self.bulk_process and len(batch_keys) > 1:
+            self._process_batch_incr(batch_keys)
+            return
+
         for key in batch_keys:
             self._process_single_incr(key)
 
-    def _process_single_incr(self, key):
-        client = self.cluster.get_routing_client()
+    def _acquire_incr_lock(self, client, key):
         lock_key = self._make_lock_key(key)
         # prevent a stampede due to the way we use celery etas + duplicate
         # tasks
         if not client.set(lock_key, '1', nx=True, ex=10):
             metrics.incr('buffer.revoked', tags={'reason': 'locked'})
             self.logger.debug('buffer.revoked.locked', extra={'redis_key': key})
+            return None
+        return lock_key
+
+    def _read_incr(self, key):
+        """
+        Removes ``key`` from the buffer and returns its pending
+        ``(model, columns, filters, extra)``, or ``None`` if it is empty.
+        """
+        conn = self.cluster.get_local_client_for_key(key)
+        pipe = conn.pipeline()
+        pipe.hgetall(key)
+        pipe.zrem(self._make_pending_key_from_key(key), key)
+        pipe.delete(key)
+        values = pipe.execute()[0]
+
+        if not values:
+            metrics.incr('buffer.revoked', tags={'reason': 'empty'})
+            self.logger.debug('buffer.revoked.empty', extra={'redis_key': key})
+            return None
+
+        model = import_string(values['m'])
+        filters = pickle.loads(values['f'])
+        incr_values = {}
+        extra_values = {}
+        for k, v in six.iteritems(values):
+            if k.startswith('i+'):
+                incr_values[k[2:]] = int(v)
+            elif k.startswith('e+'):
+                extra_values[k[2:]] = pickle.loads(v)
+        return model, incr_values, filters, extra_values
+
+    def _process_single_incr(self, key):
+        client = self.cluster.get_routing_client()
+        lock_key = self._acquire_incr_lock(client, key)
+        if lock_key is None:
             return
 
         try:
-            conn = self.cluster.get_local_client_for_key(key)
-            pipe = conn.pipeline()
-            pipe.hgetall(key)
-            pipe.zrem(self.pending_key, key)
-            pipe.delete(key)
-            values = pipe.execute()[0]
-
-            if not values:
-                metrics.incr('buffer.revoked', tags={'reason': 'empty'})
-                self.logger.debug('buffer.revoked.empty', extra={'redis_key': key})
+            result = self._read_incr(key)
+            if result is None:
                 return
 
-            model = import_string(values['m'])
-            filters = pickle.loads(values['f'])
-            incr_values = {}
-            extra_values = {}
-            for k, v in six.iteritems(values):
-                if k.startswith('i+'):
-                    incr_values[k[2:]] = int(v)
-                elif k.startswith('e+'):
-                    extra_values[k[2:]] = pickle.loads(v)
-
-            super(RedisBuffer, self).process(model, incr_values, filters, extra_values)
+            super(RedisBuffer, self).process(*result)
         finally:
             client.delete(lock_key)
+
+    def _process_batch_incr(self, batch_keys):
+        client = self.cluster.get_routing_client()
+        lock_keys = []
+        try:
+            items_by_model = {}
+            for key in batch_keys:
+                lock_key = self._acquire_incr_lock(client, key)
+                if lock_key is None:
+                    continue
+                lock_keys.append(lock_key)
+
+                result = self._read_incr(key)
+                if result is None:
+                    continue
+
+                model, incr_values, filters, extra_values = result
+                items_by_model.setdefault(model, []).append((incr_values, filters, extra_values))
+
+            for model, items in six.iteritems(items_by_model):
+                try:
+                    with metrics.timer('buffer.process-batch', tags={'model': model.__name__}):
+                        self.process_batch(model, items)
+                except Exception:
+                    # The keys have already been read and deleted, so the
+                    # increments are applied one at a time instead.
+                    self.logger.exception(
+                        'buffer.process-batch.failed', extra={'model': model.__name__})
+                    metrics.incr('buffer.process-batch.fallback', tags={'model': model.__name__})
+                    for columns, filters, extra in items:
+                        try:
+                            Buffer.process(self, model, columns, filters, extra)
+                        except Exception:
+                            self.logger.exception(
+                                'buffer.process.failed', extra={'model': model.__name__})
+        finally:
+            for lock_key in lock_keys:
+                client.delete(lock_key)
@@ -12,15 +12,43 @@ from django.conf import settings
 
 from threading import local
 
+from sentry.utils import metrics
+from sentry.utils.imports import import_string
+
 
 class BaseCache(local):
     prefix = 'c'
+    # Backends that store values as bytes set this to a codec configuration
+    # ({'path': ..., 'options': ...}); others store values as they are given.
+    default_codec = None
 
-    def __init__(self, version=None, prefix=None):
+    def __init__(self, version=None, prefix=None, codec=None):
         self.version = version or settings.CACHE_VERSION
         if prefix is not None:
             self.prefix = prefix
 
+        # The ``codec`` option provides the strategy for encoding and decoding
+        # values. Every codec can read values written by the others, so it
+        # can be changed without flushing the cache.
+        codec = codec or self.default_codec
+        if codec is not None:
+            self.codec = import_string(codec['path'])(**codec.get('options', {}))
+            self.codec_name = type(self.codec).__name__
+        else:
+            self.codec = self.codec_name = None
+
+    def encode(self, value):
+        if self.codec is None:
+            return value
+        with metrics.timer('cache.encode', tags={'codec': self.codec_name}):
+            return self.codec.encode(value)
+
+    def decode(self, value):
+        if self.codec is None or value is None:
+            return value
+        with metrics.timer('cache.decode', tags={'codec': self.codec_name}):
+            return self.codec.decode(value)
+
     def make_key(self, key, version=None):
         return '{}:{}:{}'.format(
             self.prefix,
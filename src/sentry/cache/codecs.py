@@ -0,0 +1,55 @@
+"""
+sentry.cache.codecs
+~~~~~~~~~~~~~~~~~~~
+
+:copyright: (c) 2010-2017 by the Sentry Team, see AUTHORS for more details.
+:license: BSD, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import
+
+import zlib
+
+from sentry.utils import json
+
+# Every encoded value starts with a single byte naming its format, so values
+# written by any codec can be read by all of them. Values written before the
+# format byte was introduced are plain JSON documents, which can never start
+# with either of these bytes.
+JSON = b'\x00'
+ZLIB_JSON = b'\x01'
+
+
+class Codec(object):
+    def encode(self, value):
+        raise NotImplementedError
+
+    def decode(self, value):
+        raise NotImplementedError
+
+
+class JSONCodec(Codec):
+    def encode(self, value):
+        return JSON + json.dumps(value)
+
+    def decode(self, value):
+        marker = value[:1]
+        if marker == JSON:
+            return json.loads(value[1:])
+        if marker == ZLIB_JSON:
+            return json.loads(zlib.decompress(value[1:]))
+        return json.loads(value)
+
+
+class CompressedJSONCodec(JSONCodec):
+    """
+    Stores values as zlib compressed JSON. Event payloads are very repetitive
+    (stack frames, module paths, breadcrumbs) so even the fastest compression
+    level typically shrinks them several times over.
+    """
+
+    def __init__(self, level=1):
+        self.level = level
+
+    def encode(self, value):
+        return ZLIB_JSON + zlib.compress(json.dumps(value), self.level)
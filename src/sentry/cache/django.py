@@ -15,10 +15,10 @@ from .base import BaseCache
 
 class DjangoCache(BaseCache):
     def set(self, key, value, timeout, version=None):
-        cache.set(key, value, timeout, version=version or self.version)
+        cache.set(key, self.encode(value), timeout, version=version or self.version)
 
     def delete(self, key, version=None):
         cache.delete(key, version=version or self.version)
 
     def get(self, key, version=None):
-        return cache.get(key, version=version or self.version)
+        return self.decode(cache.get(key, version=version or self.version))
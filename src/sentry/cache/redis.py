@@ -8,7 +8,7 @@ sentry.cache.redis
 
 from __future__ import absolute_import
 
-from sentry.utils import json
+from sentry.utils import metrics
 from sentry.utils.redis import get_cluster_from_options
 
 from .base import BaseCache
@@ -21,6 +21,9 @@ class ValueTooLarge(Exception):
 class RedisCache(BaseCache):
     key_expire = 60 * 60  # 1 hour
     max_size = 50 * 1024 * 1024  # 50MB
+    default_codec = {
+        'path': 'sentry.cache.codecs.JSONCodec',
+    }
 
     def __init__(self, **options):
         self.cluster, options = get_cluster_from_options('SENTRY_CACHE_OPTIONS', options)
@@ -30,7 +33,8 @@ class RedisCache(BaseCache):
 
     def set(self, key, value, timeout, version=None):
         key = self.make_key(key, version=version)
-        v = json.dumps(value)
+        v = self.encode(value)
+        metrics.timing('cache.redis.size', len(v), tags={'codec': self.codec_name})
         if len(v) > self.max_size:
             raise ValueTooLarge('Cache key too large: %r %r' % (key, len(v)))
         if timeout:
@@ -44,7 +48,4 @@ class RedisCache(BaseCache):
 
     def get(self, key, version=None):
         key = self.make_key(key, version=version)
-        result = self.client.get(key)
-        if result is not None:
-            result = json.loads(result)
-        return result
+        return self.decode(self.client.get(key))
@@ -426,8 +426,10 @@ CELERY_IMPORTS = (
     'sentry.tasks.collect_project_platforms', 'sentry.tasks.commits', 'sentry.tasks.deletion',
     'sentry.tasks.digests', 'sentry.tasks.dsymcache', 'sentry.tasks.email', 'sentry.tasks.merge',
     'sentry.tasks.options', 'sentry.tasks.ping', 'sentry.tasks.post_process',
-    'sentry.tasks.process_buffer', 'sentry.tasks.reports', 'sentry.tasks.reprocessing',
-    'sentry.tasks.scheduler', 'sentry.tasks.store', 'sentry.tasks.unmerge',
+    'sentry.tasks.process_buffer', 'sentry.tasks.reencode', 'sentry.tasks.reports',
+    'sentry.tasks.reprocessing', 'sentry.tasks.scheduler', 'sentry.tasks.search',
+    'sentry.tasks.sourcemapcache', 'sentry.tasks.store', 'sentry.tasks.tsdb',
+    'sentry.tasks.unmerge',
 )
 CELERY_QUEUES = [
     Queue('alerts', routing_key='alerts'),
@@ -507,6 +509,14 @@ CELERYBEAT_SCHEDULE = {
             'expires': 60,
         },
     },
+    'flush-save-event-batches': {
+        'task': 'sentry.tasks.store.flush_save_event_batches',
+        'schedule': timedelta(seconds=10),
+        'options': {
+            'expires': 10,
+            'queue': 'events.save_event',
+        }
+    },
     'flush-buffers': {
         'task': 'sentry.tasks.process_buffer.process_pending',
         'schedule': timedelta(seconds=10),
@@ -515,6 +525,14 @@ CELERYBEAT_SCHEDULE = {
             'queue': 'counters-0',
         }
     },
+    'compact-tsdb': {
+        'task': 'sentry.tasks.tsdb.compact',
+        'schedule': timedelta(minutes=1),
+        'options': {
+            'expires': 60,
+            'queue': 'counters-0',
+        }
+    },
     'sync-options': {
         'task': 'sentry.tasks.options.sync_options',
         'schedule': timedelta(seconds=10),
@@ -552,6 +570,13 @@ CELERYBEAT_SCHEDULE = {
     #         'expires': 3600,
     #     },
     # },
+    # 'clear-old-cached-sourcemaps': {
+    #     'task': 'sentry.tasks.clear_old_cached_sourcemaps',
+    #     'schedule': timedelta(minutes=60),
+    #     'options': {
+    #         'expires': 3600,
+    #     },
+    # },
     'collect-project-platforms': {
         'task': 'sentry.tasks.collect_project_platforms',
         'schedule': timedelta(days=1),
@@ -779,6 +804,34 @@ SENTRY_MAX_SAMPLE_RATE = 10000
 SENTRY_SAMPLE_TIMES = ((3600, 1), (360, 10), (60, 60), )
 SENTRY_MAX_SAMPLE_TIME = 10000
 
+# The number of events ``sentry.tasks.store.save_event_batch`` saves at once.
+# A value of 1 disables batching and saves every event on its own.
+SENTRY_SAVE_EVENT_BATCH_SIZE = 1
+
+# Save events that need no processing directly from ``preprocess_event``
+# (indexing their tags in the same task) rather than queueing ``save_event``
+# and ``index_event_tags``. Events that fail are retried on the queued path.
+SENTRY_FUSED_EVENT_PIPELINE = False
+
+# The number of hash to group mappings each worker keeps in memory, and how
+# long (in seconds) they may be used for. A size of 0 disables the cache.
+SENTRY_GROUPHASH_CACHE_SIZE = 10000
+SENTRY_GROUPHASH_CACHE_TTL = 60
+
+# The number of instances of frequently read models (projects, keys, teams and
+# organizations) each worker keeps in memory, and how long (in seconds) a copy
+# is used before checking whether it was changed by another process.
+SENTRY_MODEL_LOCAL_CACHE_SIZE = 1000
+SENTRY_MODEL_LOCAL_CACHE_TTL = 5
+
+# The number of distinct stack frames whose grouping hash components each
+# worker keeps in memory. A size of 0 disables the cache.
+SENTRY_FRAME_HASH_CACHE_SIZE = 50000
+
+# The approximate number of bytes of parsed release sourcemaps each worker
+# keeps in memory. A size of 0 disables the cache.
+SENTRY_SOURCEMAP_VIEW_CACHE_SIZE = 1024 * 1024 * 256
+
 # Web Service
 SENTRY_WEB_HOST = 'localhost'
 SENTRY_WEB_PORT = 9000
@@ -869,6 +922,10 @@ SENTRY_BUFFER_OPTIONS = {}
 # XXX: We explicitly require the cache to be configured as its not optional
 # and causes serious confusion with the default django cache
 SENTRY_CACHE = None
+# Every cache backend accepts a ``codec`` option, e.g.
+# ``{'codec': {'path': 'sentry.cache.codecs.CompressedJSONCodec'}}`` to store
+# (much smaller) compressed event payloads between processing stages. The
+# Redis cache stores plain JSON by default.
 SENTRY_CACHE_OPTIONS = {}
 
 # The internal Django cache is still used in many places
@@ -899,10 +956,19 @@ SENTRY_RATELIMITER_OPTIONS = {}
 # The default value for project-level quotas
 SENTRY_DEFAULT_MAX_EVENTS_PER_MINUTE = '90%'
 
-# Node storage backend
+# Node storage backend. Any backend can be wrapped in
+# ``sentry.nodestore.cached.CachedNodeStorage`` to keep recently read nodes
+# in memory.
 SENTRY_NODESTORE = 'sentry.nodestore.django.DjangoNodeStorage'
 SENTRY_NODESTORE_OPTIONS = {}
 
+# The encoding of new values of dictionary fields (``GzippedDictField`` and
+# ``NodeField``), either 'pickle' or 'json'. Values are always read in either
+# encoding, but only values written with 'pickle' can be read by older
+# versions. With 'json', values that JSON can't represent exactly (such as
+# tuples or non-string keys) are still pickled.
+SENTRY_DICT_FIELD_ENCODING = 'pickle'
+
 # Tag storage backend
 SENTRY_TAGSTORE = 'sentry.tagstore.legacy.LegacyTagStorage'
 SENTRY_TAGSTORE_OPTIONS = {}
@@ -919,6 +985,11 @@ SENTRY_SEARCH_OPTIONS = {}
 SENTRY_TSDB = 'sentry.tsdb.dummy.DummyTSDB'
 SENTRY_TSDB_OPTIONS = {}
 
+# The number of seconds the store endpoint accumulates received, filtered and
+# rejected event counts in memory before writing them to the time-series
+# storage. A value of 0 writes them during each request.
+SENTRY_OUTCOMES_FLUSH_INTERVAL = 1
+
 SENTRY_NEWSLETTER = 'sentry.newsletter.base.Newsletter'
 SENTRY_NEWSLETTER_OPTIONS = {}
 
@@ -25,7 +25,7 @@ from gzip import GzipFile
 from six import BytesIO
 from time import time
 
-from sentry import filters, tagstore
+from sentry import tagstore
 from sentry.cache import default_cache
 from sentry.constants import (
     CLIENT_RESERVED_ATTRS,
@@ -47,7 +47,7 @@ from sentry.utils.auth import parse_auth_header
 from sentry.utils.csp import is_valid_csp_report
 from sentry.utils.http import origin_from_request
 from sentry.utils.data_filters import is_valid_ip, \
-    is_valid_release, is_valid_error_message, FilterStatKeys
+    is_valid_release, is_valid_error_message, get_enabled_filters, FilterStatKeys
 from sentry.utils.strings import decompress
 from sentry.utils.validators import is_float, is_event_id
 
@@ -406,9 +406,8 @@ class ClientApiHelper(object):
         if error_message and not is_valid_error_message(project, error_message):
             return (True, FilterStatKeys.ERROR_MESSAGE)
 
-        for filter_cls in filters.all():
-            filter_obj = filter_cls(project)
-            if filter_obj.is_enabled() and filter_obj.test(data):
+        for filter_obj in get_enabled_filters(project):
+            if filter_obj.test(data):
                 return (True, six.text_type(filter_obj.id))
 
         return (False, None)
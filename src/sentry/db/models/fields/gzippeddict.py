@@ -13,7 +13,9 @@ import six
 
 from django.conf import settings
 from django.db import models
+from simplejson import JSONEncoder
 
+from sentry.utils import json
 from sentry.utils.compat import pickle
 from sentry.utils.strings import decompress, compress
 
@@ -21,6 +23,60 @@ __all__ = ('GzippedDictField', )
 
 logger = logging.getLogger('sentry')
 
+# Encoded values start with a prefix that identifies their encoding. Values
+# without a prefix are base64 encoded, zlib compressed pickles, which were
+# written before the prefix was introduced (base64 never contains a colon.)
+JSON_PREFIX = u'j:'
+ZLIB_JSON_PREFIX = u'z:'
+
+# JSON documents that are larger than this (in bytes) are compressed.
+COMPRESS_THRESHOLD = 1024
+
+# Unlike ``sentry.utils.json``, this encoder fails on values that can't be
+# represented in JSON (such as datetimes) instead of converting them.
+_json_encoder = JSONEncoder(separators=(',', ':'), use_decimal=False)
+
+
+def encode(value):
+    """
+    Encode a value for storage in a text column.
+    """
+    if settings.SENTRY_DICT_FIELD_ENCODING == 'json':
+        try:
+            payload = _json_encoder.encode(value)
+        except (TypeError, ValueError):
+            payload = None
+
+        # JSON turns tuples into lists and dictionary keys into strings, so
+        # values that don't survive the round trip are pickled instead.
+        if payload is not None and json.loads(payload) == value:
+            if len(payload) > COMPRESS_THRESHOLD:
+                return ZLIB_JSON_PREFIX + compress(payload, level=1)
+            return JSON_PREFIX + payload
+
+    return compress(pickle.dumps(value))
+
+
+def decode(value):
+    """
+    Decode a value written by ``encode``, in any encoding.
+    """
+    prefix = value[:2]
+    if prefix == JSON_PREFIX:
+        return json.loads(value[2:])
+    if prefix == ZLIB_JSON_PREFIX:
+        return json.loads(decompress(value[2:]))
+    return pickle.loads(decompress(value))
+
+
+def is_encoded(value):
+    """
+    Returns whether a stored value uses the configured encoding.
+    """
+    if settings.SENTRY_DICT_FIELD_ENCODING == 'json':
+        return value[:2] in (JSON_PREFIX, ZLIB_JSON_PREFIX)
+    return value[:2] not in (JSON_PREFIX, ZLIB_JSON_PREFIX)
+
 
 class GzippedDictField(models.TextField):
     """
@@ -31,7 +87,7 @@ class GzippedDictField(models.TextField):
     def to_python(self, value):
         if isinstance(value, six.string_types) and value:
             try:
-                value = pickle.loads(decompress(value))
+                value = decode(value)
             except Exception as e:
                 logger.exception(e)
                 return {}
@@ -47,7 +103,7 @@ class GzippedDictField(models.TextField):
         if isinstance(value, six.binary_type):
             value = six.text_type(value)
         # db values need to be in unicode
-        return compress(pickle.dumps(value))
+        return encode(value)
 
     def value_to_string(self, obj):
         value = self._get_val_from_obj(obj)
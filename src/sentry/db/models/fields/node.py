@@ -19,10 +19,8 @@ from django.db.models.signals import post_delete
 
 from sentry import nodestore
 from sentry.utils.cache import memoize
-from sentry.utils.compat import pickle
-from sentry.utils.strings import decompress, compress
 
-from .gzippeddict import GzippedDictField
+from .gzippeddict import GzippedDictField, decode, encode
 
 __all__ = ('NodeField', )
 
@@ -47,6 +45,9 @@ class NodeData(collections.MutableMapping):
         #  in the case of something changing on the data model)
         self.ref_version = None
         self._node_data = data
+        # set once the data has been written by ``BaseManager.save_nodes``, so
+        # that saving the instance doesn't write it again
+        self.saved = False
 
     def __getitem__(self, key):
         return self.data[key]
@@ -134,7 +135,7 @@ class NodeField(GzippedDictField):
     def to_python(self, value):
         if isinstance(value, six.string_types) and value:
             try:
-                value = pickle.loads(decompress(value))
+                value = decode(value)
             except Exception as e:
                 logger.exception(e)
                 value = {}
@@ -159,10 +160,12 @@ class NodeField(GzippedDictField):
         # and manually
         if not value.id:
             value.id = nodestore.create(value.data)
+        elif value.saved:
+            value.saved = False
         else:
             nodestore.set(value.id, value.data)
 
-        return compress(pickle.dumps({'node_id': value.id}))
+        return encode({'node_id': value.id})
 
 
 if hasattr(models, 'SubfieldBase'):
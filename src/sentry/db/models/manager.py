@@ -13,6 +13,9 @@ import six
 import threading
 import weakref
 
+from time import time
+from uuid import uuid4
+
 from django.conf import settings
 from django.db import router
 from django.db.models import Manager, Model
@@ -21,6 +24,8 @@ from django.utils.encoding import smart_text
 
 from sentry import nodestore
 from sentry.utils.cache import cache
+from sentry.utils.compat import pickle
+from sentry.utils.datastructures import LRUCache
 from sentry.utils.hashlib import md5_text
 
 from .query import create_or_update
@@ -65,9 +70,19 @@ class BaseManager(Manager):
         self.cache_fields = kwargs.pop('cache_fields', [])
         self.cache_ttl = kwargs.pop('cache_ttl', 60 * 5)
         self.cache_version = kwargs.pop('cache_version', None)
+        # Keeps a process-local copy of instances fetched with
+        # ``get_from_cache`` in front of the shared cache. Copies are checked
+        # against a version stamp (published whenever an instance is saved
+        # or deleted) once they are older than
+        # ``SENTRY_MODEL_LOCAL_CACHE_TTL`` seconds.
+        self.local_cache = kwargs.pop('local_cache', False)
         self.__local_cache = threading.local()
+        self.__local_instances = self.__make_local_instances()
         super(BaseManager, self).__init__(*args, **kwargs)
 
+    def __make_local_instances(self):
+        return LRUCache(settings.SENTRY_MODEL_LOCAL_CACHE_SIZE if self.local_cache else 0)
+
     def _get_cache(self):
         if not hasattr(self.__local_cache, 'value'):
             self.__local_cache.value = weakref.WeakKeyDictionary()
@@ -87,11 +102,13 @@ class BaseManager(Manager):
         # we cant serialize weakrefs
         d.pop('_BaseManager__cache', None)
         d.pop('_BaseManager__local_cache', None)
+        d.pop('_BaseManager__local_instances', None)
         return d
 
     def __setstate__(self, state):
         self.__dict__.update(state)
         self.__local_cache = weakref.WeakKeyDictionary()
+        self.__local_instances = self.__make_local_instances()
 
     def __class_prepared(self, sender, **kwargs):
         """
@@ -130,6 +147,10 @@ class BaseManager(Manager):
         Pushes changes to an instance into the cache, and removes invalid (changed)
         lookup values.
         """
+        self.__cache_instance(instance)
+        self.__publish_version(instance.pk)
+
+    def __cache_instance(self, instance):
         pk_name = instance._meta.pk.name
         pk_names = ('pk', pk_name)
         pk_val = instance.pk
@@ -194,10 +215,101 @@ class BaseManager(Manager):
             key=self.__get_lookup_cache_key(**{pk_name: instance.pk}),
             version=self.cache_version,
         )
+        self.__publish_version(instance.pk)
 
     def __get_lookup_cache_key(self, **kwargs):
         return make_key(self.model, 'modelcache', kwargs)
 
+    def __get_version_cache_key(self, pk):
+        return make_key(self.model, 'modelcache:version', {'pk': pk})
+
+    def __publish_version(self, pk):
+        """
+        Invalidates all process-local copies of an instance.
+        """
+        if not self.local_cache:
+            return
+
+        self.__local_instances.delete(pk)
+        cache.set(
+            key=self.__get_version_cache_key(pk),
+            value=uuid4().hex,
+            timeout=self.cache_ttl,
+            version=self.cache_version,
+        )
+
+    def __get_versions(self, pks):
+        """
+        Returns the current version stamp for each of the given primary keys,
+        establishing new stamps where needed. Stamps which could not be
+        established (due to a concurrent change) are omitted.
+        """
+        keys = {self.__get_version_cache_key(pk): pk for pk in pks}
+        result = {
+            keys[key]: value
+            for key, value in six.iteritems(
+                cache.get_many(list(keys), version=self.cache_version)
+            )
+        }
+        for key, pk in six.iteritems(keys):
+            if pk in result:
+                continue
+            value = uuid4().hex
+            if cache.add(key, value, timeout=self.cache_ttl, version=self.cache_version):
+                result[pk] = value
+        return result
+
+    def __get_many_from_local_cache(self, pks):
+        """
+        Returns the locally cached copies of the given instances that are
+        still known to be current.
+        """
+        now = time()
+        entries = {}
+        unchecked = []
+        for pk in pks:
+            entry = self.__local_instances.get(pk)
+            if entry is None:
+                continue
+            entries[pk] = entry
+            if now - entry[2] >= settings.SENTRY_MODEL_LOCAL_CACHE_TTL:
+                unchecked.append(pk)
+
+        if unchecked:
+            keys = {self.__get_version_cache_key(pk): pk for pk in unchecked}
+            versions = {
+                keys[key]: value
+                for key, value in six.iteritems(
+                    cache.get_many(list(keys), version=self.cache_version)
+                )
+            }
+            for pk in unchecked:
+                version, data, _ = entries[pk]
+                if versions.get(pk) == version:
+                    entries[pk] = (version, data, now)
+                    self.__local_instances.set(pk, entries[pk])
+                else:
+                    del entries[pk]
+                    self.__local_instances.delete(pk)
+
+        db = router.db_for_read(self.model)
+        result = {}
+        for pk, (version, data, _) in six.iteritems(entries):
+            instance = pickle.loads(data)
+            instance._state.db = db
+            result[pk] = instance
+        return result
+
+    def __set_local_cache(self, instance, version):
+        # Ensure we don't serialize the database into the cache
+        db = instance._state.db
+        instance._state.db = None
+        try:
+            data = pickle.dumps(instance, pickle.HIGHEST_PROTOCOL)
+        finally:
+            instance._state.db = db
+        self.__local_instances.set(instance.pk, (version, data, time()))
+
     def __value_for_field(self, instance, key):
         """
         Return the cacheable value for a field.
@@ -238,18 +350,42 @@ class BaseManager(Manager):
             key = key.split('__exact', 1)[0]
 
         if key in self.cache_fields or key == pk_name:
+            local_version = None
+            if self.local_cache:
+                if key == pk_name:
+                    pk = self.model._meta.pk.to_python(value)
+                else:
+                    pk = self.__local_instances.get((key, smart_text(value)))
+
+                if pk is not None:
+                    retval = self.__get_many_from_local_cache([pk]).get(pk)
+                    if retval is not None and (
+                        key == pk_name or
+                        smart_text(self.__value_for_field(retval, key)) == smart_text(value)
+                    ):
+                        return retval
+
+                if key == pk_name:
+                    # The version has to be read before the instance, so that
+                    # a concurrent change can't be cached under the new stamp
+                    local_version = self.__get_versions([pk]).get(pk)
+
             cache_key = self.__get_lookup_cache_key(**{key: value})
 
             retval = cache.get(cache_key, version=self.cache_version)
             if retval is None:
                 result = self.get(**kwargs)
                 # Ensure we're pushing it into the cache
-                self.__post_save(instance=result)
+                self.__cache_instance(result)
+                if local_version is not None:
+                    self.__set_local_cache(result, local_version)
                 return result
 
             # If we didn't look up by pk we need to hit the reffed
             # key
             if key != pk_name:
+                if self.local_cache:
+                    self.__local_instances.set((key, smart_text(value)), retval)
                 return self.get_from_cache(**{pk_name: retval})
 
             if type(retval) != self.model:
@@ -266,13 +402,104 @@ class BaseManager(Manager):
 
             retval._state.db = router.db_for_read(self.model, **kwargs)
 
+            if local_version is not None:
+                self.__set_local_cache(retval, local_version)
+
             return retval
         else:
             return self.get(**kwargs)
 
+    def get_many_from_cache(self, values, key='pk'):
+        """
+        Wrapper around `QuerySet.filter(pk__in=values)` which supports caching
+        of the intermediate values. Instances are returned in the order of
+        ``values``, omitting any that do not exist.
+        """
+        pk_name = self.model._meta.pk.name
+        if key == 'pk':
+            key = pk_name
+
+        if not self.cache_fields or key != pk_name:
+            field = self.model._meta.get_field(key)
+            attname = field.attname
+            if field.rel:
+                field = field.rel.get_related_field()
+            values = [
+                field.to_python(value.pk if isinstance(value, Model) else value)
+                for value in values
+            ]
+            result = {}
+            for instance in self.filter(**{'%s__in' % key: values}):
+                result.setdefault(getattr(instance, attname), []).append(instance)
+            return [instance for value in values for instance in result.get(value, ())]
+
+        pks = [
+            self.model._meta.pk.to_python(value.pk if isinstance(value, Model) else value)
+            for value in values
+        ]
+
+        result = {}
+        if self.local_cache:
+            result.update(self.__get_many_from_local_cache(pks))
+
+        remaining = [pk for pk in set(pks) if pk not in result]
+        if remaining:
+            versions = self.__get_versions(remaining) if self.local_cache else {}
+
+            cache_keys = {self.__get_lookup_cache_key(**{pk_name: pk}): pk for pk in remaining}
+            db = router.db_for_read(self.model)
+            for cache_key, instance in six.iteritems(
+                cache.get_many(list(cache_keys), version=self.cache_version)
+            ):
+                instance_id = cache_keys[cache_key]
+                if type(instance) != self.model or instance.pk != instance_id:
+                    logger.error('Cache response returned invalid value %r', instance)
+                    continue
+                instance._state.db = db
+                result[instance_id] = instance
+
+            missing = [pk for pk in remaining if pk not in result]
+            if missing:
+                for instance in self.filter(pk__in=missing):
+                    # Ensure we're pushing it into the cache
+                    self.__cache_instance(instance)
+                    result[instance.pk] = instance
+
+            for pk, version in six.iteritems(versions):
+                if pk in result:
+                    self.__set_local_cache(result[pk], version)
+
+        return [result[pk] for pk in pks if pk in result]
+
     def create_or_update(self, **kwargs):
         return create_or_update(self.model, **kwargs)
 
+    def save_nodes(self, object_list, *node_names):
+        """
+        Writes the node data of every instance in ``object_list`` with a
+        single ``nodestore.set_multi`` call. Saving the instances afterwards
+        doesn't write the nodes again.
+        """
+        values = {}
+        nodes = []
+        for name in node_names:
+            for item in object_list:
+                node = getattr(item, name)
+                if not node and node.field.null:
+                    continue
+                if not node.id:
+                    node.id = nodestore.generate_id()
+                values[node.id] = node.data
+                nodes.append(node)
+
+        if not values:
+            return
+
+        nodestore.set_multi(values)
+
+        for node in nodes:
+            node.saved = True
+
     def bind_nodes(self, object_list, *node_names):
         object_node_list = []
         for name in node_names:
@@ -11,14 +11,16 @@ from __future__ import absolute_import
 import itertools
 import six
 
-from django.db import IntegrityError, router, transaction
-from django.db.models import Model, Q
+from contextlib import contextmanager
+
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import AutoField, Model, Q
 from django.db.models.signals import post_save
 from six.moves import reduce
 
 from .utils import ExpressionNode, resolve_expression_node
 
-__all__ = ('update', 'create_or_update')
+__all__ = ('update', 'create_or_update', 'bulk_increment')
 
 
 def update(self, using=None, **kwargs):
@@ -100,6 +102,178 @@ def create_or_update(model, using=None, **kwargs):
     return affected, False
 
 
+def _get_field(model, name):
+    field = _find_field(model, name)
+    if field is None:
+        raise ValueError('Unknown field %r on %r' % (name, model))
+    return field
+
+
+def _find_field(model, name):
+    for field in model._meta.fields:
+        if name in (field.name, field.attname):
+            return field
+    return None
+
+
+def _get_cast_type(field, connection):
+    # Auto fields report their serial type, which is not valid in a cast
+    if hasattr(field, 'get_related_db_type'):
+        return field.get_related_db_type(connection)
+    elif isinstance(field, AutoField):
+        return 'integer'
+    # strip column constraints (e.g. ``integer CHECK ("x" >= 0)``)
+    return field.db_type(connection).split(' CHECK ', 1)[0]
+
+
+def _get_bulk_increment_signature(model, columns, filters, extra, connection):
+    """
+    Returns a key shared by all increments that can be applied with the same
+    statement, or ``None`` if the increment can not be applied in bulk.
+    """
+    # Only concrete fields can be referenced in the statement, aliases such
+    # as ``pk`` are left for ``create_or_update``.
+    for name in itertools.chain(columns, filters, extra):
+        if _find_field(model, name) is None:
+            return None
+
+    expressions = []
+    for name, value in sorted(six.iteritems(extra)):
+        if isinstance(value, ExpressionNode):
+            return None
+        elif hasattr(value, 'evaluate'):
+            # e.g. ``ScoreClause``, which renders the same SQL for every row
+            sql, params = value.evaluate(None, None, connection)
+            if params:
+                return None
+            expressions.append((name, sql))
+
+    return (
+        tuple(sorted(columns)),
+        tuple(sorted(filters)),
+        tuple(sorted(k for k, v in six.iteritems(extra) if not hasattr(v, 'evaluate'))),
+        tuple(expressions),
+    )
+
+
+@contextmanager
+def _nullcontext():
+    yield
+
+
+def _get_db_value(field, value, connection):
+    if isinstance(value, Model):
+        value = value.pk
+    return field.get_db_prep_save(value, connection=connection)
+
+
+def bulk_increment(model, items, using=None, chunk_size=500):
+    """
+    Applies many ``create_or_update`` style increments with as few
+    statements as possible. ``items`` is a list of ``(columns, filters,
+    extra)`` tuples, each of which is equivalent to::
+
+    >>> create_or_update(model, values=dict(
+    >>>     [(c, F(c) + v) for c, v in columns.items()], **extra
+    >>> ), **filters)
+
+    Increments that share the same columns are applied with a single
+    ``UPDATE ... FROM (VALUES ...)`` statement on PostgreSQL, either all of
+    the statements are applied or none of them. Returns the
+    items which were not applied, either because no matching row exists yet
+    or because they can not be expressed in bulk, so that they can be passed
+    through ``create_or_update``.
+    """
+    if not using:
+        using = router.db_for_write(model)
+
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return list(items)
+
+    remaining = []
+    groups = {}
+    for item in items:
+        columns, filters, extra = item
+        signature = _get_bulk_increment_signature(model, columns, filters, extra, connection)
+        if signature is None or not filters:
+            remaining.append(item)
+        else:
+            groups.setdefault(signature, []).append(item)
+
+    qn = connection.ops.quote_name
+    table = qn(model._meta.db_table)
+
+    statements = []
+    for (columns, filters, extra, expressions), group in six.iteritems(groups):
+        # (source, name, field, alias) for every column of the VALUES list
+        fields = []
+        conditions = []
+        assignments = []
+        for source, names in ((1, filters), (0, columns), (2, extra)):
+            for name in names:
+                field = _get_field(model, name)
+                column = qn(field.column)
+                alias = qn('v%d' % len(fields))
+                fields.append((source, name, field, alias))
+                if source == 1:
+                    conditions.append('t.%s = v.%s' % (column, alias))
+                elif source == 0:
+                    assignments.append('%s = t.%s + v.%s' % (column, column, alias))
+                else:
+                    assignments.append('%s = v.%s' % (column, alias))
+
+        for name, sql in expressions:
+            assignments.append('%s = %s' % (qn(_get_field(model, name).column), sql))
+
+        row_sql = '(%s)' % ', '.join(
+            ['%s::integer'] + ['%%s::%s' % _get_cast_type(f[2], connection) for f in fields]
+        )
+
+        # multiple rows matching the same target row would only be applied
+        # once, so any duplicates are left for the fallback path
+        seen = set()
+        rows = []
+        for idx, item in enumerate(group):
+            values = [idx] + [
+                _get_db_value(item_field, item[source][name], connection)
+                for source, name, item_field, _ in fields
+            ]
+            key = tuple(values[1:len(filters) + 1])
+            if key in seen:
+                remaining.append(item)
+                continue
+            seen.add(key)
+            rows.append(values)
+
+        for offset in range(0, len(rows), chunk_size):
+            chunk = rows[offset:offset + chunk_size]
+            sql = 'UPDATE %s AS t SET %s FROM (VALUES %s) AS v (%s) WHERE %s RETURNING v.%s' % (
+                table,
+                ', '.join(assignments),
+                ', '.join([row_sql] * len(chunk)),
+                ', '.join([qn('idx')] + [f[3] for f in fields]),
+                ' AND '.join(conditions),
+                qn('idx'),
+            )
+            params = list(itertools.chain.from_iterable(chunk))
+            statements.append((sql, params, group, chunk))
+
+    if not statements:
+        return remaining
+
+    # Either all of the statements are applied or none of them, so that
+    # a failed batch can be retried. A single statement is atomic already.
+    with transaction.atomic(using=using) if len(statements) > 1 else _nullcontext():
+        cursor = connection.cursor()
+        for sql, params, group, chunk in statements:
+            cursor.execute(sql, params)
+            updated = set(r[0] for r in cursor.fetchall())
+            remaining.extend(group[row[0]] for row in chunk if row[0] not in updated)
+
+    return remaining
+
+
 def in_iexact(column, values):
     from operator import or_
 
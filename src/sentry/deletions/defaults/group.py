@@ -36,16 +36,22 @@ class GroupDeletionTask(ModelDeletionTask):
         return relations
 
     def delete_instance(self, instance):
+        from sentry.models import GroupHash
         from sentry.similarity import features
 
         if not self.skip_models or features not in self.skip_models:
             features.delete(instance)
 
+        GroupHash.bump_cache_version(instance.project_id)
+
         return super(GroupDeletionTask, self).delete_instance(instance)
 
     def mark_deletion_in_progress(self, instance_list):
-        from sentry.models import GroupStatus
+        from sentry.models import GroupHash, GroupStatus
 
         for instance in instance_list:
             if instance.status != GroupStatus.DELETION_IN_PROGRESS:
                 instance.update(status=GroupStatus.DELETION_IN_PROGRESS)
+
+        for project_id in set(instance.project_id for instance in instance_list):
+            GroupHash.bump_cache_version(project_id)
@@ -23,6 +23,7 @@ from uuid import uuid4
 from sentry import eventtypes, features, buffer, tagstore
 # we need a bunch of unexposed functions from tsdb
 from sentry.tsdb import backend as tsdb
+from sentry.tsdb.batch import BatchedTSDB
 from sentry.constants import (
     CLIENT_RESERVED_ATTRS, LOG_LEVELS, DEFAULT_LOGGER_NAME, MAX_CULPRIT_LENGTH
 )
@@ -36,7 +37,9 @@ from sentry.plugins import plugins
 from sentry.signals import first_event_received, regression_signal
 from sentry.tasks.merge import merge_group
 from sentry.tasks.post_process import post_process_group
+from sentry.utils import metrics
 from sentry.utils.cache import default_cache
+from sentry.utils.datastructures import LRUCache
 from sentry.utils.db import get_db_engine
 from sentry.utils.safe import safe_execute, trim, trim_dict
 from sentry.utils.strings import truncatechars
@@ -44,6 +47,13 @@ from sentry.utils.validators import validate_ip
 from sentry.stacktraces import normalize_in_app
 
 
+# hash -> group lookups for hashes which already belong to a group or tombstone
+grouphash_cache = LRUCache(
+    settings.SENTRY_GROUPHASH_CACHE_SIZE,
+    ttl=settings.SENTRY_GROUPHASH_CACHE_TTL,
+)
+
+
 def count_limit(count):
     # TODO: could we do something like num_to_store = max(math.sqrt(100*count)+59, 200) ?
     # ~ 150 * ((log(n) - 1.5) ^ 2 - 0.25)
@@ -400,11 +410,82 @@ class EventManager(object):
 
         return data
 
-    def save(self, project, raw=False):
-        from sentry.tasks.post_process import index_event_tags
+    def save(self, project, raw=False, index_tags_inline=False):
+        """
+        Saves the event belonging to ``project``.
 
+        If ``index_tags_inline`` is set, the event's tags are indexed in this
+        process instead of in a separate ``index_event_tags`` task (which is
+        still used as a fallback if indexing fails.)
+        """
         project = Project.objects.get_from_cache(id=project)
 
+        job = self._prepare_job(project)
+        self._save_job_aggregate(job)
+        self._save_jobs(
+            project, [job], raw=raw, tsdb=tsdb, index_tags_inline=index_tags_inline,
+        )
+
+        return job['event']
+
+    @classmethod
+    def save_many(cls, project, events, raw=False):
+        """
+        Saves a batch of normalized event payloads belonging to ``project``.
+
+        Releases, environments and group hashes are resolved once for the
+        whole batch, ``EventMapping`` and ``Event`` rows are written with
+        multi-row inserts, and time series writes are coalesced into as few
+        TSDB calls as possible. Aggregates are still processed one event at a
+        time (in the order given) so duplicate detection, regressions and
+        sampling behave exactly as they do in ``save``.
+
+        Events whose hashes match a tombstone are skipped. Returns the list of
+        events that were not discarded.
+        """
+        project = Project.objects.get_from_cache(id=project)
+
+        cache = {}
+        jobs = [cls(data)._prepare_job(project, cache=cache) for data in events]
+
+        group_hashes = cls._find_hashes_many(
+            project,
+            set(hash for job in jobs for hash in job['hashes']),
+        )
+
+        saved_jobs = []
+        for job in jobs:
+            try:
+                job['manager']._save_job_aggregate(
+                    job,
+                    all_hashes=[group_hashes[hash] for hash in job['hashes']],
+                )
+            except HashDiscarded as exc:
+                cls.logger.info(
+                    'discarded.hash', extra={
+                        'project_id': project.id,
+                        'event_uuid': job['event_id'],
+                        'description': exc.message,
+                    }
+                )
+                continue
+            saved_jobs.append(job)
+
+        batch = BatchedTSDB(tsdb)
+        cls._save_jobs(project, saved_jobs, raw=raw, tsdb=batch, cache=cache)
+        batch.flush()
+
+        return [job['event'] for job in saved_jobs]
+
+    def _prepare_job(self, project, cache=None):
+        """
+        Builds the ``Event`` instance along with everything needed to save its
+        aggregate. ``cache`` is shared between all events of a batch so that
+        releases and distributions are only resolved once.
+        """
+        if cache is None:
+            cache = {}
+
         data = self.data.copy()
 
         # First we pull out our top-level (non-data attr) kwargs
@@ -469,16 +550,22 @@ class EventManager(object):
             # dont allow a conflicting 'release' tag
             if 'release' in tags:
                 del tags['release']
-            release = Release.get_or_create(
-                project=project,
-                version=release,
-                date_added=date,
-            )
+            release_key = ('release', release)
+            if release_key not in cache:
+                cache[release_key] = Release.get_or_create(
+                    project=project,
+                    version=release,
+                    date_added=date,
+                )
+            release = cache[release_key]
 
             tags['sentry:release'] = release.version
 
         if dist and release:
-            dist = release.add_dist(dist, date)
+            dist_key = ('dist', release.id, dist)
+            if dist_key not in cache:
+                cache[dist_key] = release.add_dist(dist, date)
+            dist = cache[dist_key]
             tags['sentry:dist'] = dist.name
         else:
             dist = None
@@ -590,36 +677,118 @@ class EventManager(object):
         if release:
             group_kwargs['first_release'] = release
 
+        return {
+            'manager': self,
+            'event': event,
+            'event_id': event_id,
+            'date': date,
+            'tags': tags,
+            'hashes': hashes,
+            'release': release,
+            'environment': environment,
+            'event_user': event_user,
+            'group_kwargs': group_kwargs,
+        }
+
+    def _save_job_aggregate(self, job, all_hashes=None):
+        event = job['event']
+
         group, is_new, is_regression, is_sample = self._save_aggregate(
-            event=event, hashes=hashes, release=release, **group_kwargs
+            event=event,
+            hashes=job['hashes'],
+            release=job['release'],
+            all_hashes=all_hashes,
+            **job['group_kwargs']
         )
 
         event.group = group
         # store a reference to the group id to guarantee validation of isolation
         event.data.bind_ref(event)
 
-        try:
-            with transaction.atomic(using=router.db_for_write(EventMapping)):
-                EventMapping.objects.create(project=project, group=group, event_id=event_id)
-        except IntegrityError:
-            self.logger.info(
-                'duplicate.found',
-                exc_info=True,
-                extra={
-                    'event_uuid': event_id,
-                    'project_id': project.id,
-                    'group_id': group.id,
-                    'model': EventMapping.__name__,
-                }
-            )
-            return event
+        job.update({
+            'group': group,
+            'is_new': is_new,
+            'is_regression': is_regression,
+            'is_sample': is_sample,
+        })
 
-        environment = Environment.get_or_create(
-            project=project,
-            name=environment,
+    @classmethod
+    def _insert_rows(cls, model, jobs, get_instance):
+        """
+        Inserts one row per job and returns the jobs whose rows were written.
+
+        Batches are written with a single multi-row insert. If that conflicts
+        with an existing row we fall back to inserting rows one at a time so
+        that only the duplicates are dropped.
+        """
+        if len(jobs) > 1:
+            instances = [get_instance(job) for job in jobs]
+            try:
+                with transaction.atomic(using=router.db_for_write(model)):
+                    model.objects.bulk_create(instances)
+            except IntegrityError:
+                pass
+            else:
+                return jobs
+
+        inserted = []
+        for job in jobs:
+            instance = get_instance(job)
+            try:
+                with transaction.atomic(using=router.db_for_write(model)):
+                    instance.save()
+            except IntegrityError:
+                cls.logger.info(
+                    'duplicate.found',
+                    exc_info=True,
+                    extra={
+                        'event_uuid': job['event_id'],
+                        'project_id': job['event'].project_id,
+                        'group_id': job['group'].id,
+                        'model': model.__name__,
+                    }
+                )
+                continue
+            inserted.append(job)
+        return inserted
+
+    @classmethod
+    def _save_jobs(cls, project, jobs, raw, tsdb, cache=None, index_tags_inline=False):
+        from sentry.tasks.post_process import index_event_tags
+
+        if cache is None:
+            cache = {}
+
+        jobs = cls._insert_rows(
+            EventMapping,
+            jobs,
+            lambda job: EventMapping(project=project, group=job['group'], event_id=job['event_id']),
         )
+        if not jobs:
+            return
 
-        if release:
+        environment_names = set(job['environment'] for job in jobs)
+        environments = {}
+        for name in environment_names:
+            environment_key = ('environment', name)
+            if environment_key not in cache:
+                cache[environment_key] = Environment.get_or_create(
+                    project=project,
+                    name=name,
+                )
+            environments[name] = cache[environment_key]
+
+        # ``last_seen`` only ever moves forward, so each release environment
+        # and group release only needs to be touched once per batch with the
+        # most recent event date.
+        release_dates = {}
+        for job in jobs:
+            job['environment'] = environments[job['environment']]
+            if job['release']:
+                key = (job['release'], job['environment'])
+                release_dates[key] = max(job['date'], release_dates.get(key, job['date']))
+
+        for (release, environment), date in six.iteritems(release_dates):
             ReleaseEnvironment.get_or_create(
                 project=project,
                 release=release,
@@ -627,122 +796,166 @@ class EventManager(object):
                 datetime=date,
             )
 
-            grouprelease = GroupRelease.get_or_create(
+        group_release_dates = {}
+        for job in jobs:
+            if job['release']:
+                key = (job['group'], job['release'], job['environment'])
+                group_release_dates[key] = max(
+                    job['date'], group_release_dates.get(key, job['date'])
+                )
+
+        group_releases = {}
+        for (group, release, environment), date in six.iteritems(group_release_dates):
+            group_releases[(group.id, release.id, environment.id)] = GroupRelease.get_or_create(
                 group=group,
                 release=release,
                 environment=environment,
                 datetime=date,
             )
 
-        counters = [
-            (tsdb.models.group, group.id),
-            (tsdb.models.project, project.id),
-        ]
-
-        if release:
-            counters.append((tsdb.models.release, release.id))
-
-        tsdb.incr_multi(counters, timestamp=event.datetime)
-
-        frequencies = [
-            # (tsdb.models.frequent_projects_by_organization, {
-            #     project.organization_id: {
-            #         project.id: 1,
-            #     },
-            # }),
-            # (tsdb.models.frequent_issues_by_project, {
-            #     project.id: {
-            #         group.id: 1,
-            #     },
-            # })
-            (tsdb.models.frequent_environments_by_group, {
-                group.id: {
-                    environment.id: 1,
-                },
-            })
-        ]
+        for job in jobs:
+            event, group, release, environment = (
+                job['event'], job['group'], job['release'], job['environment'],
+            )
 
-        if release:
-            frequencies.append(
-                (tsdb.models.frequent_releases_by_group, {
+            counters = [
+                (tsdb.models.group, group.id),
+                (tsdb.models.project, project.id),
+            ]
+
+            if release:
+                counters.append((tsdb.models.release, release.id))
+
+            tsdb.incr_multi(counters, timestamp=event.datetime)
+
+            frequencies = [
+                # (tsdb.models.frequent_projects_by_organization, {
+                #     project.organization_id: {
+                #         project.id: 1,
+                #     },
+                # }),
+                # (tsdb.models.frequent_issues_by_project, {
+                #     project.id: {
+                #         group.id: 1,
+                #     },
+                # })
+                (tsdb.models.frequent_environments_by_group, {
                     group.id: {
-                        grouprelease.id: 1,
+                        environment.id: 1,
                     },
                 })
-            )
+            ]
+
+            if release:
+                grouprelease = group_releases[(group.id, release.id, environment.id)]
+                frequencies.append(
+                    (tsdb.models.frequent_releases_by_group, {
+                        group.id: {
+                            grouprelease.id: 1,
+                        },
+                    })
+                )
 
-        tsdb.record_frequency_multi(frequencies, timestamp=event.datetime)
+            tsdb.record_frequency_multi(frequencies, timestamp=event.datetime)
 
-        UserReport.objects.filter(
-            project=project,
-            event_id=event_id,
-        ).update(group=group)
+        event_ids_by_group = {}
+        for job in jobs:
+            group, event_ids = event_ids_by_group.setdefault(job['group'].id, (job['group'], []))
+            event_ids.append(job['event_id'])
+
+        for group, event_ids in six.itervalues(event_ids_by_group):
+            UserReport.objects.filter(
+                project=project,
+                event_id__in=event_ids,
+            ).update(group=group)
 
         # save the event unless its been sampled
-        if not is_sample:
-            try:
-                with transaction.atomic(using=router.db_for_write(Event)):
-                    event.save()
-            except IntegrityError:
-                self.logger.info(
-                    'duplicate.found',
-                    exc_info=True,
-                    extra={
-                        'event_uuid': event_id,
-                        'project_id': project.id,
-                        'group_id': group.id,
-                        'model': Event.__name__,
-                    }
-                )
-                return event
-
-            index_event_tags.delay(
-                organization_id=project.organization_id,
-                project_id=project.id,
-                group_id=group.id,
-                event_id=event.id,
-                tags=tags,
+        unsampled_jobs = [job for job in jobs if not job['is_sample']]
+        Event.objects.save_nodes([job['event'] for job in unsampled_jobs], 'data')
+        saved_jobs = cls._insert_rows(Event, unsampled_jobs, lambda job: job['event'])
+        if len(saved_jobs) > 1:
+            # multi-row inserts don't return primary keys
+            event_ids = dict(
+                Event.objects.filter(
+                    project_id=project.id,
+                    event_id__in=[job['event_id'] for job in saved_jobs],
+                ).values_list('event_id', 'id')
             )
+            for job in saved_jobs:
+                job['event'].id = event_ids[job['event_id']]
+                job['event']._state.adding = False
+
+        for job in saved_jobs:
+            index_kwargs = {
+                'organization_id': project.organization_id,
+                'project_id': project.id,
+                'group_id': job['group'].id,
+                'event_id': job['event'].id,
+                'tags': job['tags'],
+            }
+            if index_tags_inline:
+                try:
+                    with metrics.timer('events.fused', tags={'stage': 'index_tags'}):
+                        index_event_tags(**index_kwargs)
+                    continue
+                except Exception:
+                    cls.logger.warning('index_tags.inline.failed', exc_info=True)
+            index_event_tags.delay(**index_kwargs)
+
+        # events which were found to be duplicates when saving don't go any
+        # further through the pipeline
+        saved_job_ids = set(id(job) for job in saved_jobs)
+        jobs = [
+            job for job in jobs
+            if job['is_sample'] or id(job) in saved_job_ids
+        ]
 
-        if event_user:
-            tsdb.record_multi(
-                (
-                    (tsdb.models.users_affected_by_group, group.id, (event_user.tag_value, )),
-                    (tsdb.models.users_affected_by_project, project.id, (event_user.tag_value, )),
-                ),
-                timestamp=event.datetime
+        for job in jobs:
+            event, group, release, event_user, tags, date = (
+                job['event'], job['group'], job['release'], job['event_user'],
+                job['tags'], job['date'],
             )
-
-        if is_new and release:
-            buffer.incr(
-                ReleaseProject, {'new_groups': 1}, {
-                    'release_id': release.id,
-                    'project_id': project.id,
-                }
+            is_new, is_regression, is_sample = (
+                job['is_new'], job['is_regression'], job['is_sample'],
             )
 
-        safe_execute(Group.objects.add_tags, group, tags, _with_transaction=False)
+            if event_user:
+                tsdb.record_multi(
+                    (
+                        (tsdb.models.users_affected_by_group, group.id, (event_user.tag_value, )),
+                        (tsdb.models.users_affected_by_project, project.id, (event_user.tag_value, )),
+                    ),
+                    timestamp=event.datetime
+                )
 
-        if not raw:
-            if not project.first_event:
-                project.update(first_event=date)
-                first_event_received.send(project=project, group=group, sender=Project)
+            if is_new and release:
+                buffer.incr(
+                    ReleaseProject, {'new_groups': 1}, {
+                        'release_id': release.id,
+                        'project_id': project.id,
+                    }
+                )
 
-            post_process_group.delay(
-                group=group,
-                event=event,
-                is_new=is_new,
-                is_sample=is_sample,
-                is_regression=is_regression,
-            )
-        else:
-            self.logger.info('post_process.skip.raw_event', extra={'event_id': event.id})
+            safe_execute(Group.objects.add_tags, group, tags, _with_transaction=False)
 
-        # TODO: move this to the queue
-        if is_regression and not raw:
-            regression_signal.send_robust(sender=Group, instance=group)
+            if not raw:
+                if not project.first_event:
+                    project.update(first_event=date)
+                    first_event_received.send(project=project, group=group, sender=Project)
 
-        return event
+                post_process_group.delay(
+                    group=group,
+                    event=event,
+                    is_new=is_new,
+                    is_sample=is_sample,
+                    is_regression=is_regression,
+                )
+            else:
+                cls.logger.info('post_process.skip.raw_event', extra={'event_id': event.id})
+
+            # TODO: move this to the queue
+            if is_regression and not raw:
+                regression_signal.send_robust(sender=Group, instance=group)
 
     def _get_event_user(self, project, data):
         user_data = data.get('sentry.interfaces.User')
@@ -789,13 +1002,70 @@ class EventManager(object):
         return euser
 
     def _find_hashes(self, project, hash_list):
-        return map(
-            lambda hash: GroupHash.objects.get_or_create(
-                project=project,
-                hash=hash,
-            )[0],
-            hash_list,
-        )
+        group_hashes = self._find_hashes_many(project, hash_list)
+        return [group_hashes[hash] for hash in hash_list]
+
+    @classmethod
+    def _find_hashes_many(cls, project, hash_list):
+        """
+        Resolves ``GroupHash`` instances for a set of hashes, returning a
+        mapping of hash to instance.
+
+        Hashes that are already associated with a group (or tombstone) are
+        served from ``grouphash_cache`` while the project's hash version is
+        unchanged. The remaining rows are fetched with a single query and only
+        hashes that have never been seen fall back to ``get_or_create``.
+        """
+        results = {}
+
+        if grouphash_cache.max_size > 0:
+            version = GroupHash.get_cache_version(project.id)
+            for hash in set(hash_list):
+                cached = grouphash_cache.get((project.id, hash))
+                if cached is not None and cached[0] == version:
+                    _, id, group_id, group_tombstone_id, state = cached
+                    results[hash] = GroupHash(
+                        id=id,
+                        project_id=project.id,
+                        hash=hash,
+                        group_id=group_id,
+                        group_tombstone_id=group_tombstone_id,
+                        state=state,
+                    )
+            metrics.incr('grouphash.cache.hit', amount=len(results))
+            metrics.incr('grouphash.cache.miss', amount=len(set(hash_list)) - len(results))
+        else:
+            version = None
+
+        missing = set(hash_list) - set(results)
+        if missing:
+            results.update(
+                (instance.hash, instance)
+                for instance in GroupHash.objects.filter(
+                    project=project,
+                    hash__in=list(missing),
+                )
+            )
+
+            for hash in missing:
+                instance = results.get(hash)
+                if instance is None:
+                    results[hash] = GroupHash.objects.get_or_create(
+                        project=project,
+                        hash=hash,
+                    )[0]
+                elif version is not None and (
+                    instance.group_id is not None or instance.group_tombstone_id is not None
+                ):
+                    grouphash_cache.set(
+                        (project.id, hash),
+                        (
+                            version, instance.id, instance.group_id,
+                            instance.group_tombstone_id, instance.state,
+                        ),
+                    )
+
+        return results
 
     def _ensure_hashes_merged(self, group, hash_list):
         # TODO(dcramer): there is a race condition with selecting/updating
@@ -825,11 +1095,12 @@ class EventManager(object):
             group=group,
         )
 
-    def _save_aggregate(self, event, hashes, release, **kwargs):
+    def _save_aggregate(self, event, hashes, release, all_hashes=None, retry=True, **kwargs):
         project = event.project
 
         # attempt to find a matching hash
-        all_hashes = self._find_hashes(project, hashes)
+        if all_hashes is None:
+            all_hashes = self._find_hashes(project, hashes)
 
         existing_group_id = None
         for h in all_hashes:
@@ -861,7 +1132,19 @@ class EventManager(object):
                 ), True
 
         else:
-            group = Group.objects.get(id=existing_group_id)
+            try:
+                group = Group.objects.get(id=existing_group_id)
+            except Group.DoesNotExist:
+                # A cached hash can still point at a group that has been
+                # deleted since, in which case we drop the cached entries and
+                # resolve the hashes against the database again (only once,
+                # as the database itself may be pointing at a deleted group.)
+                if not retry:
+                    raise
+                evicted = [grouphash_cache.delete((project.id, h.hash)) for h in all_hashes]
+                if not any(evicted):
+                    raise
+                return self._save_aggregate(event, hashes, release, retry=False, **kwargs)
 
             group_is_new = False
 
@@ -894,6 +1177,12 @@ class EventManager(object):
                 state=GroupHash.State.LOCKED_IN_MIGRATION,
             ).update(group=group)
 
+            # keep the instances in sync with the update above, as they may be
+            # shared with other events of the same batch
+            for h in new_hashes:
+                if h.state != GroupHash.State.LOCKED_IN_MIGRATION:
+                    h.group_id = group.id
+
             if group_is_new and len(new_hashes) == len(all_hashes):
                 is_new = True
 
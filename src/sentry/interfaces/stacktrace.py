@@ -21,6 +21,8 @@ from six.moves.urllib.parse import urlparse
 from sentry.app import env
 from sentry.interfaces.base import Interface, InterfaceValidationError
 from sentry.models import UserOption
+from sentry.utils import metrics
+from sentry.utils.datastructures import LRUCache
 from sentry.utils.safe import trim, trim_dict
 from sentry.web.helpers import render_to_string
 from sentry.constants import VALID_PLATFORMS
@@ -44,6 +46,10 @@ _java_enhancer_re = re.compile(r'''
 # Clojure anon functions are compiled down to myapp.mymodule$fn__12345
 _clojure_enhancer_re = re.compile(r'''(\$fn__)\d+''', re.X)
 
+# The same frames show up in a lot of events, so the hash components of each
+# frame are kept around, keyed by everything ``Frame.get_hash`` looks at.
+frame_hash_cache = LRUCache(settings.SENTRY_FRAME_HASH_CACHE_SIZE)
+
 
 def max_addr(cur, addr):
     if addr is None:
@@ -380,7 +386,27 @@ class Frame(Interface):
 
         This is one of the few areas in Sentry that isn't platform-agnostic.
         """
+        return list(self._get_hash(platform)[0])
+
+    def _get_hash(self, platform=None):
+        """
+        Returns the hash components of the frame as a tuple along with
+        whether they were served from ``frame_hash_cache``.
+        """
         platform = self.platform or platform
+        key = (
+            platform, self.abs_path, self.filename, self.module, self.function,
+            self.symbol, self.context_line, self.lineno,
+        )
+        output = frame_hash_cache.get(key)
+        if output is not None:
+            return output, True
+
+        output = tuple(self._compute_hash(platform))
+        frame_hash_cache.set(key, output)
+        return output, False
+
+    def _compute_hash(self, platform):
         output = []
         # Safari throws [native code] frames in for calls like ``forEach``
         # whereas Chrome ignores these. Let's remove it from the hashing algo
@@ -758,8 +784,13 @@ class Stacktrace(Interface):
                 return []
 
         output = []
+        hits = 0
         for frame in frames:
-            output.extend(frame.get_hash(platform))
+            frame_output, cached = frame._get_hash(platform)
+            output.extend(frame_output)
+            hits += cached
+        metrics.incr('grouping.frame-hash.cache.hit', amount=hits)
+        metrics.incr('grouping.frame-hash.cache.miss', amount=len(frames) - hits)
         return output
 
     def to_string(self, event, is_public=False, **kwargs):
@@ -1,8 +1,25 @@
 from __future__ import absolute_import, print_function
 
+import errno
+import logging
+import os
+import time
+import uuid
+
+from libsourcemap import View
+from operator import itemgetter
+
+from sentry import options
+from sentry.utils import metrics
+from sentry.utils.datastructures import LRUCache
 from sentry.utils.strings import codec_lookup
 
-__all__ = ['SourceCache', 'SourceMapCache']
+__all__ = ['SourceCache', 'SourceMapCache', 'SourceMapViewCache']
+
+ONE_DAY = 60 * 60 * 24
+ONE_DAY_AND_A_HALF = int(ONE_DAY * 1.5)
+
+logger = logging.getLogger(__name__)
 
 
 class SourceCache(object):
@@ -99,3 +116,115 @@ class SourceMapCache(object):
             sourcemap = self.get(sourcemap_url)
             return (sourcemap_url, sourcemap)
         return (None, None)
+
+
+class SourceMapViewCache(object):
+    """
+    Keeps parsed sourcemap views around across events.
+
+    Views are stored in a per-process LRU bounded by the (approximate) size
+    of the parsed sourcemaps. Every parsed sourcemap is also serialized into
+    libsourcemap's MemDB format below ``sourcemaps.cache-path``, keyed by
+    the checksum of its contents, so that other workers on the same host can
+    memory map the index instead of decoding and parsing the JSON again.
+    """
+
+    def __init__(self, max_size):
+        self._views = LRUCache(max_size, weigher=itemgetter(1))
+
+    @property
+    def cache_path(self):
+        return options.get('sourcemaps.cache-path')
+
+    def get_index_path(self, checksum):
+        return os.path.join(self.cache_path, checksum[:2], checksum[2:])
+
+    def get(self, key, checksum, load):
+        """
+        Returns the view stored for ``key``. On a miss the view is read from
+        the serialized index matching ``checksum`` if one exists, otherwise
+        ``load`` is called to parse the sourcemap and its index is written.
+        """
+        rv = self._views.get(key)
+        if rv is not None:
+            metrics.incr('sourcemaps.view_cache.hit')
+            return rv[0]
+
+        path = self.get_index_path(checksum)
+        try:
+            view, size = View.from_memdb_file(path), self.try_bump_timestamp(path)
+        except Exception:
+            metrics.incr('sourcemaps.view_cache.miss')
+            view, size = self.store_index(path, load())
+        else:
+            metrics.incr('sourcemaps.view_cache.index_hit')
+
+        self._views.set(key, (view, size))
+        return view
+
+    def store_index(self, path, view):
+        """
+        Serializes ``view`` to ``path`` and returns the memory mapped view
+        along with its size. If the index cannot be written the given view is
+        returned unchanged.
+        """
+        memdb = view.dump_memdb()
+
+        try:
+            os.makedirs(os.path.dirname(path))
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                logger.warning('Unable to create sourcemap cache directory', exc_info=True)
+                return view, len(memdb)
+
+        suffix = '_%s' % uuid.uuid4()
+        done = False
+        try:
+            with open(path + suffix, 'wb') as f:
+                f.write(memdb)
+            os.rename(path + suffix, path)
+            done = True
+        except (IOError, OSError):
+            logger.warning('Unable to write sourcemap index', exc_info=True)
+            return view, len(memdb)
+        finally:
+            if not done:
+                try:
+                    os.remove(path + suffix)
+                except OSError:
+                    pass
+
+        return View.from_memdb_file(path), len(memdb)
+
+    def try_bump_timestamp(self, path):
+        stat = os.stat(path)
+        now = int(time.time())
+        if stat.st_mtime < now - ONE_DAY:
+            os.utime(path, (now, now))
+        return stat.st_size
+
+    def clear_old_entries(self):
+        try:
+            cache_folders = os.listdir(self.cache_path)
+        except OSError:
+            return
+
+        cutoff = int(time.time()) - ONE_DAY_AND_A_HALF
+
+        for cache_folder in cache_folders:
+            cache_folder = os.path.join(self.cache_path, cache_folder)
+            try:
+                items = os.listdir(cache_folder)
+            except OSError:
+                continue
+            for cached_file in items:
+                cached_file = os.path.join(cache_folder, cached_file)
+                try:
+                    mtime = os.path.getmtime(cached_file)
+                except OSError:
+                    continue
+                if mtime < cutoff:
+                    try:
+                        os.remove(cached_file)
+                    except OSError:
+                        pass
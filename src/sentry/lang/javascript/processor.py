@@ -33,7 +33,7 @@ from sentry.utils.http import is_valid_origin
 from sentry.utils import metrics
 from sentry.stacktraces import StacktraceProcessor
 
-from .cache import SourceCache, SourceMapCache
+from .cache import SourceCache, SourceMapCache, SourceMapViewCache
 
 # number of surrounding lines (on each side) to fetch
 LINES_OF_CONTEXT = 5
@@ -62,6 +62,10 @@ MAX_RESOURCE_FETCHES = 100
 
 logger = logging.getLogger(__name__)
 
+# parsed sourcemaps of release artifacts, shared by all events processed by
+# this worker
+sourcemap_views = SourceMapViewCache(settings.SENTRY_SOURCEMAP_VIEW_CACHE_SIZE)
+
 
 class UnparseableSourcemap(http.BadSource):
     error_type = EventError.JS_INVALID_SOURCEMAP
@@ -194,48 +198,73 @@ def discover_sourcemap(result):
     return sourcemap
 
 
-def fetch_release_file(filename, release, dist=None):
-    cache_key = 'releasefile:v1:%s:%s' % (release.id, md5_text(filename).hexdigest(), )
+def find_release_file(filename, release, dist=None):
+    dist_name = dist and dist.name or None
+    filename_choices = ReleaseFile.normalize(filename)
+    filename_idents = [ReleaseFile.get_ident(f, dist_name) for f in filename_choices]
+
+    logger.debug(
+        'Checking database for release artifact %r (release_id=%s)', filename, release.id
+    )
+
+    possible_files = list(
+        ReleaseFile.objects.filter(
+            release=release,
+            dist=dist,
+            ident__in=filename_idents,
+        ).select_related('file')
+    )
+
+    if len(possible_files) == 0:
+        logger.debug(
+            'Release artifact %r not found in database (release_id=%s)', filename, release.id
+        )
+        return None
+    elif len(possible_files) == 1:
+        return possible_files[0]
+
+    # Pick first one that matches in priority order.
+    # This is O(N*M) but there are only ever at most 4 things here
+    # so not really worth optimizing.
+    return next((
+        rf
+        for ident in filename_idents
+        for rf in possible_files
+        if rf.ident == ident
+    ))
+
+
+def fetch_release_file_checksum(filename, release, dist=None):
+    """
+    Returns the checksum of the contents of the release artifact matching
+    ``filename``, or ``None`` if there is no such artifact.
+    """
+    cache_key = 'releasefile:checksum:v1:%s:%s:%s' % (
+        release.id, dist and dist.id or '', md5_text(filename).hexdigest(),
+    )
 
-    logger.debug('Checking cache for release artifact %r (release_id=%s)', filename, release.id)
     result = cache.get(cache_key)
+    if result is None:
+        releasefile = find_release_file(filename, release, dist)
+        result = releasefile and releasefile.file.checksum or -1
+        cache.set(cache_key, result, 3600 if result != -1 else 60)
 
-    dist_name = dist and dist.name or None
+    if result == -1:
+        return None
+    return result
 
-    if result is None:
-        filename_choices = ReleaseFile.normalize(filename)
-        filename_idents = [ReleaseFile.get_ident(f, dist_name) for f in filename_choices]
 
-        logger.debug(
-            'Checking database for release artifact %r (release_id=%s)', filename, release.id
-        )
+def fetch_release_file(filename, release, dist=None):
+    cache_key = 'releasefile:v1:%s:%s' % (release.id, md5_text(filename).hexdigest(), )
 
-        possible_files = list(
-            ReleaseFile.objects.filter(
-                release=release,
-                dist=dist,
-                ident__in=filename_idents,
-            ).select_related('file')
-        )
+    logger.debug('Checking cache for release artifact %r (release_id=%s)', filename, release.id)
+    result = cache.get(cache_key)
 
-        if len(possible_files) == 0:
-            logger.debug(
-                'Release artifact %r not found in database (release_id=%s)', filename, release.id
-            )
+    if result is None:
+        releasefile = find_release_file(filename, release, dist)
+        if releasefile is None:
             cache.set(cache_key, -1, 60)
             return None
-        elif len(possible_files) == 1:
-            releasefile = possible_files[0]
-        else:
-            # Pick first one that matches in priority order.
-            # This is O(N*M) but there are only ever at most 4 things here
-            # so not really worth optimizing.
-            releasefile = next((
-                rf
-                for ident in filename_idents
-                for rf in possible_files
-                if rf.ident == ident
-            ))
 
         logger.debug(
             'Found release artifact %r (id=%s, release_id=%s)', filename, releasefile.id, release.id
@@ -386,10 +415,27 @@ def fetch_sourcemap(url, project=None, release=None, dist=None, allow_scraping=T
                 'reason': e.message,
             })
     else:
-        result = fetch_file(
-            url, project=project, release=release, dist=dist, allow_scraping=allow_scraping
-        )
-        body = result.body
+        def load():
+            result = fetch_file(
+                url, project=project, release=release, dist=dist, allow_scraping=allow_scraping
+            )
+            return parse_sourcemap(url, result.body)
+
+        # Sourcemaps uploaded as release artifacts never change for a given
+        # checksum, so their parsed views can be shared between events.
+        checksum = release and fetch_release_file_checksum(url, release, dist)
+        if checksum:
+            return sourcemap_views.get(
+                (release.id, dist and dist.id, url, checksum),
+                checksum,
+                load,
+            )
+        return load()
+
+    return parse_sourcemap(url, body)
+
+
+def parse_sourcemap(url, body):
     try:
         return view_from_json(body)
     except Exception as exc:
@@ -21,7 +21,7 @@ from django.db import models
 from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 
-from sentry import buffer, eventtypes, tagstore
+from sentry import buffer, eventtypes, search, tagstore
 from sentry.constants import (
     DEFAULT_LOGGER_NAME, EVENT_ORDERING_KEY, LOG_LEVELS, MAX_CULPRIT_LENGTH
 )
@@ -125,12 +125,15 @@ class GroupManager(BaseManager):
         project_id = group.project_id
         date = group.last_seen
 
+        pairs = []
         for tag_item in tags:
             if len(tag_item) == 2:
                 (key, value), data = tag_item, None
             else:
                 key, value, data = tag_item
 
+            pairs.append((key, value))
+
             tagstore.incr_times_seen(project_id, key, value, {
                 'last_seen': date,
                 'data': data,
@@ -149,6 +152,8 @@ class GroupManager(BaseManager):
                 }
             )
 
+        search.index_group_tags(project_id, group.id, pairs)
+
 
 class Group(Model):
     """
@@ -71,3 +71,28 @@ class GroupHash(Model):
             lambda result: result.value,
             results,
         )
+
+    @staticmethod
+    def get_cache_version(project_id):
+        """
+        Returns the current version of the hash to group mapping for a
+        project. In-process caches of that mapping tag their entries with
+        this version so they can be discarded once it changes.
+        """
+        key = 'grouphash-version:{}'.format(project_id)
+        client = redis.clusters.get('default').get_local_client_for_key(key)
+        return int(client.get(key) or 0)
+
+    @staticmethod
+    def bump_cache_version(project_id):
+        """
+        Invalidates all cached hash to group mappings for a project. This must
+        be called whenever the ``group`` or ``group_tombstone_id`` of existing
+        hashes is changed, or hashes are deleted.
+        """
+        key = 'grouphash-version:{}'.format(project_id)
+        client = redis.clusters.get('default').get_local_client_for_key(key)
+        with client.pipeline() as pipe:
+            pipe.incr(key)
+            pipe.expire(key, 60 * 60 * 24)
+            pipe.execute()
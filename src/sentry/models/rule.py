@@ -7,6 +7,8 @@ sentry.models.rule
 """
 from __future__ import absolute_import, print_function
 
+from uuid import uuid4
+
 from django.db import models
 from django.utils import timezone
 
@@ -50,28 +52,39 @@ class Rule(Model):
 
     __repr__ = sane_repr('project_id', 'label')
 
+    @staticmethod
+    def get_cache_key(project_id):
+        return 'project:{}:rules:v2'.format(project_id)
+
     @classmethod
     def get_for_project(cls, project_id):
-        cache_key = 'project:{}:rules'.format(project_id)
-        rules_list = cache.get(cache_key)
-        if rules_list is None:
-            rules_list = list(cls.objects.filter(
+        return cls.get_for_project_with_version(project_id)[1]
+
+    @classmethod
+    def get_for_project_with_version(cls, project_id):
+        """
+        Returns the active rules of a project along with a version, which
+        changes whenever the list is loaded again, so anything derived from
+        the list can be cached until the version changes.
+        """
+        cache_key = cls.get_cache_key(project_id)
+        result = cache.get(cache_key)
+        if result is None:
+            result = (uuid4().hex, list(cls.objects.filter(
                 project=project_id,
                 status=RuleStatus.ACTIVE,
-            ))
-            cache.set(cache_key, rules_list, 60)
-        return rules_list
+            )))
+            cache.set(cache_key, result, 60)
+        return result
 
     def delete(self, *args, **kwargs):
         rv = super(Rule, self).delete(*args, **kwargs)
-        cache_key = 'project:{}:rules'.format(self.project_id)
-        cache.delete(cache_key)
+        cache.delete(self.get_cache_key(self.project_id))
         return rv
 
     def save(self, *args, **kwargs):
         rv = super(Rule, self).save(*args, **kwargs)
-        cache_key = 'project:{}:rules'.format(self.project_id)
-        cache.delete(cache_key)
+        cache.delete(self.get_cache_key(self.project_id))
         return rv
 
     def get_audit_log_data(self):
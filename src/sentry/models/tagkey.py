@@ -13,6 +13,7 @@ from django.utils.translation import ugettext_lazy as _
 from sentry.tagstore import TagKeyStatus
 from sentry.constants import MAX_TAG_KEY_LENGTH, TAG_LABELS
 from sentry.db.models import (Model, BoundedPositiveIntegerField, sane_repr)
+from sentry.utils import redis
 
 
 class TagKey(Model):
@@ -50,3 +51,28 @@ class TagKey(Model):
         return {
             'key': self.key,
         }
+
+    @staticmethod
+    def get_cache_version(project_id):
+        """
+        Returns the current version of a project's tag keys and values.
+        In-process caches of those rows tag their entries with this version
+        so they can be discarded once it changes.
+        """
+        key = 'tagkey-version:{}'.format(project_id)
+        client = redis.clusters.get('default').get_local_client_for_key(key)
+        return int(client.get(key) or 0)
+
+    @staticmethod
+    def bump_cache_version(project_id):
+        """
+        Invalidates all cached tag keys and values for a project. This must be
+        called whenever tag keys are marked for deletion or deleted, along
+        with their values.
+        """
+        key = 'tagkey-version:{}'.format(project_id)
+        client = redis.clusters.get('default').get_local_client_for_key(key)
+        with client.pipeline() as pipe:
+            pipe.incr(key)
+            pipe.expire(key, 60 * 60 * 24)
+            pipe.execute()
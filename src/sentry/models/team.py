@@ -114,7 +114,7 @@ class Team(Model):
     )
     date_added = models.DateTimeField(default=timezone.now, null=True)
 
-    objects = TeamManager(cache_fields=('pk', 'slug', ))
+    objects = TeamManager(cache_fields=('pk', 'slug', ), local_cache=True)
 
     class Meta:
         app_label = 'sentry'
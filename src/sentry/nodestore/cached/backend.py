@@ -0,0 +1,191 @@
+"""
+sentry.nodestore.cached.backend
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+:copyright: (c) 2010-2017 by the Sentry Team, see AUTHORS for more details.
+:license: BSD, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import
+
+import logging
+import six
+import threading
+import weakref
+
+from sentry.nodestore.base import NodeStorage
+from sentry.utils import metrics
+from sentry.utils.compat import pickle
+from sentry.utils.datastructures import LRUCache
+from sentry.utils.imports import import_string
+
+__all__ = ('CachedNodeStorage', )
+
+logger = logging.getLogger(__name__)
+
+# ``NodeStorage`` instances are thread local, but the cache (and the set of
+# nodes that are being fetched) is shared by every thread of the process.
+_shared_state = weakref.WeakKeyDictionary()
+_shared_state_lock = threading.Lock()
+
+
+class SharedState(object):
+    def __init__(self, cache_size, cache_ttl):
+        # node id -> pickled node data, weighed by its size in bytes
+        self.cache = LRUCache(cache_size, ttl=cache_ttl, weigher=len)
+        # node id -> ``threading.Event`` set once its fetch has finished
+        self.pending = {}
+        self.lock = threading.Lock()
+
+
+class CachedNodeStorage(NodeStorage):
+    """
+    A backend which keeps recently read nodes in memory in front of another
+    backend.
+
+    Nodes are kept for at most ``cache_ttl`` seconds, and the cache holds at
+    most ``cache_size`` bytes of (pickled) node data. Nodes that are being
+    fetched by one thread are not fetched again by others at the same time,
+    they wait for the first fetch instead.
+
+    Writes and deletes only invalidate the cache of the current process, so
+    other processes can serve stale data for up to ``cache_ttl`` seconds.
+    This is fine for event payloads, which are not changed once stored.
+
+    >>> CachedNodeStorage(
+    >>>     backend=('sentry.nodestore.riak.backend.RiakNodeStorage', {
+    >>>         'nodes': [{'host': '127.0.0.1', 'port': 8098}],
+    >>>     }),
+    >>>     cache_size=50 * 1024 * 1024,
+    >>>     cache_ttl=60,
+    >>> )
+    """
+
+    # how long to wait for another thread to fetch a node before fetching
+    # it again
+    pending_timeout = 5
+
+    def __init__(self, backend, cache_size=50 * 1024 * 1024, cache_ttl=60, **kwargs):
+        backend, backend_options = backend
+        if isinstance(backend, six.string_types):
+            backend = import_string(backend)
+        self.backend = backend(**backend_options)
+
+        with _shared_state_lock:
+            self.state = _shared_state.get(self)
+            if self.state is None:
+                self.state = _shared_state[self] = SharedState(cache_size, cache_ttl)
+
+        super(CachedNodeStorage, self).__init__(**kwargs)
+
+    def validate(self):
+        self.backend.validate()
+
+    def _cache_get(self, id):
+        value = self.state.cache.get(id)
+        if value is None:
+            return None
+        # every caller gets its own copy, as node data is mutated when it's
+        # bound to an instance
+        return pickle.loads(value)
+
+    def _cache_set(self, id, data):
+        try:
+            value = pickle.dumps(data, pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            logger.warning('nodestore.cache.encode-failed', exc_info=True)
+            return
+        self.state.cache.set(id, value)
+
+    def get(self, id):
+        return self.get_multi([id]).get(id)
+
+    def get_multi(self, id_list):
+        state = self.state
+
+        results = {}
+        for id in id_list:
+            data = self._cache_get(id)
+            if data is not None:
+                results[id] = data
+
+        fetch, waiting = [], []
+        with state.lock:
+            for id in set(id_list) - set(results):
+                event = state.pending.get(id)
+                if event is not None:
+                    waiting.append((id, event))
+                    continue
+
+                # the node may have been fetched by another thread since it
+                # was looked up above
+                data = self._cache_get(id)
+                if data is not None:
+                    results[id] = data
+                else:
+                    state.pending[id] = threading.Event()
+                    fetch.append(id)
+        metrics.incr('nodestore.cache.hit', amount=len(results))
+        metrics.incr('nodestore.cache.miss', amount=len(fetch))
+        metrics.incr('nodestore.cache.coalesced', amount=len(waiting))
+
+        if fetch:
+            try:
+                fetched = self.backend.get_multi(fetch)
+                for id in fetch:
+                    data = fetched.get(id)
+                    results[id] = data
+                    if data is not None:
+                        self._cache_set(id, data)
+            finally:
+                with state.lock:
+                    for id in fetch:
+                        state.pending.pop(id).set()
+
+        # Nodes fetched by another thread are read from the cache once that
+        # fetch has finished. If it failed (or the node doesn't exist) they
+        # are fetched here instead.
+        missing = []
+        for id, event in waiting:
+            event.wait(self.pending_timeout)
+            data = self._cache_get(id)
+            if data is None:
+                missing.append(id)
+            else:
+                results[id] = data
+        if missing:
+            results.update(self.backend.get_multi(missing))
+
+        return results
+
+    def set(self, id, data):
+        try:
+            self.backend.set(id, data)
+        finally:
+            self.state.cache.delete(id)
+
+    def set_multi(self, values):
+        try:
+            self.backend.set_multi(values)
+        finally:
+            for id in values:
+                self.state.cache.delete(id)
+
+    def delete(self, id):
+        try:
+            self.backend.delete(id)
+        finally:
+            self.state.cache.delete(id)
+
+    def delete_multi(self, id_list):
+        try:
+            self.backend.delete_multi(id_list)
+        finally:
+            for id in id_list:
+                self.state.cache.delete(id)
+
+    def cleanup(self, cutoff_timestamp):
+        try:
+            self.backend.cleanup(cutoff_timestamp)
+        finally:
+            self.state.cache.clear()
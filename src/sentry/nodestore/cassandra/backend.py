@@ -50,5 +50,11 @@ class CassandraNodeStorage(NodeStorage):
     def get_multi(self, id_list):
         return self.connection.get_multi(id_list)
 
+    def delete_multi(self, id_list):
+        self.connection.delete_multi(id_list)
+
     def set(self, id, data):
         self.connection.set(id, data)
+
+    def set_multi(self, values):
+        self.connection.set_multi(values)
@@ -9,7 +9,9 @@ sentry.nodestore.django.backend
 from __future__ import absolute_import
 
 import math
+import six
 
+from django.db import IntegrityError, router, transaction
 from django.utils import timezone
 
 from sentry.db.models import create_or_update
@@ -44,6 +46,25 @@ class DjangoNodeStorage(NodeStorage):
             },
         )
 
+    def set_multi(self, values):
+        # Nodes are almost always new, so try to write all of them with a
+        # single multi-row insert and only fall back to updating them one at a
+        # time if some of them exist already.
+        if len(values) > 1:
+            timestamp = timezone.now()
+            try:
+                with transaction.atomic(using=router.db_for_write(Node)):
+                    Node.objects.bulk_create([
+                        Node(id=id, data=data, timestamp=timestamp)
+                        for id, data in six.iteritems(values)
+                    ])
+            except IntegrityError:
+                pass
+            else:
+                return
+
+        super(DjangoNodeStorage, self).set_multi(values)
+
     def cleanup(self, cutoff_timestamp):
         from sentry.db.deletion import BulkDeleteQuery
 
@@ -12,6 +12,8 @@ import random
 
 import six
 
+from concurrent.futures import ThreadPoolExecutor, wait
+
 from sentry.nodestore.base import NodeStorage
 from sentry.utils.imports import import_string
 
@@ -24,6 +26,10 @@ class MultiNodeStorage(NodeStorage):
     This is not intended for consistency, but is instead designed to allow you
     to dual-write for purposes of migrations.
 
+    Writes are sent to all backends concurrently from a thread pool (with one
+    thread per backend), so backends must not rely on state bound to the
+    calling thread, such as an open database transaction.
+
     >>> MultiNodeStorage(backends=[
     >>>     ('sentry.nodestore.django.backend.DjangoNodeStorage', {}),
     >>>     ('sentry.nodestore.riak.backend.RiakNodeStorage', {}),
@@ -39,8 +45,25 @@ class MultiNodeStorage(NodeStorage):
                 backend = import_string(backend)
             self.backends.append(backend(**backend_options))
         self.read_selector = read_selector
+        self.executor = ThreadPoolExecutor(max_workers=len(self.backends))
         super(MultiNodeStorage, self).__init__(**kwargs)
 
+    def _call_backends(self, method, *args, **kwargs):
+        """
+        Calls ``method`` on every backend concurrently. If any of them fail,
+        the first error is raised once all of them have finished.
+        """
+        if len(self.backends) == 1:
+            return getattr(self.backends[0], method)(*args, **kwargs)
+
+        futures = [
+            self.executor.submit(getattr(backend, method), *args, **kwargs)
+            for backend in self.backends
+        ]
+        wait(futures)
+        for future in futures:
+            future.result()
+
     def get(self, id):
         # just fetch it from a random backend, we're not aiming for consistency
         backend = self.read_selector(self.backends)
@@ -51,45 +74,16 @@ class MultiNodeStorage(NodeStorage):
         return backend.get_multi(id_list=id_list)
 
     def set(self, id, data):
-        should_raise = False
-        for backend in self.backends:
-            try:
-                backend.set(id, data)
-            except Exception:
-                should_raise = True
-
-        if should_raise:
-            raise
+        self._call_backends('set', id, data)
 
     def set_multi(self, values):
-        should_raise = False
-        for backend in self.backends:
-            try:
-                backend.set_multi(values)
-            except Exception:
-                should_raise = True
-
-        if should_raise:
-            raise
+        self._call_backends('set_multi', values)
 
     def delete(self, id):
-        should_raise = False
-        for backend in self.backends:
-            try:
-                backend.delete(id)
-            except Exception:
-                should_raise = True
+        self._call_backends('delete', id)
 
-        if should_raise:
-            raise
+    def delete_multi(self, id_list):
+        self._call_backends('delete_multi', id_list)
 
     def cleanup(self, cutoff_timestamp):
-        should_raise = False
-        for backend in self.backends:
-            try:
-                backend.cleanup(cutoff_timestamp)
-            except Exception:
-                should_raise = True
-
-        if should_raise:
-            raise
+        self._call_backends('cleanup', cutoff_timestamp)
@@ -67,9 +67,25 @@ class RiakNodeStorage(NodeStorage):
     def set(self, id, data):
         self.conn.put(self.bucket, id, json_dumps(data), returnbody='false')
 
+    def set_multi(self, values):
+        rv = self.conn.multiput(
+            self.bucket,
+            {id: json_dumps(data) for id, data in six.iteritems(values)},
+            returnbody='false',
+        )
+        for value in six.itervalues(rv):
+            if isinstance(value, Exception):
+                six.reraise(type(value), value)
+
     def delete(self, id):
         self.conn.delete(self.bucket, id)
 
+    def delete_multi(self, id_list):
+        rv = self.conn.multidelete(self.bucket, id_list)
+        for value in six.itervalues(rv):
+            if isinstance(value, Exception):
+                six.reraise(type(value), value)
+
     def get(self, id):
         rv = self.conn.get(self.bucket, id, r=1)
         if rv.status != 200:
@@ -128,9 +128,44 @@ class RiakClient(object):
         Thread-safe multiget implementation that shares the same thread pool
         for all requests.
         """
-        # Each request is paired with a thread.Event to signal when it is finished
-        requests = [(key, self.build_url(bucket, key, kwargs), Event()) for key in keys]
+        return self._multi(
+            (key, ('GET', self.build_url(bucket, key, kwargs)), {
+                'headers': headers,
+            }) for key in keys
+        )
+
+    def multiput(self, bucket, items, headers=None, **kwargs):
+        """
+        Stores every ``key -> data`` item of ``items`` concurrently, sharing
+        the same thread pool as ``multiget``.
+        """
+        if headers is None:
+            headers = {}
+        headers['content-type'] = 'application/json'
+
+        return self._multi(
+            (key, ('PUT', self.build_url(bucket, key, kwargs)), {
+                'headers': headers,
+                'body': data,
+            }) for key, data in six.iteritems(items)
+        )
+
+    def multidelete(self, bucket, keys, headers=None, **kwargs):
+        """
+        Deletes every key of ``keys`` concurrently, sharing the same thread
+        pool as ``multiget``.
+        """
+        return self._multi(
+            (key, ('DELETE', self.build_url(bucket, key, kwargs)), {
+                'headers': headers,
+            }) for key in keys
+        )
 
+    def _multi(self, requests):
+        """
+        Runs ``(key, args, kwargs)`` requests on the thread pool and returns a
+        mapping of each key to its response (or the exception it raised.)
+        """
         results = {}
 
         def callback(key, event, rv):
@@ -138,14 +173,16 @@ class RiakClient(object):
             # Signal that this request is finished
             event.set()
 
-        for key, url, event in requests:
+        # Each request is paired with a thread.Event to signal when it is finished
+        events = []
+        for key, args, kwargs in requests:
+            event = Event()
+            events.append(event)
             self.pool.submit(
                 (
                     self.manager.urlopen,  # func
-                    ('GET', url),  # args
-                    {
-                        'headers': headers
-                    },  # kwargs
+                    args,  # args
+                    kwargs,  # kwargs
                     functools.partial(
                         callback,
                         key,
@@ -155,7 +192,7 @@ class RiakClient(object):
             )
 
         # Now we wait for all of the callbacks to be finished
-        for _, _, event in requests:
+        for event in events:
             event.wait()
 
         return results
@@ -56,6 +56,9 @@ register('redis.options', type=Dict, flags=FLAG_NOSTORE)
 # symbolizer specifics
 register('dsym.cache-path', type=String, default='/tmp/sentry-dsym-cache')
 
+# javascript specifics
+register('sourcemaps.cache-path', type=String, default='/tmp/sentry-sourcemap-cache')
+
 # Mail
 register('mail.backend', default='smtp', flags=FLAG_NOSTORE)
 register('mail.host', default='localhost', flags=FLAG_REQUIRED | FLAG_PRIORITIZE_DISK)
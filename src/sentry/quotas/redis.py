@@ -9,14 +9,17 @@ from __future__ import absolute_import
 
 import functools
 import six
+import threading
 
 from time import time
 
 from sentry.exceptions import InvalidConfiguration
 from sentry.quotas.base import NotRateLimited, Quota, RateLimited
+from sentry.utils.datastructures import LRUCache
 from sentry.utils.redis import get_cluster_from_options, load_script
 
 is_rate_limited = load_script('quotas/is_rate_limited.lua')
+lease = load_script('quotas/lease.lua')
 
 
 class BasicRedisQuota(object):
@@ -42,8 +45,22 @@ class RedisQuota(Quota):
 
     def __init__(self, **options):
         self.cluster, options = get_cluster_from_options('SENTRY_QUOTA_OPTIONS', options)
+        #: The fraction of the smallest applicable limit that is reserved in
+        #: Redis at once and then admitted locally by this process. Leased
+        #: items which are not used by the end of the window are lost, so each
+        #: process may reject up to this fraction of a limit too early. A
+        #: fraction of zero checks every item against Redis.
+        self.lease_fraction = float(options.pop('lease_fraction', 0))
+        #: The number of distinct quota combinations for which rejections and
+        #: leases are remembered.
+        cache_size = options.pop('cache_size', 10000)
         super(RedisQuota, self).__init__(**options)
         self.namespace = 'quota'
+        # Enforced rejections stay in effect until the quota window which
+        # caused them ends, so there's no need to ask Redis again before then.
+        self.rejections = LRUCache(cache_size)
+        self.leases = LRUCache(cache_size)
+        self.lease_lock = threading.Lock()
 
     def validate(self):
         try:
@@ -140,6 +157,14 @@ class RedisQuota(Quota):
         if not quotas:
             return NotRateLimited()
 
+        cache_key = tuple((q.key, q.limit, q.window, q.enforce) for q in quotas)
+        rejection = self.rejections.get(cache_key)
+        if rejection is not None and timestamp < rejection[0]:
+            return RateLimited(
+                retry_after=rejection[0] - timestamp,
+                reason_code=rejection[1],
+            )
+
         def get_next_period_start(interval, shift):
             """Return the timestamp when the next rate limit period begins for an interval."""
             return (((timestamp - shift) // interval) + 1) * interval + shift
@@ -152,8 +177,21 @@ class RedisQuota(Quota):
             expiry = get_next_period_start(quota.window, shift) + self.grace
             args.extend((quota.limit, int(expiry)))
 
+        if self.lease_fraction > 0 and self.__take_lease(cache_key, keys):
+            return NotRateLimited()
+
         client = self.cluster.get_local_client_for_key(six.text_type(project.organization.pk))
-        rejections = is_rate_limited(client, keys, args)
+        if self.lease_fraction > 0:
+            amount = max(1, int(min(q.limit for q in quotas) * self.lease_fraction))
+            result = lease(client, keys, [amount] + args)
+            granted, rejections = int(result[0]), result[1:]
+            if granted:
+                if granted > 1:
+                    self.leases.set(cache_key, [tuple(keys), granted - 1])
+                return NotRateLimited()
+        else:
+            rejections = is_rate_limited(client, keys, args)
+
         if any(rejections):
             enforce = False
             worst_case = (0, None)
@@ -167,8 +205,21 @@ class RedisQuota(Quota):
                     if delay > worst_case[0]:
                         worst_case = (delay, quota.reason_code)
             if enforce:
+                self.rejections.set(cache_key, (timestamp + worst_case[0], worst_case[1]))
                 return RateLimited(
                     retry_after=worst_case[0],
                     reason_code=worst_case[1],
                 )
         return NotRateLimited()
+
+    def __take_lease(self, cache_key, keys):
+        """
+        Admits an item from the local lease for these quotas, if there is one
+        left for the current windows.
+        """
+        with self.lease_lock:
+            held = self.leases.get(cache_key)
+            if held is None or held[0] != tuple(keys) or held[1] <= 0:
+                return False
+            held[1] -= 1
+            return True
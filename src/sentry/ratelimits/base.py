@@ -4,9 +4,20 @@ from sentry.utils.services import Service
 
 
 class RateLimiter(Service):
-    __all__ = ('is_limited', 'validate')
+    __all__ = ('is_limited', 'is_limited_many', 'validate')
 
     window = 60
 
     def is_limited(self, key, limit, project=None, window=None):
         return False
+
+    def is_limited_many(self, limits, project=None):
+        """
+        Checks several ``(key, limit, window)`` tuples at once, returning
+        whether any of them is exceeded. A ``window`` of ``None`` uses the
+        default window.
+        """
+        return any(
+            self.is_limited(key, limit, project=project, window=window)
+            for key, limit, window in limits
+        )
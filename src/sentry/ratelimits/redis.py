@@ -7,7 +7,9 @@ from time import time
 from sentry.exceptions import InvalidConfiguration
 from sentry.ratelimits.base import RateLimiter
 from sentry.utils.hashlib import md5_text
-from sentry.utils.redis import get_cluster_from_options
+from sentry.utils.redis import get_cluster_from_options, load_script
+
+is_limited = load_script('ratelimits/is_limited.lua')
 
 
 class RedisRateLimiter(RateLimiter):
@@ -24,19 +26,38 @@ class RedisRateLimiter(RateLimiter):
             raise InvalidConfiguration(six.text_type(e))
 
     def is_limited(self, key, limit, project=None, window=None):
-        if window is None:
-            window = self.window
-
-        key_hex = md5_text(key).hexdigest()
-        bucket = int(time() / window)
-
-        if project:
-            key = 'rl:%s:%s:%s' % (key_hex, project.id, bucket)
-        else:
-            key = 'rl:%s:%s' % (key_hex, bucket)
-
-        with self.cluster.map() as client:
-            result = client.incr(key)
-            client.expire(key, window)
-
-        return result.value > limit
+        return self.is_limited_many([(key, limit, window)], project=project)
+
+    def is_limited_many(self, limits, project=None):
+        """
+        Checks all ``limits`` with a single script on the host of the first
+        one. The action is only counted against them if none is exceeded.
+        """
+        if not limits:
+            return False
+
+        now = time()
+        routing_key = None
+        keys = []
+        args = []
+        for key, limit, window in limits:
+            if window is None:
+                window = self.window
+
+            key_hex = md5_text(key).hexdigest()
+            if project:
+                prefix = 'rl:%s:%s' % (key_hex, project.id)
+            else:
+                prefix = 'rl:%s' % (key_hex, )
+            if routing_key is None:
+                routing_key = prefix
+
+            bucket = int(now / window)
+            keys.extend(('%s:%s' % (prefix, bucket), '%s:%s' % (prefix, bucket - 1)))
+            # the share of the previous window still covered by the sliding one
+            weight = 1 - (now - bucket * window) / float(window)
+            # the counter has to outlive the window after it
+            args.extend((limit, repr(weight), int(window * 2)))
+
+        client = self.cluster.get_local_client_for_key(routing_key)
+        return any(is_limited(client, keys, args))
@@ -114,3 +114,6 @@ class EventState(object):
         self.is_new = is_new
         self.is_regression = is_regression
         self.is_sample = is_sample,
+        # results shared by all conditions evaluated for the same event, so
+        # that lookups (such as event frequencies) only run once per event
+        self.cache = {}
@@ -57,7 +57,13 @@ class BaseEventFrequencyCondition(EventCondition):
         if not interval:
             return False
 
-        current_value = self.get_rate(event, interval)
+        # Rules that share a condition type and interval only look the rate
+        # up once per event.
+        cache_key = (type(self), event.group_id, interval)
+        try:
+            current_value = state.cache[cache_key]
+        except KeyError:
+            current_value = state.cache[cache_key] = self.get_rate(event, interval)
 
         return current_value > value
 
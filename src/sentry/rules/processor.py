@@ -1,17 +1,35 @@
 from __future__ import absolute_import
 
 import logging
+import six
 
 from collections import defaultdict, namedtuple
 from datetime import timedelta
 from django.utils import timezone
 
+from sentry import tagstore
 from sentry.models import GroupRuleStatus, Rule
 from sentry.rules import EventState, rules
+from sentry.rules.conditions.first_seen_event import FirstSeenEventCondition
+from sentry.rules.conditions.level import LevelCondition
+from sentry.rules.conditions.regression_event import RegressionEventCondition
+from sentry.rules.conditions.tagged_event import (
+    MatchType as TagMatchType, TaggedEventCondition
+)
+from sentry.utils import metrics
+from sentry.utils.datastructures import LRUCache
 from sentry.utils.safe import safe_execute
 
 RuleFuture = namedtuple('RuleFuture', ['rule', 'kwargs'])
 
+# project_id -> (rules version, RulePlan)
+plan_cache = LRUCache(1000)
+
+# tag matches which can only pass if the event has the tag at all
+POSITIVE_TAG_MATCHES = frozenset([
+    TagMatchType.EQUAL, TagMatchType.STARTS_WITH, TagMatchType.ENDS_WITH, TagMatchType.CONTAINS,
+])
+
 
 # TODO(dcramer): come up with a clean way to kill this either by renaming
 # the Event.message attribute or updating all plugins (former is better)
@@ -33,6 +51,97 @@ class EventCompatibilityProxy(object):
         return self._event.get_legacy_message()
 
 
+def get_guard(condition_cls, data):
+    """
+    Returns a key describing what an event has to look like for a condition
+    to pass (a guard), or ``None`` if the condition can't be indexed.
+    """
+    # subclasses may override ``passes``, so only the exact classes are indexed
+    if condition_cls is FirstSeenEventCondition:
+        return ('state', 'is_new')
+    if condition_cls is RegressionEventCondition:
+        return ('state', 'is_regression')
+    if condition_cls is LevelCondition:
+        if data.get('level') and data.get('match'):
+            return ('level', data['match'], data['level'])
+        return ('never', )
+    if condition_cls is TaggedEventCondition:
+        if not (data.get('key') and data.get('match') and data.get('value')):
+            return ('never', )
+        if data['match'] in POSITIVE_TAG_MATCHES:
+            return ('tag', data['key'].lower())
+    return None
+
+
+class RulePlan(object):
+    """
+    The active rules of a project, indexed by the conditions which are cheap
+    to check up front.
+
+    Rules that only match if all of their conditions pass are indexed by
+    their first condition that has a guard (see ``get_guard``), and are
+    skipped for events that don't satisfy it. All other rules are always
+    evaluated. Rules without conditions never match and are left out.
+    """
+
+    def __init__(self, rule_list):
+        self.rules = []
+        self.unguarded = []
+        self.guarded = defaultdict(list)
+
+        for rule in rule_list:
+            condition_list = rule.data.get('conditions', ())
+            if not condition_list:
+                continue
+
+            index = len(self.rules)
+            self.rules.append(rule)
+
+            guard = None
+            match = rule.data.get('action_match') or Rule.DEFAULT_ACTION_MATCH
+            if match == 'all':
+                for condition in condition_list:
+                    condition_cls = rules.get(condition['id'])
+                    if condition_cls is not None:
+                        guard = get_guard(condition_cls, condition)
+                        if guard is not None:
+                            break
+
+            if guard is None:
+                self.unguarded.append(index)
+            else:
+                self.guarded[guard].append(index)
+
+    def __len__(self):
+        return len(self.rules)
+
+    def check_guard(self, guard, event, state):
+        kind = guard[0]
+        if kind == 'state':
+            return getattr(state, guard[1])
+        if kind == 'level':
+            condition = LevelCondition(None, data={'match': guard[1], 'level': guard[2]})
+            return condition.passes(event, state)
+        if kind == 'tag':
+            key = guard[1]
+            return any(
+                k.lower() == key or tagstore.get_standardized_key(k) == key
+                for k, _ in event.get_tags()
+            )
+        return False
+
+    def get_candidates(self, event, state):
+        """
+        Returns the rules which might match the event, in their original
+        order.
+        """
+        indexes = list(self.unguarded)
+        for guard, guarded in six.iteritems(self.guarded):
+            if self.check_guard(guard, event, state):
+                indexes.extend(guarded)
+        return [self.rules[i] for i in sorted(indexes)]
+
+
 class RuleProcessor(object):
     logger = logging.getLogger('sentry.rules')
 
@@ -51,6 +160,32 @@ class RuleProcessor(object):
     def get_rules(self):
         return Rule.get_for_project(self.project.id)
 
+    def get_plan(self):
+        version, rule_list = Rule.get_for_project_with_version(self.project.id)
+        cached = plan_cache.get(self.project.id)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        plan = RulePlan(rule_list)
+        plan_cache.set(self.project.id, (version, plan))
+        return plan
+
+    def get_rule_statuses(self, rule_list):
+        """
+        Returns the existing ``GroupRuleStatus`` of each rule by rule id. Rows
+        are only created once a rule fires (see ``get_rule_status``.)
+        """
+        if not rule_list:
+            return {}
+
+        return {
+            status.rule_id: status
+            for status in GroupRuleStatus.objects.filter(
+                group=self.group,
+                rule__in=[rule.id for rule in rule_list],
+            )
+        }
+
     def get_rule_status(self, rule):
         rule_status, _ = GroupRuleStatus.objects.get_or_create(
             rule=rule,
@@ -78,7 +213,13 @@ class RuleProcessor(object):
             is_sample=self.is_sample,
         )
 
-    def apply_rule(self, rule):
+    def apply_rule(self, rule, status=None, state=None):
+        """
+        Evaluates ``rule`` against the event. ``status`` is the rule's
+        existing ``GroupRuleStatus`` for the group, if there is one, and
+        ``state`` is the ``EventState`` shared by all rules evaluated for the
+        event.
+        """
         match = rule.data.get('action_match') or Rule.DEFAULT_ACTION_MATCH
         condition_list = rule.data.get('conditions', ())
         frequency = rule.data.get('frequency') or Rule.DEFAULT_FREQUENCY
@@ -88,15 +229,14 @@ class RuleProcessor(object):
         if not condition_list:
             return
 
-        status = self.get_rule_status(rule)
-
         now = timezone.now()
         freq_offset = now - timedelta(minutes=frequency)
 
-        if status.last_active and status.last_active > freq_offset:
+        if status is not None and status.last_active and status.last_active > freq_offset:
             return
 
-        state = self.get_state()
+        if state is None:
+            state = self.get_state()
 
         condition_iter = (self.condition_matches(c, state, rule) for c in condition_list)
 
@@ -111,6 +251,8 @@ class RuleProcessor(object):
             return
 
         if passed:
+            if status is None:
+                status = self.get_rule_status(rule)
             passed = GroupRuleStatus.objects.filter(
                 id=status.id,
             ).exclude(
@@ -140,6 +282,14 @@ class RuleProcessor(object):
 
     def apply(self):
         self.futures_by_cb = defaultdict(list)
-        for rule in self.get_rules():
-            self.apply_rule(rule)
+
+        state = self.get_state()
+        plan = self.get_plan()
+        rule_list = plan.get_candidates(self.event, state)
+        metrics.timing('rules.candidates', len(rule_list))
+        metrics.timing('rules.skipped', len(plan) - len(rule_list))
+
+        statuses = self.get_rule_statuses(rule_list)
+        for rule in rule_list:
+            self.apply_rule(rule, statuses.get(rule.id), state)
         return list(self.futures_by_cb.items())
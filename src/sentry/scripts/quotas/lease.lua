@@ -0,0 +1,45 @@
+-- Reserve a number of items against a collection of quota counters at once.
+-- Values provided as ``KEYS`` specify the keys of the counters to check. The
+-- first value provided as ``ARGV`` is the number of items requested, followed
+-- by the maximum value (quota limit) and expiration time for each key.
+--
+-- For example, to request a lease of 5 items against a quota ``foo`` that has
+-- a limit of 10 items and a quota ``bar`` that has a limit of 20 items, both
+-- expiring at the Unix timestamp ``100``, the ``KEYS`` and ``ARGV`` values
+-- would be as follows:
+--
+--   KEYS = {"foo", "bar"}
+--   ARGV = {5, 10, 100, 20, 100}
+--
+-- The number of items granted is the amount requested, capped by the
+-- remaining capacity of the fullest quota. If it is not zero, the counters for
+-- all quotas are incremented by that amount. The result is a Lua table/array
+-- (Redis multi bulk reply) where the first value is the number of items
+-- granted, followed by whether or not a single item would have been *rejected*
+-- by each quota, in the same form as ``is_rate_limited.lua``.
+assert(#KEYS * 2 + 1 == #ARGV, "incorrect number of keys and arguments provided")
+
+local granted = tonumber(ARGV[1])
+local results = {}
+for i=1,#KEYS do
+    local limit = tonumber(ARGV[i * 2])
+    local remaining = limit - (redis.call('GET', KEYS[i]) or 0)
+    results[i + 1] = remaining < 1
+    if remaining < granted then
+        granted = remaining
+    end
+end
+
+if granted < 0 then
+    granted = 0
+end
+results[1] = granted
+
+if granted > 0 then
+    for i=1,#KEYS do
+        redis.call('INCRBY', KEYS[i], granted)
+        redis.call('EXPIREAT', KEYS[i], ARGV[i * 2 + 1])
+    end
+end
+
+return results
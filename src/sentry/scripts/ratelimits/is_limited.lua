@@ -0,0 +1,47 @@
+-- Check a collection of sliding window rate limits to identify if an action
+-- should be rate limited. Each limit is approximated with two fixed window
+-- counters: the one for the current window and the one for the window before
+-- it, whose count is weighted by how much of it still overlaps the sliding
+-- window. This avoids letting through twice the limit around window edges.
+--
+-- Values provided as ``KEYS`` specify the keys of the current and previous
+-- counters for each limit, and values provided as ``ARGV`` specify the limit,
+-- the weight of the previous counter and the TTL (in seconds) of the current
+-- counter for each limit.
+--
+-- For example, to check a limit of 10 actions per minute a quarter of the way
+-- into the window starting at ``100``, as well as a limit of 100 actions per
+-- hour, the ``KEYS`` and ``ARGV`` values would be as follows:
+--
+--   KEYS = {"foo:100", "foo:99", "bar:1", "bar:0"}
+--   ARGV = {10, 0.75, 120, 100, 0.99, 7200}
+--
+-- If all checks pass (the action is accepted), the current counters for all
+-- limits are incremented. If any checks fail (the action is rejected), the
+-- counters for all limits are unaffected. The result is a Lua table/array
+-- (Redis multi bulk reply) that specifies whether or not the action was
+-- *rejected* by each limit.
+assert(#KEYS == #ARGV / 3 * 2, "incorrect number of keys and arguments provided")
+
+local results = {}
+local failed = false
+for i=1,#KEYS / 2 do
+    local limit = tonumber(ARGV[(i * 3) - 2])
+    local weight = tonumber(ARGV[(i * 3) - 1])
+    local current = tonumber(redis.call('GET', KEYS[(i * 2) - 1]) or 0)
+    local previous = tonumber(redis.call('GET', KEYS[i * 2]) or 0)
+    local rejected = previous * weight + current + 1 > limit
+    if rejected then
+        failed = true
+    end
+    results[i] = rejected
+end
+
+if not failed then
+    for i=1,#KEYS / 2 do
+        redis.call('INCR', KEYS[(i * 2) - 1])
+        redis.call('EXPIRE', KEYS[(i * 2) - 1], ARGV[i * 3])
+    end
+end
+
+return results
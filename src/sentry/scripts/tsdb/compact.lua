@@ -0,0 +1,28 @@
+-- Fold the counters of a bucket of the finest rollup into a counter hash of
+-- a coarser rollup.
+--
+-- The value provided as ``KEYS`` is the target hash key. The values provided
+-- as ``ARGV`` are the bucket being folded, the expiration timestamp of the
+-- target hash, followed by field and count pairs.
+--
+-- The last bucket that has been folded into the target hash is stored in the
+-- hash itself, so that a bucket is never folded into the same hash twice.
+-- Buckets are folded in increasing order, which allows compaction to be
+-- restarted from its watermark after a failure without counting any value
+-- more than once.
+--
+-- Returns 1 if the bucket was folded, or 0 if it had been folded already.
+local marker = '_compacted'
+local bucket = tonumber(ARGV[1])
+
+local last = redis.call('HGET', KEYS[1], marker)
+if last and tonumber(last) >= bucket then
+    return 0
+end
+
+for i = 3, #ARGV, 2 do
+    redis.call('HINCRBY', KEYS[1], ARGV[i], ARGV[i + 1])
+end
+redis.call('HSET', KEYS[1], marker, bucket)
+redis.call('EXPIREAT', KEYS[1], ARGV[2])
+return 1
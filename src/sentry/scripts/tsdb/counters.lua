@@ -0,0 +1,37 @@
+-- Sum a collection of counter hash fields into a fixed number of output slots.
+-- Values provided as ``KEYS`` specify the hash keys to read from. The first
+-- value provided as ``ARGV`` is the number of output slots, followed by the
+-- hash field to read and the (zero based) slot to add the value to for each
+-- key.
+--
+-- For example, to sum the field ``1`` of the hashes ``foo`` and ``bar`` into
+-- the first slot, and the field ``2`` of the hash ``foo`` into the second
+-- slot, the ``KEYS`` and ``ARGV`` values would be as follows:
+--
+--   KEYS = {"foo", "bar", "foo"}
+--   ARGV = {2, 1, 0, 1, 0, 2, 1}
+--
+-- The result is a string containing the total of every slot, packed as little
+-- endian signed 64-bit integers, so that large ranges can be transferred and
+-- decoded without building a reply element for every value.
+local slots = tonumber(ARGV[1])
+assert(#KEYS * 2 + 1 == #ARGV, "incorrect number of keys and arguments provided")
+
+local totals = {}
+for i = 1, slots do
+    totals[i] = 0
+end
+
+for i, key in ipairs(KEYS) do
+    local value = redis.call('HGET', key, ARGV[i * 2])
+    if value then
+        local slot = tonumber(ARGV[i * 2 + 1]) + 1
+        totals[slot] = totals[slot] + tonumber(value)
+    end
+end
+
+local result = {}
+for i = 1, slots do
+    result[i] = struct.pack('<i8', totals[i])
+end
+return table.concat(result)
@@ -15,7 +15,7 @@ EMPTY = object()
 
 
 class SearchBackend(Service):
-    __all__ = ('query', 'validate')
+    __all__ = ('query', 'index_group_tags', 'reset_tag_index', 'validate')
 
     def __init__(self, **options):
         pass
@@ -46,3 +46,16 @@ class SearchBackend(Service):
         CursorResult.
         """
         raise NotImplementedError
+
+    def index_group_tags(self, project_id, group_id, tags):
+        """
+        Record that the group has been seen with the given ``(key, value)``
+        tag pairs, for backends that maintain their own tag index.
+        """
+
+    def reset_tag_index(self, project_id):
+        """
+        Discard the tag index of a project after tag data has been removed
+        or moved between groups, for backends that maintain their own tag
+        index.
+        """
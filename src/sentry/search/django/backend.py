@@ -11,6 +11,8 @@ from __future__ import absolute_import
 import six
 from django.db import router
 from django.db.models import Q
+from operator import or_
+from six.moves import reduce
 
 from sentry.api.paginator import DateTimePaginator, Paginator
 from sentry.search.base import ANY, EMPTY, SearchBackend
@@ -20,6 +22,9 @@ from sentry.search.django.constants import (
 )
 from sentry.utils.db import get_db_engine
 
+# Some databases (such as Oracle) limit the number of items in an IN list.
+MAX_IN_LIST_SIZE = 1000
+
 
 class DjangoSearchBackend(SearchBackend):
     def _tags_to_filter(self, project, tags):
@@ -160,9 +165,11 @@ class DjangoSearchBackend(SearchBackend):
             matches = self._tags_to_filter(project, tags)
             if not matches:
                 return queryset.none()
-            queryset = queryset.filter(
-                id__in=matches,
-            )
+            # Large sets of matches are split into several lists.
+            queryset = queryset.filter(reduce(or_, [
+                Q(id__in=matches[i:i + MAX_IN_LIST_SIZE])
+                for i in range(0, len(matches), MAX_IN_LIST_SIZE)
+            ]))
 
         if age_from or age_to:
             params = {}
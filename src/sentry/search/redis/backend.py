@@ -0,0 +1,200 @@
+"""
+sentry.search.redis.backend
+~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+:copyright: (c) 2010-2017 by the Sentry Team, see AUTHORS for more details.
+:license: BSD, see LICENSE for more details.
+"""
+from __future__ import absolute_import
+
+import logging
+import six
+import time
+import uuid
+
+from sentry.exceptions import InvalidConfiguration
+from sentry.search.base import ANY, EMPTY
+from sentry.search.django.backend import DjangoSearchBackend
+from sentry.utils import metrics
+from sentry.utils.datastructures import LRUCache
+from sentry.utils.hashlib import md5_text
+from sentry.utils.redis import get_cluster_from_options
+
+__all__ = ('RedisSearchBackend', )
+
+logger = logging.getLogger(__name__)
+
+
+class RedisSearchBackend(DjangoSearchBackend):
+    """
+    Extends the Django search backend with an inverted tag index stored in
+    Redis, which makes tag filters exact set operations instead of a series
+    of capped ``GroupTagValue`` queries.
+
+    For every project, the index maintains the following sets of group IDs:
+
+    - all groups that have been indexed,
+    - groups that have a value for a tag key (used for ``ANY`` and ``EMPTY``
+      filters),
+    - groups that have a specific tag key and value pair.
+
+    All sets for a project are stored on the same host so they can be
+    intersected on the server. The sets contain integers and are stored in the
+    compact ``intset`` encoding by Redis while they are small enough.
+
+    Sets are updated as events are saved. The index for a project is
+    backfilled from ``GroupTagValue`` the first time it is searched, until the
+    backfill has completed tag filters are resolved by the Django backend.
+    The index is discarded and backfilled again when tag data is removed,
+    and expires along with the sets that were written by the backfill.
+    """
+
+    def __init__(self, ttl=60 * 60 * 24 * 90, cache_size=10000, cache_ttl=60 * 5, **options):
+        self.cluster, options = get_cluster_from_options('SENTRY_SEARCH_OPTIONS', options)
+        self.ttl = ttl
+        # (project_id, group_id, key, value) tuples that were recently
+        # indexed by this process and do not need to be written again
+        self.cache = LRUCache(cache_size, ttl=cache_ttl)
+        super(RedisSearchBackend, self).__init__(**options)
+
+    def validate(self):
+        try:
+            with self.cluster.all() as client:
+                client.ping()
+        except Exception as e:
+            raise InvalidConfiguration(six.text_type(e))
+
+    def _get_client(self, project_id):
+        return self.cluster.get_local_client_for_key(self._make_key(project_id, 'groups'))
+
+    def _make_key(self, project_id, *parts):
+        return u's:t:{}:{}'.format(project_id, ':'.join(parts))
+
+    def _make_tag_key(self, project_id, key):
+        return self._make_key(project_id, 'k', md5_text(key).hexdigest())
+
+    def _make_tag_value_key(self, project_id, key, value):
+        return self._make_key(project_id, 'v', md5_text(key, '\x00', value).hexdigest())
+
+    def _add_to_index(self, pipe, project_id, group_id, pairs):
+        groups_key = self._make_key(project_id, 'groups')
+        pipe.sadd(groups_key, group_id)
+        pipe.expire(groups_key, self.ttl)
+
+        keys = set()
+        for key, value in pairs:
+            keys.add(key)
+            tag_value_key = self._make_tag_value_key(project_id, key, value)
+            pipe.sadd(tag_value_key, group_id)
+            pipe.expire(tag_value_key, self.ttl)
+
+        for key in keys:
+            tag_key = self._make_tag_key(project_id, key)
+            pipe.sadd(tag_key, group_id)
+            pipe.expire(tag_key, self.ttl)
+
+    def index_group_tags(self, project_id, group_id, tags):
+        pairs = [
+            (key, value) for key, value in tags
+            if self.cache.get((project_id, group_id, key, value)) is None
+        ]
+
+        if not pairs:
+            return
+
+        with self._get_client(project_id).pipeline(transaction=False) as pipe:
+            self._add_to_index(pipe, project_id, group_id, pairs)
+            pipe.execute()
+
+        for key, value in pairs:
+            self.cache.set((project_id, group_id, key, value), True)
+
+    def reset_tag_index(self, project_id):
+        # Pairs that were indexed before the reset have to be written again.
+        self.cache.clear()
+
+        # All keys of a project are stored on the same host. The ``ready``
+        # flag is removed last, so that the backfill that is scheduled by the
+        # next search starts from an empty index.
+        client = self._get_client(project_id)
+        ready_key = self._make_key(project_id, 'ready')
+
+        keys = []
+        for key in client.scan_iter(match=self._make_key(project_id, '*'), count=1000):
+            if key == ready_key:
+                continue
+            keys.append(key)
+            if len(keys) >= 1000:
+                client.delete(*keys)
+                keys = []
+        if keys:
+            client.delete(*keys)
+
+        client.delete(ready_key)
+
+    def backfill_tag_index(self, project_id):
+        """
+        Populate the index for a project from ``GroupTagValue``.
+        """
+        from sentry.models import GroupTagValue
+        from sentry.utils.query import RangeQuerySetWrapper
+
+        client = self._get_client(project_id)
+        queryset = GroupTagValue.objects.filter(project_id=project_id)
+
+        # The index is only complete as long as none of the sets written by
+        # the backfill have expired.
+        expires = int(time.time()) + self.ttl
+
+        pipe = client.pipeline(transaction=False)
+        count = 0
+        for instance in RangeQuerySetWrapper(queryset, step=1000):
+            self._add_to_index(pipe, project_id, instance.group_id, [
+                (instance.key, instance.value),
+            ])
+            count += 1
+            if count % 1000 == 0:
+                pipe.execute()
+        ready_key = self._make_key(project_id, 'ready')
+        pipe.set(ready_key, '1')
+        pipe.expireat(ready_key, expires)
+        pipe.execute()
+
+        metrics.timing('search.tag-index.backfill-size', count)
+
+    def _tags_to_filter(self, project, tags):
+        from sentry.tasks.search import backfill_tag_index
+
+        client = self._get_client(project.id)
+        if not client.exists(self._make_key(project.id, 'ready')):
+            if client.set(self._make_key(project.id, 'backfill'), '1', nx=True, ex=60 * 60):
+                backfill_tag_index.delay(project_id=project.id)
+            return super(RedisSearchBackend, self)._tags_to_filter(project, tags)
+
+        include = []
+        exclude = []
+        for key, value in six.iteritems(tags):
+            if value is EMPTY:
+                exclude.append(self._make_tag_key(project.id, key))
+            elif value is ANY:
+                include.append(self._make_tag_key(project.id, key))
+            else:
+                include.append(self._make_tag_value_key(project.id, key, value))
+
+        if not include:
+            include.append(self._make_key(project.id, 'groups'))
+
+        if exclude:
+            temporary_key = self._make_key(project.id, 'tmp', uuid.uuid4().hex)
+            with client.pipeline() as pipe:
+                pipe.sinterstore(temporary_key, *include)
+                pipe.sdiff(temporary_key, *exclude)
+                pipe.delete(temporary_key)
+                matches = pipe.execute()[1]
+        else:
+            matches = client.sinter(*include)
+
+        metrics.timing('search.tag-index.matches', len(matches))
+        if not matches:
+            return None
+        return [int(group_id) for group_id in matches]
@@ -32,7 +32,8 @@ class TagStorage(Service):
     __all__ = (
         'is_valid_key', 'is_valid_value', 'is_reserved_key', 'prefix_reserved_key',
         'get_standardized_key', 'create_tag_key', 'get_or_create_tag_key',
-        'create_tag_value', 'get_or_create_tag_value', 'get_tag_key', 'get_tag_keys',
+        'create_tag_value', 'get_or_create_tag_value', 'get_or_create_tag_keys',
+        'get_or_create_tag_values', 'create_event_tags', 'get_tag_key', 'get_tag_keys',
         'get_tag_value', 'get_tag_values', 'delete_tag_key', 'incr_values_seen',
         'incr_times_seen', 'get_group_event_ids', 'get_tag_value_qs'
     )
@@ -82,6 +83,29 @@ class TagStorage(Service):
         """
         raise NotImplementedError
 
+    def get_or_create_tag_keys(self, project_id, keys):
+        """
+        >>> get_or_create_tag_keys(1, ["key1", "key2"])
+        {"key1": <TagKey>, "key2": <TagKey>}
+        """
+        raise NotImplementedError
+
+    def get_or_create_tag_values(self, project_id, items):
+        """
+        >>> get_or_create_tag_values(1, [("key1", "value1"), ("key2", "value2")])
+        {("key1", "value1"): <TagValue>, ("key2", "value2"): <TagValue>}
+        """
+        raise NotImplementedError
+
+    def create_event_tags(self, project_id, group_id, event_id, tags):
+        """
+        Associates an event with the given ``(key_id, value_id)`` pairs,
+        ignoring pairs that have already been stored.
+
+        >>> create_event_tags(1, 2, 3, [(4, 5), (6, 7)])
+        """
+        raise NotImplementedError
+
     def get_tag_key(self, project_id, key, status=TagKeyStatus.VISIBLE):
         """
         >>> get_tag_key(1, "key1")
@@ -10,6 +10,7 @@ from __future__ import absolute_import
 
 import six
 
+from django.db import IntegrityError, transaction
 from django.db.models import Q
 from operator import or_
 from six.moves import reduce
@@ -19,10 +20,20 @@ from sentry.tagstore import TagKeyStatus
 from sentry.models import TagKey, TagValue, EventTag
 from sentry.tagstore.base import TagStorage
 from sentry.utils.cache import cache
+from sentry.utils.datastructures import LRUCache
 from sentry.tasks.deletion import delete_tag_key
 
 
 class LegacyTagStorage(TagStorage):
+    def __init__(self, cache_size=10000, cache_ttl=300, **options):
+        # (project_id, key) -> TagKey and (project_id, key, value) -> TagValue
+        # lookups performed by the bulk ``get_or_create`` methods. Only the
+        # identity of these rows is relied upon, so stale counters are fine.
+        # Entries are tagged with the project's ``TagKey`` cache version, which
+        # is bumped when tag keys (and their values) are deleted.
+        self.__tag_cache = LRUCache(cache_size, ttl=cache_ttl)
+        super(LegacyTagStorage, self).__init__(**options)
+
     def create_tag_key(self, project_id, key, **kwargs):
         return TagKey.objects.create(project_id=project_id, key=key, **kwargs)
 
@@ -36,6 +47,81 @@ class LegacyTagStorage(TagStorage):
         return TagValue.objects.get_or_create(
             project_id=project_id, key=key, value=value, defaults=kwargs)
 
+    def get_or_create_tag_keys(self, project_id, keys):
+        result = {}
+        missing = set()
+        version = TagKey.get_cache_version(project_id)
+        for key in keys:
+            cached = self.__tag_cache.get((project_id, key))
+            if cached is not None and cached[0] == version:
+                result[key] = cached[1]
+            else:
+                missing.add(key)
+
+        if missing:
+            for tagkey in TagKey.objects.filter(project_id=project_id, key__in=missing):
+                result[tagkey.key] = tagkey
+                missing.discard(tagkey.key)
+
+            for key in missing:
+                result[key], _ = self.get_or_create_tag_key(project_id, key)
+
+            for key, tagkey in six.iteritems(result):
+                self.__tag_cache.set((project_id, key), (version, tagkey))
+
+        return result
+
+    def get_or_create_tag_values(self, project_id, items):
+        result = {}
+        missing = set()
+        version = TagKey.get_cache_version(project_id)
+        for key, value in items:
+            cached = self.__tag_cache.get((project_id, key, value))
+            if cached is not None and cached[0] == version:
+                result[(key, value)] = cached[1]
+            else:
+                missing.add((key, value))
+
+        if missing:
+            for tagvalue in TagValue.objects.filter(
+                reduce(or_, (Q(key=k, value=v) for k, v in missing)),
+                project_id=project_id,
+            ):
+                result[(tagvalue.key, tagvalue.value)] = tagvalue
+                missing.discard((tagvalue.key, tagvalue.value))
+
+            for key, value in missing:
+                result[(key, value)], _ = self.get_or_create_tag_value(project_id, key, value)
+
+            for (key, value), tagvalue in six.iteritems(result):
+                self.__tag_cache.set((project_id, key, value), (version, tagvalue))
+
+        return result
+
+    def create_event_tags(self, project_id, group_id, event_id, tags):
+        event_tags = [
+            EventTag(
+                project_id=project_id,
+                group_id=group_id,
+                event_id=event_id,
+                key_id=key_id,
+                value_id=value_id,
+            ) for key_id, value_id in tags
+        ]
+
+        try:
+            with transaction.atomic():
+                EventTag.objects.bulk_create(event_tags)
+        except IntegrityError:
+            # Some of these were stored already (i.e. the task is being
+            # replayed), so fall back to inserting them one at a time.
+            for event_tag in event_tags:
+                try:
+                    with transaction.atomic():
+                        event_tag.save()
+                except IntegrityError:
+                    pass
+
     def get_tag_key(self, project_id, key, status=TagKeyStatus.VISIBLE):
         from sentry.tagstore.exceptions import TagKeyNotFound
 
@@ -119,6 +205,7 @@ class LegacyTagStorage(TagStorage):
         ).update(status=TagKeyStatus.PENDING_DELETION)
 
         if updated:
+            TagKey.bump_cache_version(project_id)
             delete_tag_key.delay(object_id=tagkey.id)
 
         return (updated, tagkey)
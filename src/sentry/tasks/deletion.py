@@ -275,9 +275,13 @@ def delete_group(object_id, transaction_id=None, **kwargs):
 )
 @retry(exclude=(DeleteAborted, ))
 def delete_tag_key(object_id, transaction_id=None, **kwargs):
-    from sentry import deletions
+    from sentry import deletions, search
     from sentry.models import TagKey
 
+    project_id = TagKey.objects.filter(
+        id=object_id,
+    ).values_list('project_id', flat=True).first()
+
     task = deletions.get(
         model=TagKey,
         query={
@@ -292,6 +296,9 @@ def delete_tag_key(object_id, transaction_id=None, **kwargs):
                     'transaction_id': transaction_id},
             countdown=15,
         )
+    elif project_id is not None:
+        TagKey.bump_cache_version(project_id)
+        search.reset_tag_index(project_id)
 
 
 @instrumented_task(
@@ -13,6 +13,7 @@ import logging
 from django.db import DataError, IntegrityError, router, transaction
 from django.db.models import F
 
+from sentry import search
 from sentry.app import tsdb
 from sentry.similarity import features
 from sentry.tasks.base import instrumented_task, retry
@@ -108,6 +109,8 @@ def merge_group(
         transaction_id=transaction_id,
     )
 
+    GroupHash.bump_cache_version(group.project_id)
+
     if has_more:
         merge_group.delay(
             from_object_id=from_object_id,
@@ -119,6 +122,12 @@ def merge_group(
 
     features.merge(new_group, [group], allow_unsafe=True)
 
+    search.index_group_tags(
+        new_group.project_id,
+        new_group.id,
+        GroupTagValue.objects.filter(group_id=new_group.id).values_list('key', 'value'),
+    )
+
     for model in [tsdb.models.group]:
         tsdb.merge(model, new_group.id, [group.id])
 
@@ -182,6 +191,7 @@ def rehash_group_events(group_id, transaction_id=None, **kwargs):
     # This can cause the new groups to be created before we get to them, but
     # its a tradeoff we're willing to take
     GroupHash.objects.filter(group=group).delete()
+    GroupHash.bump_cache_version(group.project_id)
     has_more = _rehash_group_events(group)
 
     if has_more:
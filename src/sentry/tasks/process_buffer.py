@@ -17,19 +17,24 @@ logger = logging.getLogger(__name__)
 
 
 @instrumented_task(name='sentry.tasks.process_buffer.process_pending')
-def process_pending():
+def process_pending(partition=None):
     """
     Process pending buffers.
     """
     from sentry import buffer
     from sentry.app import locks
 
-    lock = locks.get('buffer:process_pending', duration=60)
+    if partition is None:
+        lock_key = 'buffer:process_pending'
+    else:
+        lock_key = 'buffer:process_pending:%d' % partition
+
+    lock = locks.get(lock_key, duration=60)
     try:
         with lock.acquire():
-            buffer.process_pending()
+            buffer.process_pending(partition=partition)
     except UnableToAcquireLock as error:
-        logger.warning('process_pending.fail', extra={'error': error})
+        logger.warning('process_pending.fail', extra={'error': error, 'partition': partition})
 
 
 @instrumented_task(name='sentry.tasks.process_buffer.process_incr')
@@ -0,0 +1,127 @@
+"""
+sentry.tasks.reencode
+~~~~~~~~~~~~~~~~~~~~~
+
+:copyright: (c) 2010-2017 by the Sentry Team, see AUTHORS for more details.
+:license: BSD, see LICENSE for more details.
+"""
+from __future__ import absolute_import
+
+import itertools
+import six
+
+from django.db import connections, router, transaction
+from django.db.models import get_model
+
+from sentry.tasks.base import instrumented_task
+from sentry.utils import metrics
+
+
+def update_values(model, field, rows):
+    """
+    Replace the stored values of ``field`` for ``(pk, old value, new
+    value)`` rows, skipping rows whose value has changed since it was read.
+    Stored values are compared directly, as lookups on the field would
+    encode them again. Returns the number of updated rows.
+    """
+    from sentry.db.models.query import _get_cast_type
+
+    using = router.db_for_write(model)
+    connection = connections[using]
+    qn = connection.ops.quote_name
+    table = qn(model._meta.db_table)
+    pk_column = qn(model._meta.pk.column)
+    column = qn(field.column)
+
+    with transaction.atomic(using=using):
+        cursor = connection.cursor()
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                'UPDATE %s AS t SET %s = v.new FROM (VALUES %s) AS v (pk, old, new) '
+                'WHERE t.%s = v.pk AND t.%s = v.old' % (
+                    table,
+                    column,
+                    ', '.join(
+                        ['(%%s::%s, %%s::text, %%s::text)' % (
+                            _get_cast_type(model._meta.pk, connection),
+                        )] * len(rows)
+                    ),
+                    pk_column,
+                    column,
+                ),
+                list(itertools.chain.from_iterable(rows)),
+            )
+            return cursor.rowcount
+
+        updated = 0
+        for pk, old, new in rows:
+            cursor.execute(
+                'UPDATE %s SET %s = %%s WHERE %s = %%s AND %s = %%s' % (
+                    table, column, pk_column, column,
+                ),
+                [new, pk, old],
+            )
+            updated += cursor.rowcount
+        return updated
+
+
+@instrumented_task(name='sentry.tasks.reencode.reencode_dict_field', queue='cleanup')
+def reencode_dict_field(app_label, model_name, field_name, min_id=None, batch_size=1000,
+                        **kwargs):
+    """
+    Rewrite the values of a ``GzippedDictField`` in the configured encoding,
+    one batch of rows at a time. The task schedules itself until every row
+    of the table has been visited, so it can be started once per table:
+
+    >>> reencode_dict_field.delay('sentry', 'Group', 'data')
+    """
+    from sentry.db.models.fields.gzippeddict import decode, encode, is_encoded
+    from sentry.db.models.fields.node import NodeField
+    from sentry.utils.query import RangeQuerySetWrapper
+
+    model = get_model(app_label, model_name)
+    queryset = model.objects.all()
+
+    # ``NodeField`` values only reference their node, and can't be written
+    # without writing the node as well.
+    field = model._meta.get_field(field_name)
+    assert not isinstance(field, NodeField), 'NodeField values can not be re-encoded'
+
+    instances = list(RangeQuerySetWrapper(
+        queryset,
+        step=batch_size,
+        limit=batch_size,
+        min_id=min_id,
+    ))
+    if not instances:
+        return
+
+    # Raw values are fetched separately, as model instances only expose the
+    # decoded value of the field.
+    values = dict(
+        queryset.filter(
+            pk__in=[instance.pk for instance in instances],
+        ).values_list('pk', field_name)
+    )
+
+    # Rows that already use the configured encoding are never written.
+    rows = []
+    for pk, value in six.iteritems(values):
+        if not value or is_encoded(value):
+            continue
+        encoded = encode(decode(value))
+        if encoded != value:
+            rows.append((pk, value, encoded))
+
+    updated = update_values(model, field, rows) if rows else 0
+
+    metrics.incr('reencode.rows', updated, tags={'model': model_name})
+
+    if len(instances) == batch_size:
+        reencode_dict_field.delay(
+            app_label,
+            model_name,
+            field_name,
+            min_id=instances[-1].pk,
+            batch_size=batch_size,
+        )
@@ -0,0 +1,20 @@
+"""
+sentry.tasks.search
+~~~~~~~~~~~~~~~~~~~
+
+:copyright: (c) 2010-2017 by the Sentry Team, see AUTHORS for more details.
+:license: BSD, see LICENSE for more details.
+"""
+from __future__ import absolute_import
+
+from sentry.tasks.base import instrumented_task
+
+
+@instrumented_task(name='sentry.tasks.search.backfill_tag_index', queue='search')
+def backfill_tag_index(project_id, **kwargs):
+    """
+    Populate the search backend's tag index for a project.
+    """
+    from sentry import search
+
+    search.backend.backfill_tag_index(project_id)
@@ -0,0 +1,11 @@
+from __future__ import absolute_import, print_function
+
+from sentry.tasks.base import instrumented_task
+
+
+@instrumented_task(
+    name='sentry.tasks.clear_old_cached_sourcemaps', time_limit=15, soft_time_limit=10
+)
+def clear_old_cached_sourcemaps():
+    from sentry.lang.javascript.processor import sourcemap_views
+    sourcemap_views.clear_old_entries()
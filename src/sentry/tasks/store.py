@@ -10,21 +10,23 @@ from __future__ import absolute_import
 
 import six
 import logging
+from collections import defaultdict
 from datetime import datetime
 
 from raven.contrib.django.models import client as Raven
 from time import time
+from django.conf import settings
 from django.utils import timezone
 
 from sentry.cache import default_cache
 from sentry.filters.preprocess_hashes import get_raw_cache_key, hash_cache
 from sentry.tasks.base import instrumented_task
-from sentry.utils import metrics
+from sentry.utils import json, metrics, redis
 from sentry.utils.safe import safe_execute
 from sentry.stacktraces import process_stacktraces, \
     should_process_for_stacktraces
 from sentry.utils.dates import to_datetime
-from sentry.models import ProjectOption, Activity, Project
+from sentry.models import ProjectOption, Activity, EventMapping, Project
 
 error_logger = logging.getLogger('sentry.errors.events')
 info_logger = logging.getLogger('sentry.store')
@@ -32,6 +34,9 @@ info_logger = logging.getLogger('sentry.store')
 # Is reprocessing on or off by default?
 REPROCESSING_DEFAULT = False
 
+# Redis list holding cache keys of events waiting to be saved in a batch
+SAVE_EVENT_BATCH_KEY = 'save-event:pending'
+
 
 def should_process(data):
     """Quick check if processing is needed at all."""
@@ -51,8 +56,39 @@ def should_process(data):
 
 
 def _do_preprocess_event(cache_key, data, start_time, event_id, process_event):
+    # Events without a cache key were handed to us directly and never take a
+    # cache round-trip, so there is nothing to gain from fusing them.
+    fused = settings.SENTRY_FUSED_EVENT_PIPELINE and cache_key
+
+    preprocess_start = time()
+    try:
+        data = _preprocess_event(cache_key, data, start_time, event_id, process_event)
+    finally:
+        if fused:
+            metrics.timing('events.fused', time() - preprocess_start, tags={'stage': 'preprocess'})
+
+    if data is None:
+        return
+
+    # If we get here, that means the event had no preprocessing needed to be done
+    # so we can jump directly to save_event
+    if fused:
+        _do_fused_save_event(cache_key, data, start_time, event_id)
+        return
+
     if cache_key:
-        data = default_cache.get(cache_key)
+        data = None
+    schedule_save_event(cache_key=cache_key, data=data, start_time=start_time, event_id=event_id)
+
+
+def _preprocess_event(cache_key, data, start_time, event_id, process_event):
+    """
+    Returns the event payload if it can be saved without processing,
+    otherwise schedules its processing and returns ``None``.
+    """
+    if cache_key:
+        with metrics.timer('events.cache.get', tags={'stage': 'pre'}):
+            data = default_cache.get(cache_key)
 
     if data is None:
         metrics.incr('events.failed', tags={'reason': 'cache', 'stage': 'pre'})
@@ -78,11 +114,36 @@ def _do_preprocess_event(cache_key, data, start_time, event_id, process_event):
         process_event.delay(cache_key=cache_key, start_time=start_time, event_id=event_id)
         return
 
-    # If we get here, that means the event had no preprocessing needed to be done
-    # so we can jump directly to save_event
-    if cache_key:
-        data = None
-    save_event.delay(cache_key=cache_key, data=data, start_time=start_time, event_id=event_id)
+    return data
+
+
+def _do_fused_save_event(cache_key, data, start_time, event_id):
+    """
+    Saves an event that needs no processing right away, from the payload that
+    was already loaded by ``preprocess_event``, and indexes its tags in the
+    same process.
+
+    If anything goes wrong (including hitting the soft time limit) the event
+    is handed to the regular ``save_event`` task, which reads it back from
+    the cache. Events that were already saved are skipped when they are
+    retried (see ``_get_saved_event_ids``.) The time to process is only
+    recorded once the event has been saved, as the fallback records it as
+    well.
+    """
+    try:
+        with metrics.timer('events.fused', tags={'stage': 'save'}):
+            _do_save_event(data, None, event_id, index_tags_inline=True)
+    except Exception:
+        error_logger.exception('fused.save.failed', extra={'cache_key': cache_key})
+        metrics.incr('events.fused.fallback')
+        schedule_save_event(cache_key=cache_key, start_time=start_time, event_id=event_id)
+    else:
+        default_cache.delete(cache_key)
+        if start_time:
+            metrics.timing(
+                'events.time-to-process',
+                time() - start_time,
+                instance=data['platform'])
 
 
 @instrumented_task(
@@ -112,7 +173,8 @@ def preprocess_event_from_reprocessing(
 def _do_process_event(cache_key, start_time, event_id):
     from sentry.plugins import plugins
 
-    data = default_cache.get(cache_key)
+    with metrics.timer('events.cache.get', tags={'stage': 'process'}):
+        data = default_cache.get(cache_key)
 
     if data is None:
         metrics.incr('events.failed', tags={'reason': 'cache', 'stage': 'process'})
@@ -152,9 +214,10 @@ def _do_process_event(cache_key, start_time, event_id):
         ):
             return
 
-        default_cache.set(cache_key, data, 3600)
+        with metrics.timer('events.cache.set', tags={'stage': 'process'}):
+            default_cache.set(cache_key, data, 3600)
 
-    save_event.delay(cache_key=cache_key, data=None, start_time=start_time, event_id=event_id)
+    schedule_save_event(cache_key=cache_key, data=None, start_time=start_time, event_id=event_id)
 
 
 @instrumented_task(
@@ -177,6 +240,54 @@ def process_event_from_reprocessing(cache_key, start_time=None, event_id=None, *
     return _do_process_event(cache_key, start_time, event_id)
 
 
+def schedule_save_event(cache_key=None, data=None, start_time=None, event_id=None):
+    """
+    Hands an event over to be saved.
+
+    When ``SENTRY_SAVE_EVENT_BATCH_SIZE`` is larger than one, cached events are
+    collected in Redis and saved ``SENTRY_SAVE_EVENT_BATCH_SIZE`` at a time by
+    ``save_event_batch``. Any remainder is picked up periodically by
+    ``flush_save_event_batches``.
+    """
+    batch_size = settings.SENTRY_SAVE_EVENT_BATCH_SIZE
+    if batch_size <= 1 or not cache_key:
+        save_event.delay(cache_key=cache_key, data=data, start_time=start_time, event_id=event_id)
+        return
+
+    client = redis.clusters.get('default').get_local_client_for_key(SAVE_EVENT_BATCH_KEY)
+    pending = client.rpush(SAVE_EVENT_BATCH_KEY, json.dumps([cache_key, start_time]))
+    if pending >= batch_size:
+        _dispatch_save_event_batch(client, batch_size)
+
+
+def _dispatch_save_event_batch(client, batch_size):
+    with client.pipeline() as pipe:
+        pipe.lrange(SAVE_EVENT_BATCH_KEY, 0, batch_size - 1)
+        pipe.ltrim(SAVE_EVENT_BATCH_KEY, batch_size, -1)
+        items = pipe.execute()[0]
+
+    if not items:
+        return 0
+
+    cache_keys, start_times = zip(*map(json.loads, items))
+    save_event_batch.delay(cache_keys=list(cache_keys), start_times=list(start_times))
+    return len(items)
+
+
+@instrumented_task(
+    name='sentry.tasks.store.flush_save_event_batches',
+    queue='events.save_event',
+)
+def flush_save_event_batches(**kwargs):
+    """
+    Dispatches events that have been waiting for a batch to fill up.
+    """
+    batch_size = max(settings.SENTRY_SAVE_EVENT_BATCH_SIZE, 1)
+    client = redis.clusters.get('default').get_local_client_for_key(SAVE_EVENT_BATCH_KEY)
+    while _dispatch_save_event_batch(client, batch_size) == batch_size:
+        pass
+
+
 def delete_raw_event(project_id, event_id, allow_hint_clear=False):
     if event_id is None:
         error_logger.error('process.failed_delete_raw_event', extra={'project_id': project_id})
@@ -267,10 +378,38 @@ def save_event(cache_key=None, data=None, start_time=None, event_id=None, **kwar
     """
     Saves an event to the database.
     """
-    from sentry.event_manager import HashDiscarded, EventManager
-
     if cache_key:
-        data = default_cache.get(cache_key)
+        with metrics.timer('events.cache.get', tags={'stage': 'post'}):
+            data = default_cache.get(cache_key)
+
+    try:
+        _do_save_event(data, start_time, event_id)
+    finally:
+        if cache_key:
+            default_cache.delete(cache_key)
+
+
+def _get_saved_event_ids(project_id, event_ids):
+    """
+    Returns the subset of ``event_ids`` that were already saved.
+
+    ``EventManager`` updates an event's group before anything else is written
+    for it, so passing an event to it again would count the event twice. The
+    ``EventMapping`` is written right after the group has been updated, and
+    events that have one are skipped instead. (An event that failed after its
+    group was updated but before its mapping was written is still counted
+    twice when it is retried.)
+    """
+    return set(
+        EventMapping.objects.filter(
+            project_id=project_id,
+            event_id__in=event_ids,
+        ).values_list('event_id', flat=True)
+    )
+
+
+def _do_save_event(data, start_time, event_id, index_tags_inline=False):
+    from sentry.event_manager import HashDiscarded, EventManager
 
     if event_id is None and data is not None:
         event_id = data['event_id']
@@ -287,9 +426,18 @@ def save_event(cache_key=None, data=None, start_time=None, event_id=None, **kwar
         'project': project,
     })
 
+    if _get_saved_event_ids(project, [event_id]):
+        info_logger.info(
+            'duplicate.found', extra={
+                'project_id': project,
+                'event_id': event_id,
+            }
+        )
+        return
+
     try:
         manager = EventManager(data)
-        manager.save(project)
+        manager.save(project, index_tags_inline=index_tags_inline)
     except HashDiscarded as exc:
         # TODO(jess): remove this before it goes out to a wider audience
         info_logger.info(
@@ -299,10 +447,77 @@ def save_event(cache_key=None, data=None, start_time=None, event_id=None, **kwar
             }
         )
     finally:
-        if cache_key:
-            default_cache.delete(cache_key)
         if start_time:
             metrics.timing(
                 'events.time-to-process',
                 time() - start_time,
                 instance=data['platform'])
+
+
+@instrumented_task(name='sentry.tasks.store.save_event_batch', queue='events.save_event')
+def save_event_batch(cache_keys, start_times=None, **kwargs):
+    """
+    Saves a batch of cached events to the database, saving the events of each
+    project together with ``EventManager.save_many``.
+
+    If a project's events can't be saved as a batch, each of them is handed
+    to ``save_event`` individually so one bad event doesn't take the rest of
+    the batch down with it. Events that were saved before the failure are
+    skipped when they are retried (see ``_get_saved_event_ids``.)
+    """
+    from sentry.event_manager import EventManager
+
+    if start_times is None:
+        start_times = [None] * len(cache_keys)
+
+    batches = defaultdict(list)
+    for cache_key, start_time in zip(cache_keys, start_times):
+        data = default_cache.get(cache_key)
+        if data is None:
+            metrics.incr('events.failed', tags={'reason': 'cache', 'stage': 'post'})
+            continue
+
+        project = data.pop('project')
+        delete_raw_event(project, data['event_id'], allow_hint_clear=True)
+        batches[project].append((cache_key, data, start_time))
+
+    for project, items in six.iteritems(batches):
+        Raven.tags_context({
+            'project': project,
+        })
+
+        saved = _get_saved_event_ids(project, [item[1]['event_id'] for item in items])
+        if saved:
+            info_logger.info(
+                'duplicate.found', extra={
+                    'project_id': project,
+                    'event_ids': sorted(saved),
+                }
+            )
+            for cache_key, data, start_time in items:
+                if data['event_id'] in saved:
+                    default_cache.delete(cache_key)
+            items = [item for item in items if item[1]['event_id'] not in saved]
+            if not items:
+                continue
+
+        try:
+            EventManager.save_many(project, [item[1] for item in items])
+        except Exception:
+            error_logger.exception('save_event_batch.failed', extra={'project_id': project})
+            metrics.incr('events.save-batch-fallback', amount=len(items))
+            for cache_key, data, start_time in items:
+                save_event.delay(
+                    cache_key=cache_key, start_time=start_time, event_id=data['event_id'],
+                )
+            continue
+
+        for cache_key, data, start_time in items:
+            default_cache.delete(cache_key)
+            if start_time:
+                metrics.timing(
+                    'events.time-to-process',
+                    time() - start_time,
+                    instance=data['platform'])
+
+        metrics.timing('events.save-batch-size', len(items))
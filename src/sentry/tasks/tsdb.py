@@ -0,0 +1,20 @@
+"""
+sentry.tasks.tsdb
+~~~~~~~~~~~~~~~~~
+
+:copyright: (c) 2010-2017 by the Sentry Team, see AUTHORS for more details.
+:license: BSD, see LICENSE for more details.
+"""
+from __future__ import absolute_import
+
+from sentry.tasks.base import instrumented_task
+
+
+@instrumented_task(name='sentry.tasks.tsdb.compact', time_limit=65, soft_time_limit=60)
+def compact():
+    """
+    Fold recently written time series counters into their coarser rollups.
+    """
+    from sentry import tsdb
+
+    tsdb.compact()
@@ -6,6 +6,7 @@ from collections import defaultdict
 from django.db import transaction
 from django.db.models import F
 
+from sentry import search
 from sentry.app import tsdb
 from sentry.constants import DEFAULT_LOGGER_NAME, LOG_LEVELS_MAP
 from sentry.event_manager import (
@@ -178,6 +179,7 @@ def migrate_events(caches, project, source_id, destination_id, fingerprints, eve
             project_id=project.id,
             hash__in=fingerprints,
         ).update(group=destination_id)
+        GroupHash.bump_cache_version(project.id)
 
         # Create activity records for the source and destination group.
         Activity.objects.create(
@@ -492,6 +494,8 @@ def lock_hashes(project_id, source_id, fingerprints):
             id__in=[h.id for h in eligible_hashes],
         ).update(state=GroupHash.State.LOCKED_IN_MIGRATION)
 
+    GroupHash.bump_cache_version(project_id)
+
     return [h.hash for h in eligible_hashes]
 
 
@@ -501,6 +505,7 @@ def unlock_hashes(project_id, fingerprints):
         hash__in=fingerprints,
         state=GroupHash.State.LOCKED_IN_MIGRATION,
     ).update(state=GroupHash.State.UNLOCKED)
+    GroupHash.bump_cache_version(project_id)
 
 
 @instrumented_task(name='sentry.tasks.unmerge', queue='unmerge')
@@ -550,6 +555,7 @@ def unmerge(
     # If there are no more events to process, we're done with the migration.
     if not events:
         update_tag_value_counts([source_id, destination_id])
+        search.reset_tag_index(project_id)
         unlock_hashes(project_id, fingerprints)
         return destination_id
 
@@ -106,7 +106,7 @@ class TSDBModel(Enum):
 class BaseTSDB(Service):
     __all__ = (
         'models', 'incr', 'incr_multi', 'get_range', 'get_rollups', 'get_sums', 'rollup',
-        'validate',
+        'validate', 'compact',
     )
 
     models = TSDBModel
@@ -275,6 +275,12 @@ class BaseTSDB(Service):
         """
         raise NotImplementedError
 
+    def compact(self, timestamp=None):
+        """
+        Perform any periodic maintenance needed to keep counters readable
+        (e.g. folding recent writes into coarser rollups.)
+        """
+
     def get_range(self, model, keys, start, end, rollup=None):
         """
         To get a range of data for group ID=[1, 2, 3]:
@@ -0,0 +1,180 @@
+"""
+sentry.tsdb.batch
+~~~~~~~~~~~~~~~~~
+
+:copyright: (c) 2010-2017 by the Sentry Team, see AUTHORS for more details.
+:license: BSD, see LICENSE for more details.
+"""
+from __future__ import absolute_import
+
+import atexit
+import logging
+import six
+import threading
+
+from collections import defaultdict
+from django.utils import timezone
+
+from sentry.tsdb.base import TSDBModel
+from sentry.utils.dates import to_datetime
+from six.moves import reduce
+
+logger = logging.getLogger(__name__)
+
+
+def _gcd(a, b):
+    while b:
+        a, b = b, a % b
+    return a
+
+
+class BatchedTSDB(object):
+    """
+    Collects time series writes in memory and coalesces them into as few
+    backend calls as possible when flushed.
+
+    Writes are grouped by the largest interval that evenly divides every
+    configured rollup. Two timestamps that normalize to the same epoch for
+    that interval also normalize to the same epoch (and expiry) for every
+    rollup, so merging them produces exactly the same stored values as
+    writing each one individually.
+
+    >>> batch = BatchedTSDB(tsdb)
+    >>> batch.incr_multi([(tsdb.models.group, 1)], timestamp=now)
+    >>> batch.incr_multi([(tsdb.models.group, 1)], timestamp=now)
+    >>> batch.flush()  # issues a single ``incr_multi`` with ``count=2``
+    """
+
+    models = TSDBModel
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.interval = reduce(_gcd, list(backend.get_rollups()))
+        self.clear()
+
+    def clear(self):
+        # epoch -> {(model, key): count}
+        self.counters = defaultdict(lambda: defaultdict(int))
+        # epoch -> {(model, key): set(values)}
+        self.distinct_counters = defaultdict(lambda: defaultdict(set))
+        # epoch -> {model: {key: {item: score}}}
+        self.frequencies = defaultdict(
+            lambda: defaultdict(lambda: defaultdict(lambda: defaultdict(int)))
+        )
+
+    def _get_epoch(self, timestamp):
+        if timestamp is None:
+            timestamp = timezone.now()
+        return self.backend.normalize_to_epoch(timestamp, self.interval)
+
+    def incr(self, model, key, timestamp=None, count=1):
+        self.incr_multi([(model, key)], timestamp, count)
+
+    def incr_multi(self, items, timestamp=None, count=1):
+        counters = self.counters[self._get_epoch(timestamp)]
+        for model, key in items:
+            counters[(model, key)] += count
+
+    def record(self, model, key, values, timestamp=None):
+        self.record_multi(((model, key, values), ), timestamp)
+
+    def record_multi(self, items, timestamp=None):
+        distinct_counters = self.distinct_counters[self._get_epoch(timestamp)]
+        for model, key, values in items:
+            distinct_counters[(model, key)].update(values)
+
+    def record_frequency_multi(self, requests, timestamp=None):
+        frequencies = self.frequencies[self._get_epoch(timestamp)]
+        for model, request in requests:
+            for key, items in six.iteritems(request):
+                scores = frequencies[model][key]
+                for member, score in six.iteritems(items):
+                    scores[member] += score
+
+    def flush(self):
+        """
+        Send all collected writes to the backend and reset the batch.
+        """
+        counters, distinct_counters, frequencies = (
+            self.counters, self.distinct_counters, self.frequencies,
+        )
+        self.clear()
+
+        for epoch, values in sorted(six.iteritems(counters)):
+            # ``incr_multi`` only accepts a single count per call, so items
+            # are grouped by the amount they need to be incremented by.
+            items_by_count = defaultdict(list)
+            for item, count in six.iteritems(values):
+                items_by_count[count].append(item)
+            for count, items in six.iteritems(items_by_count):
+                self.backend.incr_multi(items, timestamp=to_datetime(epoch), count=count)
+
+        for epoch, values in sorted(six.iteritems(distinct_counters)):
+            self.backend.record_multi(
+                [(model, key, list(members)) for (model, key), members in six.iteritems(values)],
+                timestamp=to_datetime(epoch),
+            )
+
+        for epoch, values in sorted(six.iteritems(frequencies)):
+            self.backend.record_frequency_multi(
+                [
+                    (model, {key: dict(items) for key, items in six.iteritems(request)})
+                    for model, request in six.iteritems(values)
+                ],
+                timestamp=to_datetime(epoch),
+            )
+
+
+class BufferedTSDB(object):
+    """
+    Collects counter increments from any thread into a ``BatchedTSDB`` that
+    is flushed by a background timer ``interval`` seconds after the first
+    pending write, so callers never wait on the backend. Writes keep their
+    own timestamps, so the stored values are the same as writing each one
+    directly. An ``interval`` of zero writes through immediately.
+    """
+
+    def __init__(self, backend, interval=1):
+        self.backend = backend
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.batch = None
+        self.timer = None
+        atexit.register(self.flush)
+
+    def incr(self, model, key, timestamp=None, count=1):
+        self.incr_multi([(model, key)], timestamp, count)
+
+    def incr_multi(self, items, timestamp=None, count=1):
+        if self.interval <= 0:
+            self.backend.incr_multi(items, timestamp=timestamp, count=count)
+            return
+
+        with self.lock:
+            if self.batch is None:
+                self.batch = BatchedTSDB(self.backend)
+            self.batch.incr_multi(items, timestamp, count)
+            if self.timer is None:
+                self.timer = threading.Timer(self.interval, self._flush_on_timer)
+                self.timer.daemon = True
+                self.timer.start()
+
+    def _flush_on_timer(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('tsdb.buffered-flush.failed')
+
+    def flush(self):
+        """
+        Send all pending writes to the backend.
+        """
+        with self.lock:
+            batch, timer = self.batch, self.timer
+            self.batch = self.timer = None
+
+        if timer is not None:
+            timer.cancel()
+
+        if batch is not None:
+            batch.flush()
@@ -11,9 +11,11 @@ import itertools
 import logging
 import operator
 import random
+import struct
 import uuid
 from binascii import crc32
 from collections import defaultdict, namedtuple
+from datetime import timedelta
 from hashlib import md5
 
 import six
@@ -22,6 +24,7 @@ from pkg_resources import resource_string
 from redis.client import Script
 
 from sentry.tsdb.base import BaseTSDB
+from sentry.utils import metrics
 from sentry.utils.dates import to_datetime, to_timestamp
 from sentry.utils.redis import check_cluster_versions, get_cluster_from_options
 from sentry.utils.versioning import Version
@@ -36,6 +39,16 @@ CountMinScript = Script(
     resource_string('sentry', 'scripts/tsdb/cmsketch.lua'),
 )
 
+CounterTotalsScript = Script(
+    None,
+    resource_string('sentry', 'scripts/tsdb/counters.lua'),
+)
+
+CompactScript = Script(
+    None,
+    resource_string('sentry', 'scripts/tsdb/compact.lua'),
+)
+
 
 class RedisTSDB(BaseTSDB):
     """
@@ -90,6 +103,18 @@ class RedisTSDB(BaseTSDB):
     frequency table can be displayed as percentages of the whole data set.
     (Additional documentation and the bulk of the logic for implementing the
     frequency table API can be found in the ``cmsketch.lua`` script.)
+
+    When ``compact_counters`` is enabled, simple counters are only written to
+    the finest rollup. The ``compact`` method (run periodically) closes the
+    buckets of the finest rollup that are older than ``compaction_delay``
+    seconds, and during the following run folds every closed bucket into the
+    coarser rollups and advances a watermark, the last bucket that has been
+    compacted. Reads from a coarser rollup add the finest buckets past the
+    watermark to the compacted values, so the results match those of writing
+    to every rollup directly, except for counts that are compacted while a
+    read is in progress. Writes to a bucket that has already been closed are
+    written to the coarser rollups directly, and to a separate hash of the
+    finest rollup that is never compacted.
     """
     DEFAULT_SKETCH_PARAMETERS = SketchParameters(3, 128, 50)
 
@@ -98,8 +123,18 @@ class RedisTSDB(BaseTSDB):
         self.prefix = prefix
         self.vnodes = vnodes
         self.enable_frequency_sketches = options.pop('enable_frequency_sketches', False)
+        self.compact_counters = options.pop('compact_counters', False)
+        self.compaction_delay = options.pop('compaction_delay', 60)
+        self.compaction_batch_size = options.pop('compaction_batch_size', 30)
         super(RedisTSDB, self).__init__(**options)
 
+        if self.compact_counters:
+            self.counter_rollup = min(self.rollups)
+            assert all(rollup % self.counter_rollup == 0 for rollup in self.rollups), \
+                'all rollups must be a multiple of the finest rollup to compact counters'
+        self.__watermark_initialized = False
+        self.__closed = None
+
     def validate(self):
         logger.debug('Validating Redis version...')
         version = Version((2, 8, 18)) if self.enable_frequency_sketches else Version((2, 8, 9))
@@ -137,12 +172,38 @@ class RedisTSDB(BaseTSDB):
                 model_key = model_key.encode('utf-8')
             vnode = crc32(model_key) % self.vnodes
 
+        return self.make_counter_hash_key(
+            model,
+            self.normalize_to_rollup(timestamp, rollup),
+            vnode,
+        ), model_key
+
+    def make_counter_hash_key(self, model, epoch, vnode):
         return '{prefix}{model}:{epoch}:{vnode}'.format(
             prefix=self.prefix,
             model=model.value,
-            epoch=self.normalize_to_rollup(timestamp, rollup),
+            epoch=epoch,
             vnode=vnode,
-        ), model_key
+        )
+
+    def make_counter_keys(self, model, rollup, timestamp, key):
+        """
+        Make every key that holds counter values for a rollup, which includes
+        the hash of late writes of the finest rollup when ``compact_counters``
+        is enabled.
+
+        Returns a list of 2-tuples that contain the hash key and the hash field.
+        """
+        hash_key, hash_field = self.make_counter_key(model, rollup, timestamp, key)
+        if self.compact_counters and rollup == self.counter_rollup:
+            return [(hash_key, hash_field), (hash_key + ':late', hash_field)]
+        return [(hash_key, hash_field)]
+
+    def make_compaction_key(self, name):
+        return '{prefix}compaction:{name}'.format(
+            prefix=self.prefix,
+            name=name,
+        )
 
     def get_model_key(self, key):
         # We specialize integers so that a pure int-map can be optimized by
@@ -167,16 +228,60 @@ class RedisTSDB(BaseTSDB):
         if timestamp is None:
             timestamp = timezone.now()
 
+        late = False
+        if self.compact_counters:
+            if not self.__watermark_initialized:
+                # Everything before the first write in this mode has been
+                # written to all rollups already.
+                bucket = self.normalize_to_rollup(timestamp, self.counter_rollup) - 1
+                client = self.cluster.get_routing_client()
+                for name in ('closed', 'watermark'):
+                    client.set(self.make_compaction_key(name), bucket, nx=True)
+                self.__watermark_initialized = True
+            late = self.is_closed(timestamp)
+
+        if not self.compact_counters or late:
+            rollups = six.iteritems(self.rollups)
+        else:
+            rollups = [(self.counter_rollup, self.rollups[self.counter_rollup])]
+
         with self.cluster.map() as client:
-            for rollup, max_values in six.iteritems(self.rollups):
+            for rollup, max_values in rollups:
                 for model, key in items:
                     hash_key, hash_field = self.make_counter_key(model, rollup, timestamp, key)
+                    if late and rollup == self.counter_rollup:
+                        # The bucket may be folded into the coarser rollups
+                        # at any time, which have been written to already.
+                        hash_key = hash_key + ':late'
                     client.hincrby(hash_key, hash_field, count)
                     client.expireat(
                         hash_key,
                         self.calculate_expiry(rollup, max_values, timestamp),
                     )
 
+    def is_closed(self, timestamp):
+        """
+        Returns whether the bucket of the finest rollup that contains
+        ``timestamp`` has been closed by compaction.
+        """
+        rollup = self.counter_rollup
+        bucket = self.normalize_to_rollup(timestamp, rollup)
+
+        # Compaction only closes buckets that ended ``compaction_delay``
+        # seconds ago, which leaves a margin for clock skew between hosts.
+        if (bucket + 1) * rollup > to_timestamp(timezone.now()) - self.compaction_delay / 2.0:
+            return False
+
+        # The closed bucket only ever increases, so it only needs to be
+        # fetched again when the cached value is not recent enough.
+        if self.__closed is None or bucket > self.__closed:
+            closed = self.cluster.get_routing_client().get(self.make_compaction_key('closed'))
+            if closed is None:
+                return False
+            self.__closed = int(closed)
+
+        return bucket <= self.__closed
+
     def get_range(self, model, keys, start, end, rollup=None):
         """
         To get a range of data for group ID=[1, 2, 3]:
@@ -187,24 +292,198 @@ class RedisTSDB(BaseTSDB):
         >>>          end=now)
         """
         rollup, series = self.get_optimal_rollup_series(start, end, rollup)
-        series = map(to_datetime, series)
 
-        results = []
+        totals = self.get_counter_totals(
+            model, keys, rollup, map(to_datetime, series),
+            lambda key_index, point_index: key_index * len(series) + point_index,
+            len(keys) * len(series),
+        )
+
+        return {
+            key: zip(series, totals[i * len(series):(i + 1) * len(series)])
+            for i, key in enumerate(keys)
+        }
+
+    def get_sums(self, model, keys, start, end, rollup=None):
+        rollup, series = self.get_optimal_rollup_series(start, end, rollup)
+
+        totals = self.get_counter_totals(
+            model, keys, rollup, map(to_datetime, series),
+            lambda key_index, point_index: key_index,
+            len(keys),
+        )
+
+        return dict(zip(keys, totals))
+
+    def get_counter_totals(self, model, keys, rollup, series, get_slot, slots):
+        """
+        Sum counter values on the Redis hosts that store them.
+
+        The value of every key at every point of the series is added to the
+        output slot returned by ``get_slot(key index, point index)``. Returns a
+        list containing the total of every slot.
+        """
+        if self.compact_counters and rollup != self.counter_rollup:
+            uncompacted = self.get_uncompacted_buckets(rollup, series)
+        else:
+            uncompacted = []
+
+        router = self.cluster.get_router()
+
+        # host -> (KEYS, ARGV)
+        requests = {}
+
+        def add(hash_key, hash_field, slot):
+            host_keys, host_arguments = requests.setdefault(
+                router.get_host_for_key(hash_key),
+                ([], [slots]),
+            )
+            host_keys.append(hash_key)
+            host_arguments.extend((hash_field, slot))
+
+        point_indices = {timestamp: i for i, timestamp in enumerate(series)}
+        for key_index, key in enumerate(keys):
+            for point_index, timestamp in enumerate(series):
+                for hash_key, hash_field in self.make_counter_keys(model, rollup, timestamp, key):
+                    add(hash_key, hash_field, get_slot(key_index, point_index))
+            for bucket_timestamp, timestamp in uncompacted:
+                hash_key, hash_field = self.make_counter_key(
+                    model, self.counter_rollup, bucket_timestamp, key)
+                add(hash_key, hash_field, get_slot(key_index, point_indices[timestamp]))
+
+        totals = [0] * slots
+        if not requests:
+            return totals
+
+        # Commands are routed by key, so the first key of each host is used
+        # to route all of the keys that are stored on that host.
+        responses = self.cluster.execute_commands({
+            host_keys[0]: [(CounterTotalsScript, host_keys, host_arguments)]
+            for host_keys, host_arguments in six.itervalues(requests)
+        })
+
+        fmt = '<%dq' % slots
+        for results in six.itervalues(responses):
+            for i, value in enumerate(struct.unpack(fmt, results[0].value)):
+                totals[i] += value
+
+        return totals
+
+    def get_uncompacted_buckets(self, rollup, series):
+        """
+        Returns ``(bucket timestamp, timestamp)`` pairs for every bucket of
+        the finest rollup that has not yet been compacted into the ``series``
+        of ``rollup``.
+        """
+        watermark = self.cluster.get_routing_client().get(self.make_compaction_key('watermark'))
+        if watermark is None:
+            return []
+
+        counter_rollup = self.counter_rollup
+        now = self.normalize_to_rollup(timezone.now(), counter_rollup)
+        lower = max(int(watermark) + 1, now - self.rollups[counter_rollup] + 1)
+
+        buckets = []
+        for timestamp in series:
+            start = self.normalize_to_rollup(timestamp, counter_rollup)
+            for bucket in range(max(start, lower), min(start + rollup // counter_rollup, now + 1)):
+                buckets.append((to_datetime(bucket * counter_rollup), timestamp))
+        return buckets
+
+    def compact(self, timestamp=None):
+        """
+        Fold closed buckets of the finest rollup into the coarser rollups
+        when ``compact_counters`` is enabled, and close the buckets that
+        ended ``compaction_delay`` seconds ago.
+
+        Buckets are only folded during the run after the one that closed
+        them, so that writes that started before a bucket was closed have
+        been completed when it is read. At most ``compaction_batch_size``
+        buckets are folded per run.
+        """
+        if not self.compact_counters:
+            return
+
+        if timestamp is None:
+            timestamp = timezone.now()
+
+        rollup = self.counter_rollup
+        current = self.normalize_to_rollup(timestamp, rollup)
+
+        client = self.cluster.get_routing_client()
+        lock_key = self.make_compaction_key('lock')
+        if not client.set(lock_key, '1', nx=True, ex=60):
+            return
+
+        try:
+            closed_key = self.make_compaction_key('closed')
+            watermark_key = self.make_compaction_key('watermark')
+            closed, watermark = client.get(closed_key), client.get(watermark_key)
+            if closed is None or watermark is None:
+                for key in (closed_key, watermark_key):
+                    client.set(key, current - 1, nx=True)
+                return
+
+            # Buckets that are older than the finest rollup's retention have
+            # expired, so there is nothing left to compact.
+            closed = int(closed)
+            bucket = max(int(watermark) + 1, current - self.rollups[rollup] + 1)
+            metrics.timing('tsdb.compaction.lag', (current - bucket) * rollup)
+            for bucket in range(bucket, min(closed, bucket + self.compaction_batch_size - 1) + 1):
+                # Folding a bucket is idempotent, so it is safe to fold it
+                # again if the watermark could not be advanced.
+                self.compact_bucket(bucket)
+                client.set(watermark_key, bucket)
+
+            client.set(
+                closed_key,
+                max(
+                    closed,
+                    self.normalize_to_rollup(
+                        timestamp - timedelta(seconds=self.compaction_delay),
+                        rollup,
+                    ) - 1,
+                ),
+            )
+        finally:
+            client.delete(lock_key)
+
+    def compact_bucket(self, bucket):
+        rollup = self.counter_rollup
+        timestamp = to_datetime(bucket * rollup)
+
         with self.cluster.map() as client:
-            for key in keys:
-                for timestamp in series:
-                    hash_key, hash_field = self.make_counter_key(model, rollup, timestamp, key)
-                    results.append(
-                        (to_timestamp(timestamp), key, client.hget(
-                            hash_key, hash_field)))
+            responses = [
+                (model, vnode, client.hgetall(self.make_counter_hash_key(model, bucket, vnode)))
+                for model in self.models for vnode in range(self.vnodes)
+            ]
 
-        results_by_key = defaultdict(dict)
-        for epoch, key, count in results:
-            results_by_key[key][epoch] = int(count.value or 0)
+        commands = {}
+        for model, vnode, response in responses:
+            values = response.value
+            if not values:
+                continue
+
+            arguments = []
+            for field, count in six.iteritems(values):
+                arguments.extend((field, count))
+
+            for target_rollup, max_values in six.iteritems(self.rollups):
+                if target_rollup == rollup:
+                    continue
+                hash_key = self.make_counter_hash_key(
+                    model,
+                    self.normalize_to_rollup(timestamp, target_rollup),
+                    vnode,
+                )
+                commands[hash_key] = [(
+                    CompactScript,
+                    [hash_key],
+                    [bucket, self.calculate_expiry(target_rollup, max_values, timestamp)] + arguments,
+                )]
 
-        for key, points in six.iteritems(results_by_key):
-            results_by_key[key] = sorted(points.items())
-        return dict(results_by_key)
+        if commands:
+            self.cluster.execute_commands(commands)
 
     def merge(self, model, destination, sources, timestamp=None):
         rollups = self.get_active_series(timestamp=timestamp)
@@ -214,28 +493,32 @@ class RedisTSDB(BaseTSDB):
             for rollup, series in rollups.items():
                 data[rollup] = {}
                 for timestamp in series:
-                    results = data[rollup][timestamp] = []
+                    results = data[rollup][timestamp] = defaultdict(list)
                     for source in sources:
-                        source_hash_key, source_hash_field = self.make_counter_key(
+                        source_keys = self.make_counter_keys(
                             model,
                             rollup,
                             timestamp,
                             source,
                         )
-                        results.append(client.hget(source_hash_key, source_hash_field))
-                        client.hdel(source_hash_key, source_hash_field)
+                        for i, (source_hash_key, source_hash_field) in enumerate(source_keys):
+                            results[i].append(client.hget(source_hash_key, source_hash_field))
+                            client.hdel(source_hash_key, source_hash_field)
 
         with self.cluster.map() as client:
             for rollup, series in data.items():
-                for timestamp, results in series.items():
-                    total = sum(int(result.value or 0) for result in results)
-                    if total:
-                        destination_hash_key, destination_hash_field = self.make_counter_key(
-                            model,
-                            rollup,
-                            timestamp,
-                            destination,
-                        )
+                for timestamp, keys in series.items():
+                    destination_keys = self.make_counter_keys(
+                        model,
+                        rollup,
+                        timestamp,
+                        destination,
+                    )
+                    for i, results in keys.items():
+                        total = sum(int(result.value or 0) for result in results)
+                        if not total:
+                            continue
+                        destination_hash_key, destination_hash_field = destination_keys[i]
                         client.hincrby(
                             destination_hash_key,
                             destination_hash_field,
@@ -258,17 +541,18 @@ class RedisTSDB(BaseTSDB):
                 for timestamp in series:
                     for model in models:
                         for key in keys:
-                            hash_key, hash_field = self.make_counter_key(
+                            counter_keys = self.make_counter_keys(
                                 model,
                                 rollup,
                                 timestamp,
                                 key,
                             )
 
-                            client.hdel(
-                                hash_key,
-                                hash_field,
-                            )
+                            for hash_key, hash_field in counter_keys:
+                                client.hdel(
+                                    hash_key,
+                                    hash_field,
+                                )
 
     def record(self, model, key, values, timestamp=None):
         self.record_multi(((model, key, values), ), timestamp)
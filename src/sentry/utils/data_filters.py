@@ -9,11 +9,15 @@ from __future__ import absolute_import
 
 import fnmatch
 import ipaddress
+import re
 import six
 
+from bisect import bisect_right
 from django.utils.encoding import force_text
 
 from sentry import tsdb
+from sentry.models import ProjectOption
+from sentry.utils.datastructures import LRUCache
 
 
 class FilterStatKeys(object):
@@ -45,33 +49,100 @@ class FilterTypes(object):
     RELEASES = 'releases'
 
 
-def is_valid_ip(project, ip_address):
+# Compiled blacklists, keyed by the option values they were built from, so a
+# changed option simply compiles into a new entry.
+blacklist_cache = LRUCache(1000)
+
+# The enabled inbound filters of each project, along with the filter options
+# they were built from.
+project_filters_cache = LRUCache(1000)
+
+
+class IPBlacklist(object):
     """
-    Verify that an IP address is not being blacklisted
-    for the given project.
+    Blacklisted IP addresses and CIDR ranges. The ranges are kept as sorted,
+    merged intervals per IP version so a lookup is a single bisect.
     """
-    blacklist = project.get_option('sentry:blacklisted_ips')
-    if not blacklist:
-        return True
 
-    for addr in blacklist:
+    def __init__(self, blacklist):
+        self.addresses = set()
+        ranges = {4: [], 6: []}
+        for addr in blacklist:
+            self.addresses.add(addr)
+            if '/' not in addr:
+                continue
+            try:
+                network = ipaddress.ip_network(six.text_type(addr), strict=False)
+            except ValueError:
+                # Ignore invalid values here
+                continue
+            ranges[network.version].append(
+                (int(network.network_address), int(network.broadcast_address))
+            )
+
+        self.ranges = {}
+        for version, intervals in six.iteritems(ranges):
+            starts, ends = [], []
+            for start, end in sorted(intervals):
+                if ends and start <= ends[-1] + 1:
+                    ends[-1] = max(ends[-1], end)
+                else:
+                    starts.append(start)
+                    ends.append(end)
+            if starts:
+                self.ranges[version] = (starts, ends)
+
+    def __contains__(self, ip_address):
         # We want to error fast if it's an exact match
-        if ip_address == addr:
+        if ip_address in self.addresses:
+            return True
+
+        if not self.ranges:
             return False
 
-        # Check to make sure it's actually a range before
         try:
-            if '/' in addr and (
-                ipaddress.ip_address(six.text_type(ip_address)) in ipaddress.ip_network(
-                    six.text_type(addr), strict=False
-                )
-            ):
-                return False
+            ip_address = ipaddress.ip_address(six.text_type(ip_address))
         except ValueError:
-            # Ignore invalid values here
-            pass
+            return False
+
+        if ip_address.version not in self.ranges:
+            return False
+
+        starts, ends = self.ranges[ip_address.version]
+        value = int(ip_address)
+        idx = bisect_right(starts, value) - 1
+        return idx >= 0 and value <= ends[idx]
+
+
+def compile_globs(patterns):
+    """
+    Compiles case insensitive ``fnmatch`` patterns into a single regular
+    expression matching any of them.
+    """
+    return re.compile(
+        '|'.join('(?:%s)' % fnmatch.translate(p.lower()) for p in patterns)
+    )
 
-    return True
+
+def _get_compiled(kind, values, compile_func):
+    key = (kind, tuple(values))
+    rv = blacklist_cache.get(key)
+    if rv is None:
+        rv = compile_func(values)
+        blacklist_cache.set(key, rv)
+    return rv
+
+
+def is_valid_ip(project, ip_address):
+    """
+    Verify that an IP address is not being blacklisted
+    for the given project.
+    """
+    blacklist = project.get_option('sentry:blacklisted_ips')
+    if not blacklist:
+        return True
+
+    return ip_address not in _get_compiled('ip', blacklist, IPBlacklist)
 
 
 def is_valid_release(project, release):
@@ -85,11 +156,7 @@ def is_valid_release(project, release):
 
     release = force_text(release).lower()
 
-    for version in invalid_versions:
-        if fnmatch.fnmatch(release, version.lower()):
-            return False
-
-    return True
+    return not _get_compiled('glob', invalid_versions, compile_globs).match(release)
 
 
 def is_valid_error_message(project, message):
@@ -103,8 +170,27 @@ def is_valid_error_message(project, message):
 
     message = force_text(message).lower()
 
-    for error in filtered_errors:
-        if fnmatch.fnmatch(message, error.lower()):
-            return False
+    return not _get_compiled('glob', filtered_errors, compile_globs).match(message)
+
 
-    return True
+def get_enabled_filters(project):
+    """
+    Returns instances of the inbound filters enabled for the given project.
+    These are only rebuilt when the project's filter options change.
+    """
+    # the filters themselves import this module
+    from sentry import filters
+
+    filter_classes = tuple(filters.all())
+    options = {
+        k: v for k, v in six.iteritems(ProjectOption.objects.get_all_values(project))
+        if k.startswith('filters:')
+    }
+
+    cached = project_filters_cache.get(project.id)
+    if cached is not None and cached[:2] == (filter_classes, options):
+        return cached[2]
+
+    rv = [f for f in (cls(project) for cls in filter_classes) if f.is_enabled()]
+    project_filters_cache.set(project.id, (filter_classes, options, rv))
+    return rv
@@ -12,6 +12,30 @@ import six
 from six.moves.urllib.parse import urlsplit, urlunsplit
 
 from sentry.constants import DEFAULT_SCRUBBED_FIELDS, FILTER_MASK, NOT_SCRUBBED_VALUES
+from sentry.utils.datastructures import LRUCache
+
+# Compiled field matchers, keyed by the set of fields they match. The fields
+# come from the organization and project options, so there are only ever a
+# handful of distinct ones per worker.
+field_matcher_cache = LRUCache(1000)
+
+
+def get_field_matcher(fields):
+    """
+    Returns a compiled pattern that finds any of ``fields`` within a string
+    in a single pass, or ``None`` if there are no fields.
+    """
+    fields = frozenset(fields)
+    if not fields:
+        return None
+
+    matcher = field_matcher_cache.get(fields)
+    if matcher is None:
+        matcher = re.compile(
+            '|'.join(re.escape(f) for f in sorted(fields, key=len, reverse=True))
+        )
+        field_matcher_cache.set(fields, matcher)
+    return matcher
 
 
 def varmap(func, var, context=None, name=None):
@@ -23,21 +47,37 @@ def varmap(func, var, context=None, name=None):
     if context is None:
         context = set()
 
+    if not isinstance(var, (dict, list, tuple)):
+        return func(name, var)
+
     objid = id(var)
     if objid in context:
         return func(name, '<...>')
     context.add(objid)
 
+    # Leaves are handled inline, only nested containers recurse.
     if isinstance(var, dict):
-        ret = dict((k, varmap(func, v, context, k)) for k, v in six.iteritems(var))
-    elif isinstance(var, (list, tuple)):
+        ret = {}
+        for k, v in six.iteritems(var):
+            if isinstance(v, (dict, list, tuple)):
+                ret[k] = varmap(func, v, context, k)
+            else:
+                ret[k] = func(k, v)
+    elif all(isinstance(v, (list, tuple)) and len(v) == 2 for v in var):
         # treat it like a mapping
-        if all(isinstance(v, (list, tuple)) and len(v) == 2 for v in var):
-            ret = [[k, varmap(func, v, context, k)] for k, v in var]
-        else:
-            ret = [varmap(func, f, context, name) for f in var]
+        ret = []
+        for k, v in var:
+            if isinstance(v, (dict, list, tuple)):
+                ret.append([k, varmap(func, v, context, k)])
+            else:
+                ret.append([k, func(k, v)])
     else:
-        ret = func(name, var)
+        ret = []
+        for v in var:
+            if isinstance(v, (dict, list, tuple)):
+                ret.append(varmap(func, v, context, name))
+            else:
+                ret.append(func(name, v))
     context.remove(objid)
     return ret
 
@@ -60,6 +100,9 @@ class SensitiveDataFilter(object):
         ),
         re.DOTALL
     )
+    # No string shorter than this can match ``VALUES_RE`` (a social security
+    # number is the shortest), so those are not searched at all.
+    VALUES_RE_MIN_LENGTH = 11
     URL_PASSWORD_RE = re.compile(r'\b((?:[a-z0-9]+:)?//[a-zA-Z0-9%_.-]+:)([a-zA-Z0-9%_.-]+)@')
 
     def __init__(self, fields=None, include_defaults=True, exclude_fields=()):
@@ -71,6 +114,7 @@ class SensitiveDataFilter(object):
             fields += DEFAULT_SCRUBBED_FIELDS
         self.exclude_fields = {f.lower() for f in exclude_fields}
         self.fields = set(fields)
+        self.field_matcher = get_field_matcher(self.fields)
 
     def apply(self, data):
         # TODO(dcramer): move this into each interface
@@ -115,7 +159,7 @@ class SensitiveDataFilter(object):
             return value
 
         if isinstance(value, six.string_types):
-            if self.VALUES_RE.search(value):
+            if len(value) >= self.VALUES_RE_MIN_LENGTH and self.VALUES_RE.search(value):
                 return FILTER_MASK
 
             # Check if the value is a url-like object
@@ -124,16 +168,14 @@ class SensitiveDataFilter(object):
             if '//' in value and '@' in value:
                 value = self.URL_PASSWORD_RE.sub(r'\1' + FILTER_MASK + '@', value)
 
-        if isinstance(value, six.string_types):
-            str_value = value.lower()
-        else:
-            str_value = ''
+        matcher = self.field_matcher
+        if matcher is None:
+            return value
 
-        for field in self.fields:
-            if field in str_value:
-                return FILTER_MASK
-            if field in key and value not in NOT_SCRUBBED_VALUES:
-                return FILTER_MASK
+        if isinstance(value, six.string_types) and matcher.search(value.lower()):
+            return FILTER_MASK
+        if key and matcher.search(key) and value not in NOT_SCRUBBED_VALUES:
+            return FILTER_MASK
         return value
 
     def filter_stacktrace(self, data):
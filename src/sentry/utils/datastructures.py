@@ -1,6 +1,9 @@
 from __future__ import absolute_import
 
-from collections import Hashable, MutableMapping
+import threading
+
+from collections import Hashable, MutableMapping, OrderedDict
+from time import time
 
 __unset__ = object()
 
@@ -61,3 +64,81 @@ class BidirectionalMapping(MutableMapping):
 
     def inverse(self):
         return self.__inverse.copy()
+
+
+class LRUCache(object):
+    """\
+    A bounded, thread safe in-memory cache.
+
+    Once ``max_size`` entries are stored, the least recently used entry is
+    evicted to make room for a new one. If ``ttl`` (in seconds) is provided,
+    entries older than that are treated as missing. A ``max_size`` of zero
+    disables the cache entirely.
+
+    If a ``weigher`` callable is provided, ``max_size`` bounds the sum of
+    ``weigher(value)`` over all entries rather than the number of entries.
+    Values heavier than ``max_size`` are never stored.
+    """
+
+    def __init__(self, max_size, ttl=None, clock=time, weigher=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self.weigher = weigher if weigher is not None else (lambda value: 1)
+        self.weight = 0
+        self.__data = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.__data)
+
+    def __contains__(self, key):
+        return self.get(key, __unset__) is not __unset__
+
+    def get(self, key, default=None):
+        with self.__lock:
+            try:
+                expires, weight, value = self.__data.pop(key)
+            except KeyError:
+                return default
+
+            if expires is not None and expires <= self.clock():
+                self.weight -= weight
+                return default
+
+            # re-insert the item to mark it as the most recently used
+            self.__data[key] = (expires, weight, value)
+            return value
+
+    def set(self, key, value):
+        weight = self.weigher(value)
+        if self.max_size <= 0 or weight > self.max_size:
+            self.delete(key)
+            return
+
+        expires = self.clock() + self.ttl if self.ttl is not None else None
+        with self.__lock:
+            self.__pop(key)
+            while self.__data and self.weight + weight > self.max_size:
+                self.weight -= self.__data.popitem(last=False)[1][1]
+            self.__data[key] = (expires, weight, value)
+            self.weight += weight
+
+    def __pop(self, key):
+        item = self.__data.pop(key, __unset__)
+        if item is __unset__:
+            return False
+        self.weight -= item[1]
+        return True
+
+    def delete(self, key):
+        """\
+        Remove an entry from the cache, returning whether it was present.
+        """
+        with self.__lock:
+            return self.__pop(key)
+
+    def clear(self):
+        with self.__lock:
+            self.__data.clear()
+            self.weight = 0
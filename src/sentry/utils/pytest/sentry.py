@@ -67,6 +67,15 @@ def pytest_configure(config):
 
     settings.AUTH_PASSWORD_VALIDATORS = []
 
+    # Database rows are recycled between tests, which would leave the
+    # in-process hash to group and tag caches pointing at unrelated rows
+    settings.SENTRY_GROUPHASH_CACHE_SIZE = 0
+    settings.SENTRY_TAGSTORE_OPTIONS = {'cache_size': 0}
+    # Always check local model copies against the (per test) shared cache
+    settings.SENTRY_MODEL_LOCAL_CACHE_TTL = 0
+    # Write event outcomes before the store request returns
+    settings.SENTRY_OUTCOMES_FLUSH_INTERVAL = 0
+
     # Replace real sudo middleware with our mock sudo middleware
     # to assert that the user is always in sudo mode
     middleware = list(settings.MIDDLEWARE_CLASSES)
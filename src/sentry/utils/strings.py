@@ -46,14 +46,14 @@ def truncatechars(value, arg):
     return value
 
 
-def compress(value):
+def compress(value, level=zlib.Z_DEFAULT_COMPRESSION):
     """
     Compresses a value for safe passage as a string.
 
     This returns a unicode string rather than bytes, as the Django ORM works
     with unicode objects.
     """
-    return base64.b64encode(zlib.compress(value)).decode('utf-8')
+    return base64.b64encode(zlib.compress(value, level)).decode('utf-8')
 
 
 def decompress(value):
@@ -25,6 +25,7 @@ from sentry.models import Project, OrganizationOption, Organization
 from sentry.signals import (
     event_accepted, event_dropped, event_filtered, event_received)
 from sentry.quotas.base import RateLimit
+from sentry.tsdb.batch import BufferedTSDB
 from sentry.utils import json, metrics
 from sentry.utils.data_filters import FILTER_STAT_KEYS_TO_VALUES
 from sentry.utils.data_scrubber import SensitiveDataFilter
@@ -38,6 +39,10 @@ from sentry.web.helpers import render_to_response
 
 logger = logging.getLogger('sentry')
 
+# Received, filtered and rejected event counts are written in the background
+# so that floods of dropped events don't turn into floods of TSDB writes.
+outcomes = BufferedTSDB(tsdb, interval=settings.SENTRY_OUTCOMES_FLUSH_INTERVAL)
+
 # Transparent 1x1 gif
 # See http://probablyprogramming.com/2009/03/15/the-tiniest-gif-ever
 PIXEL = base64.b64decode('R0lGODlhAQABAAD/ACwAAAAAAQABAAACADs=')
@@ -228,7 +233,7 @@ class APIView(BaseView):
 
                     if not is_valid_origin(origin, project):
                         if project:
-                            tsdb.incr(
+                            outcomes.incr(
                                 tsdb.models.project_total_received_cors, project.id)
                         raise APIForbidden(
                             'Missing required Origin or Referer header')
@@ -366,7 +371,7 @@ class StoreView(APIView):
             except KeyError:
                 pass
 
-            tsdb.incr_multi(
+            outcomes.incr_multi(
                 increment_list
             )
 
@@ -392,7 +397,7 @@ class StoreView(APIView):
             if rate_limit is None:
                 helper.log.debug(
                     'Dropped event due to error with rate limiter')
-            tsdb.incr_multi(
+            outcomes.incr_multi(
                 [
                     (tsdb.models.project_total_received, project.id),
                     (tsdb.models.project_total_rejected, project.id),
@@ -419,7 +424,7 @@ class StoreView(APIView):
             if rate_limit is not None:
                 raise APIRateLimited(rate_limit.retry_after)
         else:
-            tsdb.incr_multi(
+            outcomes.incr_multi(
                 [
                     (tsdb.models.project_total_received, project.id),
                     (tsdb.models.organization_total_received,
@@ -101,36 +101,23 @@ class AuthenticationForm(forms.Form):
         return value.lower()
 
     def is_rate_limited(self):
-        if self._is_ip_rate_limited():
-            return True
-        if self._is_user_rate_limited():
-            return True
-        return False
+        limits = []
 
-    def _is_ip_rate_limited(self):
         limit = options.get('auth.ip-rate-limit')
-        if not limit:
-            return False
-
-        ip_address = self.request.META['REMOTE_ADDR']
-        return ratelimiter.is_limited(
-            'auth:ip:{}'.format(ip_address),
-            limit,
-        )
+        if limit:
+            ip_address = self.request.META['REMOTE_ADDR']
+            limits.append(('auth:ip:{}'.format(ip_address), limit, None))
 
-    def _is_user_rate_limited(self):
         limit = options.get('auth.user-rate-limit')
-        if not limit:
-            return False
-
         username = self.cleaned_data.get('username')
-        if not username:
+        if limit and username:
+            limits.append((u'auth:username:{}'.format(username), limit, None))
+
+        if not limits:
             return False
 
-        return ratelimiter.is_limited(
-            u'auth:username:{}'.format(username),
-            limit,
-        )
+        # check both limits in a single round trip
+        return ratelimiter.is_limited_many(limits)
 
     def clean(self):
         username = self.cleaned_data.get('username')
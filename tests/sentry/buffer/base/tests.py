@@ -3,12 +3,15 @@
 from __future__ import absolute_import
 
 import mock
+import pytest
 
 from datetime import timedelta
 from django.utils import timezone
 from sentry.buffer.base import Buffer
+from sentry.event_manager import ScoreClause
 from sentry.models import Group, Organization, Project, Release, ReleaseProject, Team
 from sentry.testutils import TestCase
+from sentry.utils.db import is_postgres
 
 
 class BufferTest(TestCase):
@@ -65,3 +68,51 @@ class BufferTest(TestCase):
         self.buf.process(ReleaseProject, columns, filters)
         release_project_ = ReleaseProject.objects.get(id=release_project.id)
         assert release_project_.new_groups == 1
+
+    @mock.patch('sentry.buffer.base.buffer_incr_complete')
+    def test_process_batch(self, buffer_incr_complete):
+        group = Group.objects.create(project=Project(id=1))
+        other_group = Group.objects.create(project=Project(id=1))
+        the_date = (timezone.now() + timedelta(days=5)).replace(microsecond=0)
+        self.buf.process_batch(Group, [
+            ({'times_seen': 2}, {'id': group.id}, {'last_seen': the_date}),
+            ({'times_seen': 3}, {'id': other_group.id}, {'last_seen': the_date}),
+            ({'times_seen': 1}, {'message': 'foo bar', 'project_id': 1}, {}),
+        ])
+
+        group_ = Group.objects.get(id=group.id)
+        assert group_.times_seen == group.times_seen + 2
+        assert group_.last_seen.replace(microsecond=0) == the_date
+        assert Group.objects.get(id=other_group.id).times_seen == other_group.times_seen + 3
+        assert Group.objects.get(message='foo bar').times_seen == 2
+
+        assert buffer_incr_complete.send_robust.call_count == 3
+        created = sorted(
+            call[1]['created'] for call in buffer_incr_complete.send_robust.call_args_list
+        )
+        assert created == [False, False, True]
+
+    def test_process_batch_pk_filter(self):
+        group = Group.objects.create(project=Project(id=1))
+        self.buf.process_batch(Group, [
+            ({'times_seen': 2}, {'pk': group.id}, {}),
+            ({'times_seen': 1}, {'id': group.id}, {}),
+        ])
+        assert Group.objects.get(id=group.id).times_seen == group.times_seen + 3
+
+    @pytest.mark.skipif(not is_postgres(), reason='Bulk updates require PostgreSQL')
+    def test_process_batch_uses_single_statement(self):
+        groups = [Group.objects.create(project=Project(id=1)) for _ in range(3)]
+        with self.assertNumQueries(1):
+            self.buf.process_batch(Group, [
+                ({'times_seen': 1}, {'id': group.id}, {
+                    'last_seen': group.last_seen,
+                    'score': ScoreClause(group),
+                    'data': {'foo': 'bar'},
+                }) for group in groups
+            ])
+        for group in groups:
+            group_ = Group.objects.get(id=group.id)
+            assert group_.times_seen == group.times_seen + 1
+            assert group_.score == ScoreClause.calculate(group.times_seen, group.last_seen)
+            assert group_.data == {'foo': 'bar'}
@@ -53,6 +53,123 @@ class RedisBufferTest(TestCase):
         client = self.buf.cluster.get_routing_client()
         assert client.zrange('b:p', 0, -1) == []
 
+    @mock.patch('sentry.buffer.redis.process_incr')
+    def test_process_pending_adapts_batch_size(self, process_incr):
+        self.buf.incr_batch_target = 2
+        self.buf.pending_window_size = 2
+        with self.buf.cluster.map() as client:
+            for i in range(5):
+                client.zadd('b:p', i, 'foo%d' % i)
+        self.buf.process_pending()
+        assert process_incr.apply_async.mock_calls == [
+            mock.call(kwargs={'batch_keys': ['foo0', 'foo1', 'foo2']}),
+            mock.call(kwargs={'batch_keys': ['foo3', 'foo4']}),
+        ]
+        client = self.buf.cluster.get_routing_client()
+        assert client.zrange('b:p', 0, -1) == []
+
+    @mock.patch('sentry.buffer.redis.process_incr')
+    def test_process_pending_skips_newer_keys(self, process_incr):
+        with self.buf.cluster.map() as client:
+            client.zadd('b:p', 1, 'foo')
+            client.zadd('b:p', 2 ** 40, 'bar')
+        self.buf.process_pending()
+        process_incr.apply_async.assert_called_once_with(kwargs={
+            'batch_keys': ['foo'],
+        })
+        client = self.buf.cluster.get_routing_client()
+        assert client.zrange('b:p', 0, -1) == ['bar']
+
+    @mock.patch('sentry.buffer.base.Buffer.process', mock.Mock())
+    @mock.patch('sentry.buffer.redis.process_pending')
+    @mock.patch('sentry.buffer.redis.process_incr')
+    def test_process_pending_partitions(self, process_incr, process_pending):
+        buf = RedisBuffer(pending_partitions=2)
+        model = mock.Mock()
+        model.__name__ = 'Mock'
+        keys = []
+        for i in range(10):
+            buf.incr(model, {'times_seen': 1}, {'pk': i})
+            keys.append(buf._make_key(model, {'pk': i}))
+
+        client = buf.cluster.get_routing_client()
+        assert client.zrange('b:p', 0, -1) == []
+        partitions = [client.zrange('b:p:0', 0, -1), client.zrange('b:p:1', 0, -1)]
+        assert sorted(partitions[0] + partitions[1]) == sorted(keys)
+        assert all(partitions)
+
+        buf.process_pending()
+        assert process_pending.apply_async.mock_calls == [
+            mock.call(kwargs={'partition': 0}),
+            mock.call(kwargs={'partition': 1}),
+        ]
+        assert not process_incr.apply_async.called
+
+        buf.process_pending(partition=0)
+        assert sorted(
+            key for call in process_incr.apply_async.mock_calls
+            for key in call[2]['kwargs']['batch_keys']
+        ) == sorted(partitions[0])
+        assert client.zrange('b:p:0', 0, -1) == []
+        assert sorted(client.zrange('b:p:1', 0, -1)) == sorted(partitions[1])
+
+        buf.process(key=partitions[1][0])
+        assert partitions[1][0] not in client.zrange('b:p:1', 0, -1)
+
+    @mock.patch('sentry.buffer.redis.process_pending')
+    @mock.patch('sentry.buffer.redis.process_incr')
+    def test_process_pending_enabling_partitions(self, process_incr, process_pending):
+        model = mock.Mock()
+        model.__name__ = 'Mock'
+        self.buf.incr(model, {'times_seen': 1}, {'pk': 1})
+        key = self.buf._make_key(model, {'pk': 1})
+
+        client = self.buf.cluster.get_routing_client()
+        assert client.zrange('b:p', 0, -1) == [key]
+
+        buf = RedisBuffer(pending_partitions=2)
+        buf.process_pending()
+        assert process_pending.apply_async.call_count == 2
+        process_incr.apply_async.assert_called_once_with(kwargs={'batch_keys': [key]})
+        assert client.zrange('b:p', 0, -1) == []
+
+    @mock.patch('sentry.buffer.redis.process_incr', mock.Mock())
+    @mock.patch('sentry.buffer.redis.RedisBuffer.process_batch')
+    def test_process_bulk(self, process_batch):
+        buf = RedisBuffer(bulk_process=True)
+        for i in range(3):
+            buf.incr(Group, {'times_seen': 1}, {'pk': i}, {'foo': 'bar'})
+        buf.incr(Project, {'times_seen': 1}, {'pk': 1})
+
+        buf.process(batch_keys=[
+            buf._make_key(Group, {'pk': 0}),
+            buf._make_key(Group, {'pk': 1}),
+            buf._make_key(Project, {'pk': 1}),
+        ])
+        assert sorted(process_batch.mock_calls) == sorted([
+            mock.call(Group, [
+                ({'times_seen': 1}, {'pk': 0}, {'foo': 'bar'}),
+                ({'times_seen': 1}, {'pk': 1}, {'foo': 'bar'}),
+            ]),
+            mock.call(Project, [({'times_seen': 1}, {'pk': 1}, {})]),
+        ])
+
+        client = buf.cluster.get_routing_client()
+        assert client.zrange('b:p', 0, -1) == [buf._make_key(Group, {'pk': 2})]
+
+    @mock.patch('sentry.buffer.redis.process_incr', mock.Mock())
+    @mock.patch('sentry.buffer.redis.RedisBuffer.process_batch', side_effect=Exception('boom'))
+    def test_process_bulk_failure(self, process_batch):
+        groups = [self.create_group(), self.create_group()]
+        buf = RedisBuffer(bulk_process=True)
+        for group in groups:
+            buf.incr(Group, {'times_seen': 2}, {'pk': group.id})
+
+        buf.process(batch_keys=[buf._make_key(Group, {'pk': group.id}) for group in groups])
+        assert process_batch.call_count == 1
+        for group in groups:
+            assert Group.objects.get(id=group.id).times_seen == group.times_seen + 2
+
     @mock.patch('sentry.buffer.redis.RedisBuffer._make_key', mock.Mock(return_value='foo'))
     @mock.patch('sentry.buffer.base.Buffer.process')
     def test_process_does_bubble_up(self, process):
@@ -99,3 +216,55 @@ class RedisBufferTest(TestCase):
         }
         pending = client.zrange('b:p', 0, -1)
         assert pending == ['foo']
+
+    @mock.patch('sentry.buffer.redis.RedisBuffer._make_key', mock.Mock(return_value='foo'))
+    @mock.patch('sentry.buffer.redis.process_incr', mock.Mock())
+    def test_incr_with_local_buffer(self):
+        buf = RedisBuffer(local_buffer_size=2, local_buffer_interval=60)
+        client = buf.cluster.get_routing_client()
+        model = mock.Mock()
+        model.__name__ = 'Mock'
+        filters = {'pk': 1}
+        buf.incr(model, {'times_seen': 1}, filters, extra={'foo': 'bar'})
+        buf.incr(model, {'times_seen': 2}, filters, extra={'foo': 'baz'})
+        assert client.hgetall('foo') == {}
+
+        buf.flush_local_buffer()
+        assert client.hgetall('foo') == {
+            'e+foo': "S'baz'\np1\n.",
+            'f': "(dp1\nS'pk'\np2\nI1\ns.",
+            'i+times_seen': '3',
+            'm': 'mock.Mock',
+        }
+        assert client.zrange('b:p', 0, -1) == ['foo']
+
+    @mock.patch('sentry.buffer.redis.process_incr', mock.Mock())
+    def test_local_buffer_flushes_on_timer(self):
+        buf = RedisBuffer(local_buffer_size=100, local_buffer_interval=0.01)
+        client = buf.cluster.get_routing_client()
+        model = mock.Mock()
+        model.__name__ = 'Mock'
+        buf.incr(model, {'times_seen': 1}, {'pk': 1})
+
+        timer = buf._local_buffer_timer
+        timer.join(5)
+        assert not timer.is_alive()
+        assert buf._local_buffer == {}
+        assert client.zrange('b:p', 0, -1) == [buf._make_key(model, {'pk': 1})]
+
+    @mock.patch('sentry.buffer.redis.process_incr', mock.Mock())
+    def test_local_buffer_flushes_when_full(self):
+        buf = RedisBuffer(local_buffer_size=2, local_buffer_interval=60)
+        client = buf.cluster.get_routing_client()
+        model = mock.Mock()
+        model.__name__ = 'Mock'
+        buf.incr(model, {'times_seen': 1}, {'pk': 1})
+        buf.incr(model, {'times_seen': 1}, {'pk': 1})
+        assert client.zrange('b:p', 0, -1) == []
+
+        buf.incr(model, {'times_seen': 1}, {'pk': 2})
+        assert sorted(client.zrange('b:p', 0, -1)) == sorted([
+            buf._make_key(model, {'pk': 1}),
+            buf._make_key(model, {'pk': 2}),
+        ])
+        assert client.hget(buf._make_key(model, {'pk': 1}), 'i+times_seen') == '2'
@@ -0,0 +1,22 @@
+from __future__ import absolute_import
+
+from django.core.cache import cache
+
+from sentry.cache.codecs import ZLIB_JSON
+from sentry.cache.django import DjangoCache
+from sentry.testutils import TestCase
+
+
+class DjangoCacheTest(TestCase):
+    def test_codec(self):
+        backend = DjangoCache(codec={'path': 'sentry.cache.codecs.CompressedJSONCodec'})
+
+        backend.set('foo', {'foo': 'bar'}, 50)
+        assert backend.get('foo') == {'foo': 'bar'}
+        assert cache.get('foo', version=backend.version)[:1] == ZLIB_JSON
+
+    def test_no_codec(self):
+        backend = DjangoCache()
+
+        backend.set('foo', ('bar', 1), 50)
+        assert backend.get('foo') == ('bar', 1)
@@ -2,8 +2,10 @@
 
 from __future__ import absolute_import
 
+from sentry.cache.codecs import JSON, ZLIB_JSON
 from sentry.cache.redis import RedisCache, ValueTooLarge
 from sentry.testutils import TestCase
+from sentry.utils import json
 
 
 class RedisCacheTest(TestCase):
@@ -23,3 +25,30 @@ class RedisCacheTest(TestCase):
 
         with self.assertRaises(ValueTooLarge):
             self.backend.set('foo', 'x' * (RedisCache.max_size + 1), 0)
+
+    def test_compressed_codec(self):
+        backend = RedisCache(codec={'path': 'sentry.cache.codecs.CompressedJSONCodec'})
+        value = {'frames': [{'filename': u'fôo.py', 'lineno': 1}] * 100}
+
+        backend.set('foo', value, 50)
+        assert backend.get('foo') == value
+
+        raw = backend.client.get(backend.make_key('foo'))
+        assert raw[:1] == ZLIB_JSON
+        assert len(raw) < len(json.dumps(value))
+
+        # values are readable regardless of the codec they were written with
+        assert self.backend.get('foo') == value
+        self.backend.set('foo', value, 50)
+        assert backend.get('foo') == value
+
+    def test_codec_prefix(self):
+        self.backend.set('foo', {'foo': 'bar'}, 50)
+
+        raw = self.backend.client.get(self.backend.make_key('foo'))
+        assert raw[:1] == JSON
+        assert json.loads(raw[1:]) == {'foo': 'bar'}
+
+        # values written without a format byte are still readable
+        self.backend.client.set(self.backend.make_key('foo'), json.dumps({'foo': 'baz'}))
+        assert self.backend.get('foo') == {'foo': 'baz'}
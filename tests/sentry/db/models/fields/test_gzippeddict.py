@@ -0,0 +1,56 @@
+from __future__ import absolute_import
+
+from datetime import datetime
+
+from sentry.db.models.fields.gzippeddict import (
+    JSON_PREFIX, ZLIB_JSON_PREFIX, decode, encode, is_encoded
+)
+from sentry.models import Group
+from sentry.testutils import TestCase
+from sentry.utils.compat import pickle
+from sentry.utils.strings import compress
+
+
+class EncodingTest(TestCase):
+    def test_pickle_encoding(self):
+        value = {'foo': 'bar'}
+        encoded = encode(value)
+        assert is_encoded(encoded)
+        assert encoded == compress(pickle.dumps(value))
+        assert decode(encoded) == value
+
+    def test_json(self):
+        value = {'foo': [1, 2.5, None, {'bar': u'b\xe4z'}]}
+        with self.settings(SENTRY_DICT_FIELD_ENCODING='json'):
+            encoded = encode(value)
+            assert encoded.startswith(JSON_PREFIX)
+            assert is_encoded(encoded)
+        assert decode(encoded) == value
+
+    def test_compressed_json(self):
+        value = {'foo': 'bar' * 1000}
+        with self.settings(SENTRY_DICT_FIELD_ENCODING='json'):
+            encoded = encode(value)
+        assert encoded.startswith(ZLIB_JSON_PREFIX)
+        assert decode(encoded) == value
+
+    def test_pickle_fallback(self):
+        # values that JSON can't represent exactly are still pickled
+        with self.settings(SENTRY_DICT_FIELD_ENCODING='json'):
+            for value in (
+                {'foo': datetime(2017, 1, 1)},
+                {'tags': [('foo', 'bar')]},
+                {1: 'foo'},
+            ):
+                encoded = encode(value)
+                assert not is_encoded(encoded)
+                assert decode(encoded) == value
+
+    def test_legacy_value(self):
+        group = self.create_group(data={'foo': 'bar'})
+        with self.settings(SENTRY_DICT_FIELD_ENCODING='json'):
+            Group.objects.filter(id=group.id).update(data={'baz': 'qux'})
+        assert Group.objects.get(id=group.id).data == {'baz': 'qux'}
+
+        raw = compress(pickle.dumps({'foo': 'bar'}))
+        assert Group._meta.get_field('data').to_python(raw) == {'foo': 'bar'}
@@ -0,0 +1,103 @@
+from __future__ import absolute_import
+
+from mock import patch
+
+from sentry.models import Event, Project
+from sentry.testutils import TestCase
+from sentry.utils.cache import cache
+
+
+class GetFromCacheTest(TestCase):
+    def test_local_cache(self):
+        project = self.create_project()
+        assert Project.objects.get_from_cache(id=project.id) == project
+
+        with self.assertNumQueries(0), \
+                self.settings(SENTRY_MODEL_LOCAL_CACHE_TTL=60):
+            # doesn't need the shared cache at all
+            cache.clear()
+            result = Project.objects.get_from_cache(id=project.id)
+            assert result == project
+            assert result is not Project.objects.get_from_cache(id=project.id)
+
+        # a cleared cache means the local copy can't be verified anymore
+        with self.assertNumQueries(1):
+            assert Project.objects.get_from_cache(id=project.id) == project
+
+    def test_local_cache_invalidation(self):
+        project = self.create_project(name='foo')
+        Project.objects.get_from_cache(id=project.id)
+        assert Project.objects.get_from_cache(slug=project.slug).name == 'foo'
+
+        project.update(name='bar')
+
+        with self.assertNumQueries(0):
+            assert Project.objects.get_from_cache(id=project.id).name == 'bar'
+            assert Project.objects.get_from_cache(slug=project.slug).name == 'bar'
+
+    def test_get_many_from_cache(self):
+        project1 = self.create_project()
+        project2 = self.create_project()
+
+        assert Project.objects.get_many_from_cache(
+            [project2.id, project1, 0],
+        ) == [project2, project1]
+
+        with self.assertNumQueries(0):
+            assert Project.objects.get_many_from_cache(
+                [project1.id, project2.id],
+            ) == [project1, project2]
+
+    def test_get_many_from_cache_not_cached(self):
+        project = self.create_project()
+
+        with self.assertNumQueries(1):
+            assert Project.objects.get_many_from_cache(
+                [project.slug], key='slug',
+            ) == [project]
+
+    def test_get_many_from_cache_not_cached_order(self):
+        project1 = self.create_project()
+        project2 = self.create_project()
+
+        assert Project.objects.get_many_from_cache(
+            [project2.slug, 'missing', project1.slug], key='slug',
+        ) == [project2, project1]
+        assert Project.objects.get_many_from_cache(
+            [project1.slug, project2.slug], key='slug',
+        ) == [project1, project2]
+
+    def test_get_many_from_cache_not_cached_foreign_key(self):
+        team1 = self.create_team()
+        team2 = self.create_team()
+        project1 = self.create_project(team=team1)
+        project2 = self.create_project(team=team2)
+
+        assert Project.objects.get_many_from_cache(
+            [team2, team1.id], key='team',
+        ) == [project2, project1]
+
+
+class SaveNodesTest(TestCase):
+    def test_save_nodes(self):
+        events = [
+            Event(project_id=1, event_id='a' * 32, data={'foo': 'bar'}),
+            Event(project_id=1, event_id='b' * 32, data={'foo': 'baz'}),
+        ]
+
+        with patch('sentry.db.models.manager.nodestore') as nodestore:
+            nodestore.generate_id.side_effect = ['node1', 'node2']
+            Event.objects.save_nodes(events, 'data')
+        nodestore.set_multi.assert_called_once_with({
+            'node1': {'foo': 'bar'},
+            'node2': {'foo': 'baz'},
+        })
+
+        with patch('sentry.db.models.fields.node.nodestore') as nodestore:
+            Event.objects.bulk_create(events)
+        assert not nodestore.set.called
+        assert not nodestore.create.called
+
+        assert sorted(
+            e.data.id for e in Event.objects.filter(project_id=1)
+        ) == ['node1', 'node2']
@@ -9,7 +9,9 @@ from django.template.loader import render_to_string
 from exam import fixture
 
 from sentry.interfaces.base import InterfaceValidationError
-from sentry.interfaces.stacktrace import (Frame, Stacktrace, get_context, slim_frame_data)
+from sentry.interfaces.stacktrace import (
+    Frame, Stacktrace, frame_hash_cache, get_context, slim_frame_data
+)
 from sentry.models import Event
 from sentry.testutils import TestCase
 
@@ -600,6 +602,49 @@ class StacktraceTest(TestCase):
             'main',
         ])
 
+    def test_get_hash_is_cached_per_frame(self):
+        frame_hash_cache.clear()
+        interface = Frame.to_python({'lineno': 1, 'filename': 'foo.py', 'function': 'bar'})
+        with mock.patch.object(Frame, '_compute_hash',
+                               wraps=interface._compute_hash) as compute_hash:
+            assert interface.get_hash() == ['foo.py', 'bar']
+            result = interface.get_hash()
+            assert result == ['foo.py', 'bar']
+            assert compute_hash.call_count == 1
+
+            # callers are free to mutate the result
+            result.append('baz')
+            assert interface.get_hash() == ['foo.py', 'bar']
+
+            # the platform is part of the key
+            assert interface.get_hash('javascript') == ['foo.py', 'bar']
+            assert compute_hash.call_count == 2
+
+    def test_get_hash_cache_is_keyed_by_frame_contents(self):
+        frame_hash_cache.clear()
+        Frame.to_python({'lineno': 1, 'filename': 'foo.py', 'function': 'bar'}).get_hash()
+        interface = Frame.to_python({
+            'lineno': 1,
+            'filename': 'foo.py',
+            'function': 'bar',
+            'context_line': 'foo bar',
+        })
+        assert interface.get_hash() == ['foo.py', 'foo bar']
+
+    @mock.patch('sentry.interfaces.stacktrace.metrics')
+    def test_get_hash_records_cache_hits(self, metrics):
+        frame_hash_cache.clear()
+        interface = Stacktrace.to_python({
+            'frames': [
+                {'lineno': 1, 'filename': 'foo.py'},
+                {'lineno': 1, 'filename': 'foo.py'},
+                {'lineno': 2, 'filename': 'bar.py'},
+            ],
+        })
+        assert interface.get_hash() == ['foo.py', 1, 'foo.py', 1, 'bar.py', 2]
+        metrics.incr.assert_any_call('grouping.frame-hash.cache.hit', amount=1)
+        metrics.incr.assert_any_call('grouping.frame-hash.cache.miss', amount=2)
+
     @mock.patch('sentry.interfaces.stacktrace.Stacktrace.get_stacktrace')
     def test_to_string_returns_stacktrace(self, get_stacktrace):
         event = mock.Mock(spec=Event())
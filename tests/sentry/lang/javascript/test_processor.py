@@ -2,9 +2,13 @@
 
 from __future__ import absolute_import
 
+import base64
+import os
 import pytest
 import responses
+import shutil
 import six
+import tempfile
 from libsourcemap import Token
 
 from mock import patch
@@ -20,6 +24,7 @@ from sentry.lang.javascript.processor import (
     fetch_release_file,
     UnparseableSourcemap,
 )
+from sentry.lang.javascript.cache import SourceMapViewCache
 from sentry.lang.javascript.errormapping import (rewrite_exception, REACT_MAPPING_URL)
 from sentry.models import File, Release, ReleaseFile, EventError
 from sentry.testutils import TestCase
@@ -426,6 +431,55 @@ class FetchSourcemapTest(TestCase):
         with pytest.raises(UnparseableSourcemap):
             fetch_sourcemap('http://example.com')
 
+    def test_release_artifact_is_cached(self):
+        project = self.project
+        release = Release.objects.create(
+            organization_id=project.organization_id,
+            version='abc',
+        )
+        release.add_project(project)
+
+        file = File.objects.create(
+            name='file.min.js.map',
+            type='release.file',
+            headers={'Content-Type': 'application/json'},
+        )
+        file.putfile(six.BytesIO(base64.b64decode(base64_sourcemap.split(',', 1)[1])))
+
+        ReleaseFile.objects.create(
+            name='http://example.com/file.min.js.map',
+            release=release,
+            organization_id=project.organization_id,
+            file=file,
+        )
+
+        cache_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_path)
+        views = SourceMapViewCache(1024 * 1024)
+
+        with self.options({'sourcemaps.cache-path': cache_path}), \
+                patch('sentry.lang.javascript.processor.sourcemap_views', views):
+            smap_view = fetch_sourcemap('http://example.com/file.min.js.map', release=release)
+            assert smap_view.get_source_contents(0) == 'console.log("hello, World!")'
+            assert os.path.isfile(views.get_index_path(file.checksum))
+
+            with patch('sentry.lang.javascript.processor.view_from_json') as view_from_json:
+                assert fetch_sourcemap(
+                    'http://example.com/file.min.js.map', release=release
+                ) is smap_view
+
+                # other workers read the serialized index instead of parsing
+                views = SourceMapViewCache(1024 * 1024)
+                with patch('sentry.lang.javascript.processor.sourcemap_views', views):
+                    smap_view = fetch_sourcemap(
+                        'http://example.com/file.min.js.map', release=release
+                    )
+
+                assert not view_from_json.called
+
+        assert list(smap_view) == [Token(1, 0, '/test.js', 0, 0, 0, None)]
+        assert smap_view.get_source_contents(0) == 'console.log("hello, World!")'
+
 
 class TrimLineTest(TestCase):
     long_line = 'The public is more familiar with bad design than good design. It is, in effect, conditioned to prefer bad design, because that is what it lives with. The new becomes threatening, the old reassuring.'
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+
+import threading
+
+from sentry.nodestore.base import NodeStorage
+from sentry.nodestore.cached.backend import CachedNodeStorage
+from sentry.testutils import TestCase
+
+
+class InMemoryBackend(NodeStorage):
+    # ``NodeStorage`` is thread local, so the storage is passed in to be
+    # shared between threads
+    def __init__(self, data, calls, gate=None):
+        self._data = data
+        self.calls = calls
+        self.gate = gate
+
+    def set(self, id, data):
+        self._data[id] = data
+
+    def delete(self, id):
+        self._data.pop(id, None)
+
+    def get(self, id):
+        return self._data.get(id)
+
+    def get_multi(self, id_list):
+        self.calls.append(sorted(id_list))
+        if self.gate is not None:
+            self.gate.wait()
+        return super(InMemoryBackend, self).get_multi(id_list)
+
+
+class CachedNodeStorageTest(TestCase):
+    def setUp(self):
+        self.calls = []
+        self.ns = CachedNodeStorage(
+            backend=(InMemoryBackend, {'data': {}, 'calls': self.calls}),
+        )
+
+    def test_get(self):
+        self.ns.set('a', {'foo': 'bar'})
+
+        assert self.ns.get('a') == {'foo': 'bar'}
+        assert self.ns.get('a') == {'foo': 'bar'}
+        assert self.calls == [['a']]
+
+    def test_get_multi(self):
+        self.ns.set_multi({'a': {'foo': 'bar'}, 'b': {'foo': 'baz'}})
+
+        assert self.ns.get_multi(['a']) == {'a': {'foo': 'bar'}}
+        assert self.ns.get_multi(['a', 'b', 'c']) == {
+            'a': {'foo': 'bar'},
+            'b': {'foo': 'baz'},
+            'c': None,
+        }
+        # missing nodes are not cached
+        assert self.calls == [['a'], ['b', 'c']]
+
+    def test_returns_copies(self):
+        self.ns.set('a', {'foo': 'bar'})
+
+        self.ns.get('a')['foo'] = 'baz'
+        self.ns.get('a')['foo'] = 'baz'
+        assert self.ns.get('a') == {'foo': 'bar'}
+
+    def test_invalidation(self):
+        self.ns.set('a', {'foo': 'bar'})
+        assert self.ns.get('a') == {'foo': 'bar'}
+
+        self.ns.set('a', {'foo': 'baz'})
+        assert self.ns.get('a') == {'foo': 'baz'}
+
+        self.ns.set_multi({'a': {'foo': 'biz'}})
+        assert self.ns.get('a') == {'foo': 'biz'}
+
+        self.ns.delete('a')
+        assert self.ns.get('a') is None
+
+        self.ns.set('a', {'foo': 'bar'})
+        assert self.ns.get('a') == {'foo': 'bar'}
+        self.ns.delete_multi(['a'])
+        assert self.ns.get('a') is None
+
+    def test_cache_size(self):
+        ns = CachedNodeStorage(
+            backend=(InMemoryBackend, {'data': {}, 'calls': self.calls}),
+            cache_size=10,
+        )
+        ns.set('a', {'foo': 'bar' * 10})
+
+        assert ns.get('a') == {'foo': 'bar' * 10}
+        assert ns.get('a') == {'foo': 'bar' * 10}
+        assert self.calls == [['a'], ['a']]
+
+    def test_shared_between_threads(self):
+        self.ns.set('a', {'foo': 'bar'})
+        assert self.ns.get('a') == {'foo': 'bar'}
+
+        results = []
+        thread = threading.Thread(target=lambda: results.append(self.ns.get('a')))
+        thread.start()
+        thread.join()
+
+        assert results == [{'foo': 'bar'}]
+        assert self.calls == [['a']]
+
+    def test_coalesces_concurrent_fetches(self):
+        gate = threading.Event()
+        ns = CachedNodeStorage(
+            backend=(InMemoryBackend, {'data': {}, 'calls': self.calls, 'gate': gate}),
+        )
+        ns.backend._data['a'] = {'foo': 'bar'}
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(ns.get('a'))) for _ in range(3)
+        ]
+        for thread in threads:
+            thread.start()
+        gate.set()
+        for thread in threads:
+            thread.join()
+
+        assert results == [{'foo': 'bar'}] * 3
+        assert self.calls == [['a']]
@@ -65,6 +65,28 @@ class DjangoNodeStorageTest(TestCase):
             'foo': 'baz',
         }
 
+    def test_set_multi_existing(self):
+        Node.objects.create(id='d2502ebbd7df41ceba8d3275595cac33', data={
+            'foo': 'bar',
+        })
+
+        self.ns.set_multi(
+            {
+                'd2502ebbd7df41ceba8d3275595cac33': {
+                    'foo': 'baz',
+                },
+                '5394aa025b8e401ca6bc3ddee3130edc': {
+                    'foo': 'biz',
+                },
+            }
+        )
+        assert Node.objects.get(id='d2502ebbd7df41ceba8d3275595cac33').data == {
+            'foo': 'baz',
+        }
+        assert Node.objects.get(id='5394aa025b8e401ca6bc3ddee3130edc').data == {
+            'foo': 'biz',
+        }
+
     def test_create(self):
         node_id = self.ns.create({
             'foo': 'bar',
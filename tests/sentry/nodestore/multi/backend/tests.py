@@ -2,14 +2,18 @@
 
 from __future__ import absolute_import
 
+import pytest
+
 from sentry.nodestore.base import NodeStorage
 from sentry.nodestore.multi.backend import MultiNodeStorage
 from sentry.testutils import TestCase
 
 
 class InMemoryBackend(NodeStorage):
-    def __init__(self):
-        self._data = {}
+    # ``NodeStorage`` is thread local and ``MultiNodeStorage`` writes from a
+    # thread pool, so the storage is passed in to be shared between threads
+    def __init__(self, data):
+        self._data = data
 
     def set(self, id, data):
         self._data[id] = data
@@ -17,12 +21,20 @@ class InMemoryBackend(NodeStorage):
     def get(self, id):
         return self._data.get(id)
 
+    def delete(self, id):
+        self._data.pop(id, None)
+
+
+class BrokenBackend(InMemoryBackend):
+    def set(self, id, data):
+        raise ValueError('boom')
+
 
 class MultiNodeStorageTest(TestCase):
     def setUp(self):
         self.ns = MultiNodeStorage([
-            (InMemoryBackend, {}),
-            (InMemoryBackend, {}),
+            (InMemoryBackend, {'data': {}}),
+            (InMemoryBackend, {'data': {}}),
         ])
 
     def test_basic_integration(self):
@@ -80,3 +92,20 @@ class MultiNodeStorageTest(TestCase):
             assert backend.get(node_id2) == {
                 'foo': 'bir',
             }
+
+        self.ns.delete_multi([node_id, node_id2])
+        for backend in self.ns.backends:
+            assert backend.get(node_id) is None
+            assert backend.get(node_id2) is None
+
+    def test_write_failure(self):
+        ns = MultiNodeStorage([
+            (BrokenBackend, {'data': {}}),
+            (InMemoryBackend, {'data': {}}),
+        ])
+
+        with pytest.raises(ValueError):
+            ns.set('foo', {'foo': 'bar'})
+
+        # the other backends are still written to
+        assert ns.backends[1].get('foo') == {'foo': 'bar'}
@@ -41,6 +41,22 @@ class RiakNodeStorageTest(TestCase):
             'foo': 'bar',
         }
 
+        self.ns.set_multi({
+            node_id: {
+                'foo': 'biz',
+            },
+            node_id2: {
+                'foo': 'bir',
+            },
+        })
+        result = self.ns.get_multi([node_id, node_id2])
+        assert result[node_id] == {
+            'foo': 'biz',
+        }
+        assert result[node_id2] == {
+            'foo': 'bir',
+        }
+
         self.ns.delete(node_id)
         assert not self.ns.get(node_id)
 
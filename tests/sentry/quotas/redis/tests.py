@@ -10,6 +10,7 @@ from exam import fixture, patcher
 
 from sentry.quotas.redis import (
     is_rate_limited,
+    lease,
     BasicRedisQuota,
     RedisQuota,
 )
@@ -45,6 +46,28 @@ def test_is_rate_limited_script():
     assert 119 <= client.ttl('bar') <= 120
 
 
+def test_lease_script():
+    now = int(time.time())
+
+    cluster = clusters.get('default')
+    client = cluster.get_local_client(six.next(iter(cluster.hosts)))
+
+    # The lease is capped by the quota with the least remaining capacity.
+    assert list(lease(client, ('lease-foo', 'lease-bar'), (5, 3, now + 60, 10, now + 120))
+                ) == [3, None, None]
+    assert client.get('lease-foo') == '3'
+    assert client.get('lease-bar') == '3'
+
+    # Nothing is granted (or counted) once any quota is exhausted.
+    assert list(lease(client, ('lease-foo', 'lease-bar'), (5, 3, now + 60, 10, now + 120))
+                ) == [0, 1, None]
+    assert client.get('lease-foo') == '3'
+    assert client.get('lease-bar') == '3'
+
+    assert 59 <= client.ttl('lease-foo') <= 60
+    assert 119 <= client.ttl('lease-bar') <= 120
+
+
 class RedisQuotaTest(TestCase):
     quota = fixture(RedisQuota)
 
@@ -162,3 +185,58 @@ class RedisQuotaTest(TestCase):
             ],
             timestamp=timestamp,
         ) == [n for _ in quotas] + [None, 0]
+
+    @mock.patch('sentry.quotas.redis.is_rate_limited', return_value=(True, False))
+    def test_remembers_rejections_until_retry_after(self, is_rate_limited):
+        self.get_organization_quota.return_value = (100, 60)
+        self.get_project_quota.return_value = (200, 60)
+        # the start of a quota window
+        timestamp = (time.time() // 60) * 60 + self.project.organization_id % 60
+
+        result = self.quota.is_rate_limited(self.project, timestamp=timestamp)
+        assert result.is_limited
+        assert result.reason_code == 'project_quota'
+        assert is_rate_limited.call_count == 1
+
+        result = self.quota.is_rate_limited(self.project, timestamp=timestamp + 30)
+        assert result.is_limited
+        assert result.retry_after == 30
+        assert result.reason_code == 'project_quota'
+        assert is_rate_limited.call_count == 1
+
+        result = self.quota.is_rate_limited(self.project, timestamp=timestamp + 60)
+        assert is_rate_limited.call_count == 2
+
+        # a changed limit is not covered by the remembered rejection
+        self.get_project_quota.return_value = (300, 60)
+        self.quota.is_rate_limited(self.project, timestamp=timestamp + 60)
+        assert is_rate_limited.call_count == 3
+
+    @mock.patch('sentry.quotas.redis.is_rate_limited', return_value=(True, True))
+    @mock.patch.object(RedisQuota, 'get_quotas')
+    def test_does_not_remember_unenforced_rejections(self, get_quotas, is_rate_limited):
+        get_quotas.return_value = (
+            BasicRedisQuota(key='p:1', limit=1, window=60, enforce=False),
+        )
+        assert not self.quota.is_rate_limited(self.project).is_limited
+        assert not self.quota.is_rate_limited(self.project).is_limited
+        assert is_rate_limited.call_count == 2
+
+    def test_leases(self):
+        quota = RedisQuota(lease_fraction=0.5)
+        self.get_project_quota.return_value = (10, 60)
+        timestamp = time.time()
+
+        with mock.patch('sentry.quotas.redis.lease', wraps=lease) as lease_script:
+            for _ in xrange(10):
+                assert not quota.is_rate_limited(self.project, timestamp=timestamp).is_limited
+            assert lease_script.call_count == 2
+
+            assert quota.is_rate_limited(self.project, timestamp=timestamp).is_limited
+            assert lease_script.call_count == 3
+
+        assert quota.get_usage(
+            self.project.organization_id,
+            quota.get_quotas(self.project)[:1],
+            timestamp=timestamp,
+        ) == [10]
@@ -2,6 +2,9 @@
 
 from __future__ import absolute_import
 
+import mock
+
+from sentry.ratelimits.base import RateLimiter
 from sentry.ratelimits.redis import RedisRateLimiter
 from sentry.testutils import TestCase
 
@@ -17,3 +20,44 @@ class RedisRateLimiterTest(TestCase):
     def test_simple_key(self):
         assert not self.backend.is_limited('foo', 1)
         assert self.backend.is_limited('foo', 1)
+
+    @mock.patch('sentry.ratelimits.redis.time')
+    def test_sliding_window(self, time):
+        time.return_value = 6000 + 50
+        for _ in range(10):
+            assert not self.backend.is_limited('foo', 10)
+        assert self.backend.is_limited('foo', 10)
+
+        # A fixed window would allow another 10 right after the edge, but
+        # most of the previous window is still within the sliding one.
+        time.return_value = 6060 + 5
+        assert self.backend.is_limited('foo', 10)
+
+        time.return_value = 6060 + 30
+        for _ in range(5):
+            assert not self.backend.is_limited('foo', 10)
+        assert self.backend.is_limited('foo', 10)
+
+        time.return_value = 6120 + 59
+        assert not self.backend.is_limited('foo', 10)
+
+    def test_is_limited_many(self):
+        limits = [('foo', 2, 60), ('bar', 3, 3600)]
+        assert not self.backend.is_limited_many(limits)
+        assert not self.backend.is_limited_many(limits)
+        assert self.backend.is_limited_many(limits)
+
+        # rejected attempts are not counted against the other limits
+        assert not self.backend.is_limited('bar', 3, window=3600)
+        assert self.backend.is_limited('bar', 3, window=3600)
+
+    def test_is_limited_many_empty(self):
+        assert not self.backend.is_limited_many([])
+
+
+class RateLimiterTest(TestCase):
+    def test_is_limited_many(self):
+        backend = RateLimiter()
+        with mock.patch.object(backend, 'is_limited', side_effect=[False, True]) as is_limited:
+            assert backend.is_limited_many([('foo', 1, None), ('bar', 1, 10)])
+        is_limited.assert_called_with('bar', 1, project=None, window=10)
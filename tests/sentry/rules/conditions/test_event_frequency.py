@@ -109,6 +109,23 @@ class FrequencyConditionMixin(object):
 
         self.assertPasses(rule, event)
 
+    def test_shared_between_conditions(self):
+        event = self.get_event()
+        state = self.get_state()
+        rule1 = self.get_rule({'interval': '1m', 'value': '0'})
+        rule2 = self.get_rule({'interval': '1m', 'value': '1'})
+        rule3 = self.get_rule({'interval': '1h', 'value': '0'})
+
+        self.increment(event, 1)
+
+        with mock.patch.object(self.rule_cls, 'get_rate', autospec=True,
+                               side_effect=self.rule_cls.get_rate) as get_rate:
+            assert rule1.passes(event, state) is True
+            assert rule2.passes(event, state) is False
+            assert rule3.passes(event, state) is True
+
+        assert sorted(call[0][2] for call in get_rate.call_args_list) == ['1h', '1m']
+
 
 class EventFrequencyConditionTestCase(FrequencyConditionMixin, RuleTestCase):
     rule_cls = EventFrequencyCondition
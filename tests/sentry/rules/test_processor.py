@@ -4,11 +4,12 @@ from __future__ import absolute_import
 
 from datetime import timedelta
 from django.utils import timezone
+from mock import patch
 
 from sentry.models import GroupRuleStatus, Rule
 from sentry.plugins import plugins
 from sentry.testutils import TestCase
-from sentry.rules.processor import EventCompatibilityProxy, RuleProcessor
+from sentry.rules.processor import EventCompatibilityProxy, RuleProcessor, plan_cache
 
 
 class RuleProcessorTest(TestCase):
@@ -55,6 +56,129 @@ class RuleProcessorTest(TestCase):
         assert len(results) == 1
 
 
+class RulePlanTest(TestCase):
+    action_data = {
+        'id': 'sentry.rules.actions.notify_event.NotifyEventAction',
+    }
+
+    def setUp(self):
+        plan_cache.clear()
+        self.event = self.create_event(tags={'foo': 'bar', 'level': 'error'})
+        Rule.objects.filter(project=self.event.project).delete()
+
+    def create_rule(self, conditions, action_match='all'):
+        return Rule.objects.create(
+            project=self.event.project,
+            data={
+                'action_match': action_match,
+                'conditions': conditions,
+                'actions': [self.action_data],
+            }
+        )
+
+    def get_fired_rules(self, **kwargs):
+        state = {'is_new': False, 'is_regression': False, 'is_sample': False}
+        state.update(kwargs)
+        rp = RuleProcessor(self.event, **state)
+        return [future.rule for _, futures in rp.apply() for future in futures]
+
+    def test_first_seen(self):
+        rule = self.create_rule([
+            {'id': 'sentry.rules.conditions.first_seen_event.FirstSeenEventCondition'},
+        ])
+
+        with patch.object(RuleProcessor, 'condition_matches') as condition_matches:
+            assert self.get_fired_rules(is_new=False) == []
+        assert not condition_matches.called
+
+        assert self.get_fired_rules(is_new=True) == [rule]
+
+    def test_tags(self):
+        rule = self.create_rule([
+            {'id': 'sentry.rules.conditions.every_event.EveryEventCondition'},
+            {
+                'id': 'sentry.rules.conditions.tagged_event.TaggedEventCondition',
+                'key': 'foo',
+                'match': 'eq',
+                'value': 'bar',
+            },
+        ])
+        self.create_rule([
+            {
+                'id': 'sentry.rules.conditions.tagged_event.TaggedEventCondition',
+                'key': 'missing',
+                'match': 'sw',
+                'value': 'bar',
+            },
+        ])
+        negated = self.create_rule([
+            {
+                'id': 'sentry.rules.conditions.tagged_event.TaggedEventCondition',
+                'key': 'missing',
+                'match': 'ne',
+                'value': 'bar',
+            },
+        ])
+
+        assert self.get_fired_rules() == [rule, negated]
+
+    def test_level(self):
+        rule = self.create_rule([
+            {
+                'id': 'sentry.rules.conditions.level.LevelCondition',
+                'match': 'gte',
+                'level': '40',
+            },
+        ])
+        self.create_rule([
+            {
+                'id': 'sentry.rules.conditions.level.LevelCondition',
+                'match': 'gte',
+                'level': '50',
+            },
+        ])
+
+        assert self.get_fired_rules() == [rule]
+
+    def test_any_is_not_indexed(self):
+        rule = self.create_rule([
+            {'id': 'sentry.rules.conditions.first_seen_event.FirstSeenEventCondition'},
+            {'id': 'sentry.rules.conditions.every_event.EveryEventCondition'},
+        ], action_match='any')
+
+        assert self.get_fired_rules(is_new=False) == [rule]
+
+    def test_rule_status_created_when_fired(self):
+        rule = self.create_rule([
+            {'id': 'sentry.rules.conditions.every_event.EveryEventCondition'},
+        ])
+        self.create_rule([
+            {'id': 'sentry.rules.conditions.regression_event.RegressionEventCondition'},
+            {'id': 'sentry.rules.conditions.every_event.EveryEventCondition'},
+        ], action_match='none')
+
+        assert self.get_fired_rules(is_regression=True) == [rule]
+        assert list(
+            GroupRuleStatus.objects.filter(group=self.event.group).values_list('rule', flat=True)
+        ) == [rule.id]
+
+    def test_plan_cache(self):
+        self.create_rule([
+            {'id': 'sentry.rules.conditions.every_event.EveryEventCondition'},
+        ])
+
+        rp = RuleProcessor(self.event, is_new=False, is_regression=False, is_sample=False)
+        plan = rp.get_plan()
+        assert rp.get_plan() is plan
+
+        rule = self.create_rule([
+            {'id': 'sentry.rules.conditions.every_event.EveryEventCondition'},
+        ])
+        assert rp.get_plan() is not plan
+        assert len(rp.get_plan()) == 2
+        assert rule in rp.get_plan().rules
+
+
 class EventCompatibilityProxyTest(TestCase):
     def test_simple(self):
         event = self.create_event(
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+
+import mock
+import pytest
+
+from sentry.models import Group, GroupStatus, GroupTagValue
+from sentry.search.base import ANY, EMPTY
+from sentry.search.redis.backend import RedisSearchBackend
+from sentry.testutils import TestCase
+
+
+class RedisSearchBackendTest(TestCase):
+    def setUp(self):
+        self.backend = RedisSearchBackend()
+        self.project = self.create_project()
+
+        self.group1 = self.create_group(project=self.project, message='foo')
+        self.group2 = self.create_group(project=self.project, message='bar')
+        self.group3 = self.create_group(project=self.project, message='baz')
+
+        for group, tags in (
+            (self.group1, [('env', 'production'), ('server', 'example.com')]),
+            (self.group2, [('env', 'staging'), ('server', 'example.com')]),
+        ):
+            for key, value in tags:
+                GroupTagValue.objects.create(
+                    project_id=group.project_id,
+                    group_id=group.id,
+                    key=key,
+                    value=value,
+                )
+
+    def query(self, **tags):
+        return set(self.backend.query(self.project, status=GroupStatus.UNRESOLVED, tags=tags))
+
+    def test_tags(self):
+        self.backend.backfill_tag_index(self.project.id)
+        self.backend.index_group_tags(self.project.id, self.group3.id, [('url', 'http://example.com')])
+
+        assert self.query(env='staging') == set([self.group2])
+        assert self.query(env='example.com') == set()
+        assert self.query(env=ANY) == set([self.group1, self.group2])
+        assert self.query(env='staging', server='example.com') == set([self.group2])
+        assert self.query(env='staging', server='bar.example.com') == set()
+        assert self.query(server=ANY, env=ANY) == set([self.group1, self.group2])
+        assert self.query(env=EMPTY) == set([self.group3])
+        assert self.query(env=EMPTY, url=ANY) == set([self.group3])
+        assert self.query(url='http://example.com') == set([self.group3])
+
+    @mock.patch('sentry.tasks.search.backfill_tag_index.delay')
+    def test_tags_before_backfill(self, backfill):
+        assert self.query(env='staging') == set([self.group2])
+        backfill.assert_called_once_with(project_id=self.project.id)
+
+        # the backfill is only scheduled once
+        assert self.query(env=ANY) == set([self.group1, self.group2])
+        assert backfill.call_count == 1
+
+    def test_add_tags(self):
+        self.backend.backfill_tag_index(self.project.id)
+        with mock.patch('sentry.search.index_group_tags', self.backend.index_group_tags):
+            Group.objects.add_tags(self.group3, [('env', 'staging'), ('foo', 'bar', None)])
+
+        assert self.query(env='staging') == set([self.group2, self.group3])
+        assert self.query(foo='bar') == set([self.group3])
+
+    def test_tags_unindexed_groups(self):
+        self.backend.backfill_tag_index(self.project.id)
+
+        # groups that are not in the index don't match, even when every
+        # indexed group does
+        assert self.query(server='example.com') == set([self.group1, self.group2])
+
+    def test_tags_many_matches(self):
+        self.backend.backfill_tag_index(self.project.id)
+
+        with mock.patch('sentry.search.django.backend.MAX_IN_LIST_SIZE', 1):
+            assert self.query(server='example.com') == set([self.group1, self.group2])
+
+    def test_backfill_expires(self):
+        self.backend.backfill_tag_index(self.project.id)
+
+        client = self.backend._get_client(self.project.id)
+        ttl = client.ttl(self.backend._make_key(self.project.id, 'ready'))
+        assert 0 < ttl <= self.backend.ttl
+
+    def test_index_group_tags_failure(self):
+        self.backend.backfill_tag_index(self.project.id)
+
+        with mock.patch('redis.client.BasePipeline.execute', side_effect=Exception), \
+                pytest.raises(Exception):
+            self.backend.index_group_tags(self.project.id, self.group3.id, [('url', 'foo')])
+
+        self.backend.index_group_tags(self.project.id, self.group3.id, [('url', 'foo')])
+        assert self.query(url='foo') == set([self.group3])
+
+    @mock.patch('sentry.tasks.search.backfill_tag_index.delay')
+    def test_reset_tag_index(self, backfill):
+        self.backend.backfill_tag_index(self.project.id)
+        self.backend.index_group_tags(self.project.id, self.group3.id, [('env', 'staging')])
+        assert self.query(env='staging') == set([self.group2, self.group3])
+
+        self.backend.reset_tag_index(self.project.id)
+        assert self.query(env='staging') == set([self.group2])
+        backfill.assert_called_once_with(project_id=self.project.id)
+
+        self.backend.backfill_tag_index(self.project.id)
+        assert self.query(env='staging') == set([self.group2])
+
+        # pairs that were indexed before the reset are written again
+        self.backend.index_group_tags(self.project.id, self.group3.id, [('env', 'staging')])
+        assert self.query(env='staging') == set([self.group2, self.group3])
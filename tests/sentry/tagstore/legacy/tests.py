@@ -0,0 +1,58 @@
+from __future__ import absolute_import
+
+from sentry.models import EventTag, TagKey, TagValue
+from sentry.tagstore.legacy import LegacyTagStorage
+from sentry.testutils import TestCase
+
+
+class LegacyTagStorageTest(TestCase):
+    def setUp(self):
+        self.ts = LegacyTagStorage(cache_size=100)
+        self.proj1 = self.create_project()
+
+    def test_get_or_create_tag_keys(self):
+        TagKey.objects.create(project_id=self.proj1.id, key='foo')
+
+        result = self.ts.get_or_create_tag_keys(self.proj1.id, ['foo', 'bar'])
+        assert sorted(result) == ['bar', 'foo']
+        assert result['bar'] == TagKey.objects.get(project_id=self.proj1.id, key='bar')
+
+        with self.assertNumQueries(0):
+            assert self.ts.get_or_create_tag_keys(self.proj1.id, ['foo', 'bar']) == result
+
+    def test_get_or_create_tag_values(self):
+        TagValue.objects.create(project_id=self.proj1.id, key='foo', value='bar')
+
+        items = [('foo', 'bar'), ('foo', 'baz')]
+        result = self.ts.get_or_create_tag_values(self.proj1.id, items)
+        assert sorted(result) == sorted(items)
+        assert result[('foo', 'baz')] == TagValue.objects.get(
+            project_id=self.proj1.id, key='foo', value='baz',
+        )
+
+        with self.assertNumQueries(0):
+            assert self.ts.get_or_create_tag_values(self.proj1.id, items) == result
+
+    def test_delete_tag_key_evicts_cache(self):
+        tagkey = self.ts.get_or_create_tag_keys(self.proj1.id, ['foo'])['foo']
+        tagvalue = self.ts.get_or_create_tag_values(self.proj1.id, [('foo', 'bar')])[('foo', 'bar')]
+
+        with self.tasks():
+            self.ts.delete_tag_key(self.proj1.id, 'foo')
+
+        assert not TagKey.objects.filter(id=tagkey.id).exists()
+        assert not TagValue.objects.filter(id=tagvalue.id).exists()
+
+        assert self.ts.get_or_create_tag_keys(self.proj1.id, ['foo'])['foo'] == \
+            TagKey.objects.get(project_id=self.proj1.id, key='foo')
+        assert self.ts.get_or_create_tag_values(self.proj1.id, [('foo', 'bar')])[('foo', 'bar')] == \
+            TagValue.objects.get(project_id=self.proj1.id, key='foo', value='bar')
+
+    def test_create_event_tags(self):
+        self.ts.create_event_tags(self.proj1.id, 2, 3, [(4, 5), (6, 7)])
+        # replays are ignored, new pairs are still stored
+        self.ts.create_event_tags(self.proj1.id, 2, 3, [(4, 5), (8, 9)])
+
+        assert sorted(
+            EventTag.objects.filter(event_id=3).values_list('key_id', 'value_id')
+        ) == [(4, 5), (6, 7), (8, 9)]
@@ -23,4 +23,9 @@ class ProcessPendingTest(TestCase):
     def test_nothing(self, mock_process_pending):
         # this effectively just says "does the code run"
         process_pending()
-        mock_process_pending.assert_called_once_with()
+        mock_process_pending.assert_called_once_with(partition=None)
+
+    @mock.patch('sentry.buffer.backend.process_pending')
+    def test_partition(self, mock_process_pending):
+        process_pending(partition=1)
+        mock_process_pending.assert_called_once_with(partition=1)
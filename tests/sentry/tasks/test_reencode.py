@@ -0,0 +1,42 @@
+from __future__ import absolute_import
+
+import mock
+
+from django.db import connection
+
+from sentry.db.models.fields.gzippeddict import JSON_PREFIX
+from sentry.models import Group
+from sentry.tasks.reencode import reencode_dict_field
+from sentry.testutils import TestCase
+from sentry.utils.compat import pickle
+from sentry.utils.strings import compress
+
+
+class ReencodeDictFieldTest(TestCase):
+    def test_simple(self):
+        groups = [self.create_group(data={'index': i}) for i in range(5)]
+
+        cursor = connection.cursor()
+        for group in groups:
+            cursor.execute(
+                'UPDATE sentry_groupedmessage SET data = %s WHERE id = %s',
+                [compress(pickle.dumps({'index': group.data['index']})), group.id],
+            )
+
+        with self.tasks(), self.settings(SENTRY_DICT_FIELD_ENCODING='json'):
+            reencode_dict_field('sentry', 'Group', 'data', batch_size=2)
+
+        values = dict(Group.objects.filter(
+            id__in=[group.id for group in groups],
+        ).values_list('id', 'data'))
+        for i, group in enumerate(groups):
+            assert values[group.id].startswith(JSON_PREFIX)
+            assert Group.objects.get(id=group.id).data == {'index': i}
+
+    @mock.patch('sentry.tasks.reencode.update_values')
+    def test_skips_encoded_rows(self, mock_update_values):
+        with self.settings(SENTRY_DICT_FIELD_ENCODING='json'):
+            self.create_group(data={'foo': 'bar'})
+            reencode_dict_field('sentry', 'Group', 'data')
+
+        assert mock_update_values.call_count == 0
@@ -3,8 +3,14 @@ from __future__ import absolute_import
 import mock
 import uuid
 
+from sentry.cache import default_cache
+from sentry.event_manager import EventManager
+from sentry.models import Event, EventTag
 from sentry.plugins import Plugin2
-from sentry.tasks.store import preprocess_event, process_event
+from sentry.tasks.store import (
+    flush_save_event_batches, preprocess_event, process_event, save_event,
+    save_event_batch, schedule_save_event,
+)
 from sentry.testutils import PluginTestCase
 
 
@@ -166,3 +172,143 @@ class StoreTasksTest(PluginTestCase):
         mock_save_event.delay.assert_called_once_with(
             cache_key='e:1', data=None, start_time=1, event_id=None
         )
+
+    @mock.patch('sentry.tasks.store.save_event_batch')
+    @mock.patch('sentry.tasks.store.save_event')
+    def test_schedule_save_event_batches(self, mock_save_event, mock_save_event_batch):
+        with self.settings(SENTRY_SAVE_EVENT_BATCH_SIZE=2):
+            schedule_save_event(cache_key='e:1', start_time=1)
+            assert mock_save_event_batch.delay.call_count == 0
+
+            schedule_save_event(cache_key='e:2', start_time=2)
+            mock_save_event_batch.delay.assert_called_once_with(
+                cache_keys=['e:1', 'e:2'], start_times=[1, 2],
+            )
+
+            schedule_save_event(cache_key='e:3', start_time=3)
+            flush_save_event_batches()
+            mock_save_event_batch.delay.assert_called_with(
+                cache_keys=['e:3'], start_times=[3],
+            )
+
+        assert mock_save_event.delay.call_count == 0
+
+    @mock.patch('sentry.event_manager.EventManager.save_many')
+    @mock.patch('sentry.tasks.store.save_event')
+    def test_save_event_batch_failure(self, mock_save_event, mock_save_many):
+        project1 = self.create_project()
+        project2 = self.create_project()
+
+        def save_many(project, events):
+            if project == project1.id:
+                raise Exception('boom')
+            return events
+
+        mock_save_many.side_effect = save_many
+
+        event_ids = {}
+        for cache_key, project in (('e:1', project1), ('e:2', project1), ('e:3', project2)):
+            data = EventManager({'message': 'test', 'platform': 'python'}).normalize()
+            data['project'] = project.id
+            event_ids[cache_key] = data['event_id']
+            default_cache.set(cache_key, data, 3600)
+
+        save_event_batch(cache_keys=['e:1', 'e:2', 'e:3'], start_times=[1, 2, 3])
+
+        # the failed project's events are retried one by one
+        assert sorted(mock_save_event.delay.call_args_list) == sorted([
+            mock.call(cache_key='e:1', start_time=1, event_id=event_ids['e:1']),
+            mock.call(cache_key='e:2', start_time=2, event_id=event_ids['e:2']),
+        ])
+        assert default_cache.get('e:1') is not None
+        assert default_cache.get('e:2') is not None
+
+        # other projects in the batch are unaffected
+        assert default_cache.get('e:3') is None
+
+    def test_save_event_skips_saved_event(self):
+        project = self.create_project()
+
+        data = EventManager({'message': 'test', 'platform': 'python'}).normalize()
+        EventManager(dict(data)).save(project.id)
+
+        data['project'] = project.id
+        default_cache.set('e:1', data, 3600)
+
+        with mock.patch('sentry.event_manager.EventManager.save') as mock_event_manager_save:
+            save_event(cache_key='e:1', event_id=data['event_id'])
+
+        assert mock_event_manager_save.call_count == 0
+        assert default_cache.get('e:1') is None
+
+    @mock.patch('sentry.event_manager.EventManager.save_many')
+    def test_save_event_batch_skips_saved_events(self, mock_save_many):
+        project = self.create_project()
+
+        saved = EventManager({'message': 'test', 'platform': 'python'}).normalize()
+        EventManager(dict(saved)).save(project.id)
+
+        pending = EventManager({'message': 'test', 'platform': 'python'}).normalize()
+
+        for cache_key, data in (('e:1', saved), ('e:2', pending)):
+            data['project'] = project.id
+            default_cache.set(cache_key, data, 3600)
+
+        save_event_batch(cache_keys=['e:1', 'e:2'])
+
+        assert mock_save_many.call_count == 1
+        project_id, events = mock_save_many.call_args[0]
+        assert project_id == project.id
+        assert [e['event_id'] for e in events] == [pending['event_id']]
+        assert default_cache.get('e:1') is None
+        assert default_cache.get('e:2') is None
+
+    @mock.patch('sentry.tasks.post_process.index_event_tags.delay')
+    @mock.patch('sentry.tasks.store.save_event')
+    def test_fused_save_event(self, mock_save_event, mock_index_event_tags):
+        project = self.create_project()
+
+        data = EventManager({
+            'message': 'test',
+            'platform': 'NOTMATTLANG',
+            'tags': {'foo': 'bar'},
+        }).normalize()
+        data['project'] = project.id
+        default_cache.set('e:1', data, 3600)
+
+        with self.settings(SENTRY_FUSED_EVENT_PIPELINE=True):
+            preprocess_event(cache_key='e:1', event_id=data['event_id'])
+
+        assert mock_save_event.delay.call_count == 0
+        assert mock_index_event_tags.call_count == 0
+        assert default_cache.get('e:1') is None
+
+        event = Event.objects.get(project_id=project.id, event_id=data['event_id'])
+        assert EventTag.objects.filter(event_id=event.id).exists()
+
+    @mock.patch('sentry.tasks.store.metrics.timing')
+    @mock.patch('sentry.event_manager.EventManager.save', side_effect=Exception('boom'))
+    @mock.patch('sentry.tasks.store.save_event')
+    def test_fused_save_event_fallback(self, mock_save_event, mock_event_manager_save,
+                                       mock_metrics_timing):
+        project = self.create_project()
+
+        data = EventManager({
+            'message': 'test',
+            'platform': 'NOTMATTLANG',
+        }).normalize()
+        data['project'] = project.id
+        default_cache.set('e:1', data, 3600)
+
+        with self.settings(SENTRY_FUSED_EVENT_PIPELINE=True):
+            preprocess_event(cache_key='e:1', start_time=1, event_id=data['event_id'])
+
+        mock_save_event.delay.assert_called_once_with(
+            cache_key='e:1', data=None, start_time=1, event_id=data['event_id'],
+        )
+        assert default_cache.get('e:1') is not None
+
+        # the time to process is recorded by the fallback
+        assert 'events.time-to-process' not in [
+            args[0] for args, kwargs in mock_metrics_timing.call_args_list
+        ]
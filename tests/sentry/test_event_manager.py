@@ -22,6 +22,7 @@ from sentry.models import (
     EventMapping, Release
 )
 from sentry.testutils import TestCase, TransactionTestCase
+from sentry.utils.datastructures import LRUCache
 
 
 class EventManagerTest(TransactionTestCase):
@@ -194,6 +195,127 @@ class EventManagerTest(TransactionTestCase):
 
         assert Event.objects.count() == 1
 
+    def test_save_many(self):
+        events = [
+            self.make_event(event_id='a' * 32, checksum='a' * 32, release='1.0'),
+            self.make_event(event_id='b' * 32, checksum='a' * 32, release='1.0'),
+            self.make_event(event_id='c' * 32, checksum='b' * 32),
+        ]
+
+        result = EventManager.save_many(1, events)
+
+        assert [e.event_id for e in result] == ['a' * 32, 'b' * 32, 'c' * 32]
+        assert all(e.id for e in result)
+        assert result[0].group_id == result[1].group_id
+        assert result[0].group_id != result[2].group_id
+        assert Event.objects.count() == 3
+        assert EventMapping.objects.count() == 3
+        assert Release.objects.filter(version='1.0').count() == 1
+
+    def test_save_many_dupe_message_id(self):
+        manager = EventManager(self.make_event(event_id='a' * 32))
+        manager.save(1)
+
+        EventManager.save_many(1, [
+            self.make_event(event_id='a' * 32),
+            self.make_event(event_id='b' * 32),
+            self.make_event(event_id='b' * 32),
+        ])
+
+        assert Event.objects.count() == 2
+        assert EventMapping.objects.count() == 2
+
+    def test_save_many_skips_tombstones(self):
+        manager = EventManager(self.make_event(event_id='a' * 32, checksum='a' * 32))
+        event = manager.save(1)
+
+        tombstone = GroupTombstone.objects.create(
+            project_id=event.group.project_id,
+            previous_group_id=event.group.id,
+            level=event.group.level,
+        )
+        GroupHash.objects.filter(group=event.group).update(
+            group=None,
+            group_tombstone_id=tombstone.id,
+        )
+
+        result = EventManager.save_many(1, [
+            self.make_event(event_id='b' * 32, checksum='a' * 32),
+            self.make_event(event_id='c' * 32, checksum='b' * 32),
+        ])
+
+        assert [e.event_id for e in result] == ['c' * 32]
+
+    @patch('sentry.event_manager.grouphash_cache', LRUCache(100))
+    def test_grouphash_cache(self):
+        manager = EventManager(self.make_event(event_id='a' * 32, checksum='a' * 32))
+        event1 = manager.save(1)
+
+        manager = EventManager(self.make_event(event_id='b' * 32, checksum='a' * 32))
+        with patch('sentry.event_manager.metrics') as metrics:
+            event2 = manager.save(1)
+        metrics.incr.assert_any_call('grouphash.cache.miss', amount=1)
+
+        manager = EventManager(self.make_event(event_id='c' * 32, checksum='a' * 32))
+        with patch('sentry.event_manager.metrics') as metrics:
+            event3 = manager.save(1)
+        metrics.incr.assert_any_call('grouphash.cache.hit', amount=1)
+        metrics.incr.assert_any_call('grouphash.cache.miss', amount=0)
+
+        assert event1.group_id == event2.group_id == event3.group_id
+
+    @patch('sentry.event_manager.grouphash_cache', LRUCache(100))
+    def test_grouphash_cache_invalidation(self):
+        manager = EventManager(self.make_event(event_id='a' * 32, checksum='a' * 32))
+        event1 = manager.save(1)
+        manager = EventManager(self.make_event(event_id='b' * 32, checksum='a' * 32))
+        manager.save(1)
+
+        tombstone = GroupTombstone.objects.create(
+            project_id=event1.group.project_id,
+            previous_group_id=event1.group.id,
+            level=event1.group.level,
+        )
+        GroupHash.objects.filter(group=event1.group).update(
+            group=None,
+            group_tombstone_id=tombstone.id,
+        )
+        GroupHash.bump_cache_version(event1.group.project_id)
+
+        manager = EventManager(self.make_event(event_id='c' * 32, checksum='a' * 32))
+        with pytest.raises(HashDiscarded):
+            manager.save(1)
+
+    @patch('sentry.event_manager.grouphash_cache', LRUCache(100))
+    def test_grouphash_cache_deleted_group(self):
+        manager = EventManager(self.make_event(event_id='a' * 32, checksum='a' * 32))
+        event1 = manager.save(1)
+        manager = EventManager(self.make_event(event_id='b' * 32, checksum='a' * 32))
+        manager.save(1)
+
+        # delete the group without bumping the version
+        GroupHash.objects.filter(group=event1.group).delete()
+        Group.objects.filter(id=event1.group_id).delete()
+
+        manager = EventManager(self.make_event(event_id='c' * 32, checksum='a' * 32))
+        event3 = manager.save(1)
+        assert Group.objects.filter(id=event3.group_id).exists()
+        assert GroupHash.objects.get(hash='a' * 32).group_id == event3.group_id
+
+    @patch('sentry.event_manager.grouphash_cache', LRUCache(100))
+    def test_grouphash_cache_missing_group_retries_once(self):
+        manager = EventManager(self.make_event(event_id='a' * 32, checksum='a' * 32))
+        manager.save(1)
+        manager = EventManager(self.make_event(event_id='b' * 32, checksum='a' * 32))
+        manager.save(1)
+
+        manager = EventManager(self.make_event(event_id='c' * 32, checksum='a' * 32))
+        with patch.object(Group.objects, 'get', side_effect=Group.DoesNotExist), \
+                patch.object(manager, '_find_hashes', wraps=manager._find_hashes) as find_hashes:
+            with pytest.raises(Group.DoesNotExist):
+                manager.save(1)
+        assert find_hashes.call_count == 2
+
     def test_updates_group(self):
         manager = EventManager(
             self.make_event(
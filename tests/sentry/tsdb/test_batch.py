@@ -0,0 +1,114 @@
+from __future__ import absolute_import
+
+import mock
+import pytz
+
+from datetime import datetime, timedelta
+
+from sentry.testutils import TestCase
+from sentry.tsdb.base import BaseTSDB, ONE_HOUR
+from sentry.tsdb.batch import BatchedTSDB, BufferedTSDB
+from sentry.utils.dates import to_datetime
+
+
+class BatchedTSDBTest(TestCase):
+    def setUp(self):
+        self.backend = mock.Mock(wraps=BaseTSDB(rollups=((10, 30), (ONE_HOUR, 24))))
+        self.backend.incr_multi = mock.Mock()
+        self.backend.record_multi = mock.Mock()
+        self.backend.record_frequency_multi = mock.Mock()
+        self.batch = BatchedTSDB(self.backend)
+
+    def test_interval(self):
+        assert self.batch.interval == 10
+
+    def test_incr_multi(self):
+        timestamp = datetime(2017, 1, 1, 12, 0, 1, tzinfo=pytz.utc)
+        model = BaseTSDB.models.group
+
+        self.batch.incr_multi([(model, 1), (model, 2)], timestamp=timestamp)
+        self.batch.incr_multi([(model, 1)], timestamp=timestamp + timedelta(seconds=5))
+        self.batch.incr_multi([(model, 1)], timestamp=timestamp + timedelta(seconds=10))
+
+        assert self.backend.incr_multi.call_count == 0
+        self.batch.flush()
+
+        epoch = to_datetime(self.backend.normalize_to_epoch(timestamp, 10))
+        assert sorted(self.backend.incr_multi.call_args_list) == sorted([
+            mock.call([(model, 1)], timestamp=epoch, count=2),
+            mock.call([(model, 2)], timestamp=epoch, count=1),
+            mock.call([(model, 1)], timestamp=epoch + timedelta(seconds=10), count=1),
+        ])
+
+        self.backend.incr_multi.reset_mock()
+        self.batch.flush()
+        assert self.backend.incr_multi.call_count == 0
+
+    def test_record_multi(self):
+        timestamp = datetime(2017, 1, 1, 12, 0, 1, tzinfo=pytz.utc)
+        model = BaseTSDB.models.users_affected_by_group
+
+        self.batch.record_multi([(model, 1, ('foo', ))], timestamp=timestamp)
+        self.batch.record_multi([(model, 1, ('foo', 'bar'))], timestamp=timestamp)
+        self.batch.flush()
+
+        (items, ), kwargs = self.backend.record_multi.call_args
+        assert [(m, k, sorted(v)) for m, k, v in items] == [(model, 1, ['bar', 'foo'])]
+
+    def test_record_frequency_multi(self):
+        timestamp = datetime(2017, 1, 1, 12, 0, 1, tzinfo=pytz.utc)
+        model = BaseTSDB.models.frequent_environments_by_group
+
+        self.batch.record_frequency_multi([(model, {1: {2: 1}})], timestamp=timestamp)
+        self.batch.record_frequency_multi([(model, {1: {2: 1, 3: 1}})], timestamp=timestamp)
+        self.batch.flush()
+
+        self.backend.record_frequency_multi.assert_called_once_with(
+            [(model, {1: {2: 2, 3: 1}})],
+            timestamp=to_datetime(self.backend.normalize_to_epoch(timestamp, 10)),
+        )
+
+
+class BufferedTSDBTest(TestCase):
+    def setUp(self):
+        self.backend = mock.Mock(wraps=BaseTSDB(rollups=((10, 30), (ONE_HOUR, 24))))
+        self.backend.incr_multi = mock.Mock()
+
+    @mock.patch('sentry.tsdb.batch.threading.Timer')
+    def test_flushes_on_timer(self, Timer):
+        buffered = BufferedTSDB(self.backend, interval=1)
+        timestamp = datetime(2017, 1, 1, 12, 0, 1, tzinfo=pytz.utc)
+        model = BaseTSDB.models.group
+
+        buffered.incr_multi([(model, 1), (model, 2)], timestamp=timestamp)
+        buffered.incr(model, 1, timestamp=timestamp + timedelta(seconds=5))
+        assert self.backend.incr_multi.call_count == 0
+        assert Timer.call_count == 1
+
+        # the timer calls back into the buffer once the interval has passed
+        interval, callback = Timer.call_args[0]
+        assert interval == 1
+        callback()
+        assert Timer.return_value.cancel.call_count == 1
+
+        epoch = to_datetime(self.backend.normalize_to_epoch(timestamp, 10))
+        assert sorted(self.backend.incr_multi.call_args_list) == sorted([
+            mock.call([(model, 1)], timestamp=epoch, count=2),
+            mock.call([(model, 2)], timestamp=epoch, count=1),
+        ])
+
+        # a new timer is started for the next write
+        buffered.incr(model, 1, timestamp=timestamp)
+        assert Timer.call_count == 2
+        buffered.flush()
+        assert self.backend.incr_multi.call_count == 3
+
+    def test_flush_without_writes(self):
+        BufferedTSDB(self.backend, interval=1).flush()
+        assert self.backend.incr_multi.call_count == 0
+
+    def test_writes_through_without_interval(self):
+        buffered = BufferedTSDB(self.backend, interval=0)
+        model = BaseTSDB.models.group
+        buffered.incr_multi([(model, 1)])
+        self.backend.incr_multi.assert_called_once_with([(model, 1)], timestamp=None, count=1)
@@ -126,6 +126,127 @@ class RedisTSDBTest(TestCase):
             2: 0,
         }
 
+    def test_get_range_string_keys(self):
+        now = datetime.utcnow().replace(tzinfo=pytz.UTC)
+        timestamp = int(to_timestamp(now)) - int(to_timestamp(now)) % 10
+        keys = ['foo', u'b\xe4r', 'baz']
+
+        self.db.incr_multi([(TSDBModel.project, key) for key in keys[:2]], now, count=2 ** 40)
+        self.db.incr(TSDBModel.project, 'foo', now)
+
+        results = self.db.get_range(TSDBModel.project, keys, now - timedelta(seconds=10), now)
+        assert results == {
+            'foo': [(timestamp - 10, 0), (timestamp, 2 ** 40 + 1)],
+            u'b\xe4r': [(timestamp - 10, 0), (timestamp, 2 ** 40)],
+            'baz': [(timestamp - 10, 0), (timestamp, 0)],
+        }
+        assert self.db.get_sums(TSDBModel.project, keys, now - timedelta(seconds=10), now) == {
+            'foo': 2 ** 40 + 1,
+            u'b\xe4r': 2 ** 40,
+            'baz': 0,
+        }
+
+    def make_compacted_db(self):
+        return RedisTSDB(
+            rollups=self.db.rollups.items(),
+            vnodes=64,
+            compact_counters=True,
+            prefix='compacted:',
+            hosts={i - 6: {
+                'db': i
+            } for i in range(6, 9)},
+        )
+
+    def check_compacted_db(self, db, keys, start, end):
+        for rollup in db.rollups:
+            for key in keys:
+                assert db.get_range(TSDBModel.project, [key], start, end, rollup) == \
+                    self.db.get_range(TSDBModel.project, [key], start, end, rollup)
+                assert db.get_sums(TSDBModel.project, [key], start, end, rollup) == \
+                    self.db.get_sums(TSDBModel.project, [key], start, end, rollup)
+
+    def test_compact_counters(self):
+        db = self.make_compacted_db()
+
+        now = datetime.utcnow().replace(tzinfo=pytz.UTC)
+        dts = [now - timedelta(seconds=150) + timedelta(seconds=30 * i) for i in range(4)]
+
+        for backend in (self.db, db):
+            backend.incr(TSDBModel.project, 1, dts[0])
+            backend.incr(TSDBModel.project, 1, dts[1], count=3)
+            backend.incr_multi([(TSDBModel.project, 1), (TSDBModel.project, 2)], dts[2])
+            backend.incr(TSDBModel.project, 1, dts[3], count=2)
+
+        # coarser rollups are only written by compaction
+        hash_key, hash_field = db.make_counter_key(TSDBModel.project, ONE_HOUR, dts[0], 1)
+        assert db.cluster.get_local_client_for_key(hash_key).hget(hash_key, hash_field) is None
+
+        def check():
+            self.check_compacted_db(db, (1, 2), dts[0] - timedelta(hours=1), now)
+
+        check()
+
+        # buckets are closed by the first run, and folded by the next one
+        db.compact(dts[3])
+        check()
+        assert db.cluster.get_local_client_for_key(hash_key).hget(hash_key, hash_field) is None
+        db.compact(dts[3])
+        check()
+        assert int(db.cluster.get_local_client_for_key(hash_key).hget(hash_key, hash_field)) > 0
+
+        later = now + timedelta(seconds=db.compaction_delay + 10)
+        db.compact(later)
+        db.compact(later)
+        check()
+        assert db.get_uncompacted_buckets(ONE_HOUR, [now]) == []
+
+    def test_compact_counters_late_writes(self):
+        db = self.make_compacted_db()
+
+        now = datetime.utcnow().replace(tzinfo=pytz.UTC)
+        first = now - timedelta(seconds=250)
+        for backend in (self.db, db):
+            backend.incr(TSDBModel.project, 1, first)
+
+        db.compact(now - timedelta(seconds=120))
+        assert db.is_closed(first)
+
+        # closed but not yet folded
+        for backend in (self.db, db):
+            backend.incr(TSDBModel.project, 1, first, count=2)
+            backend.incr(TSDBModel.project, 1, first + timedelta(seconds=10), count=3)
+        self.check_compacted_db(db, (1, ), first - timedelta(hours=1), now)
+
+        db.compact(now)
+        watermark = int(db.cluster.get_routing_client().get(db.make_compaction_key('watermark')))
+        assert watermark >= db.normalize_to_rollup(first, db.counter_rollup)
+        self.check_compacted_db(db, (1, ), first - timedelta(hours=1), now)
+
+        # older than the watermark
+        for backend in (self.db, db):
+            backend.incr(TSDBModel.project, 1, first, count=4)
+            backend.incr(TSDBModel.project, 1, first - timedelta(minutes=1), count=5)
+        self.check_compacted_db(db, (1, ), first - timedelta(hours=1), now)
+
+        db.compact(now + timedelta(seconds=10))
+        db.compact(now + timedelta(seconds=10))
+        self.check_compacted_db(db, (1, ), first - timedelta(hours=1), now)
+
+    def test_compact_bucket_idempotent(self):
+        db = self.make_compacted_db()
+
+        now = datetime.utcnow().replace(tzinfo=pytz.UTC)
+        timestamp = now - timedelta(seconds=150)
+        for backend in (self.db, db):
+            backend.incr_multi([(TSDBModel.project, 1), (TSDBModel.project, 2)], timestamp)
+
+        # a run that fails before advancing the watermark folds the bucket again
+        bucket = db.normalize_to_rollup(timestamp, db.counter_rollup)
+        db.compact_bucket(bucket)
+        db.compact_bucket(bucket)
+        db.cluster.get_routing_client().set(db.make_compaction_key('watermark'), bucket)
+        self.check_compacted_db(db, (1, 2), timestamp - timedelta(hours=1), now)
+
     def test_count_distinct(self):
         now = datetime.utcnow().replace(tzinfo=pytz.UTC) - timedelta(hours=4)
         dts = [now + timedelta(hours=i) for i in range(4)]
@@ -22,6 +22,7 @@ from sentry.utils.data_filters import (
     is_valid_ip,
     is_valid_release,
     is_valid_error_message,
+    get_enabled_filters,
     FilterTypes,
 )
 
@@ -261,6 +262,24 @@ class IsValidIPTestCase(TestCase):
 
     def test_garbage_input(self):
         assert self.is_valid_ip('127.0.0.1', ['lol/bar'])
+        assert self.is_valid_ip('lol', ['127.0.0.0/8'])
+
+    def test_overlapping_ranges(self):
+        blacklist = ['10.0.0.0/8', '10.1.0.0/16', '10.255.255.0/24', '11.0.0.0/8']
+        assert not self.is_valid_ip('10.1.2.3', blacklist)
+        assert not self.is_valid_ip('11.255.255.255', blacklist)
+        assert self.is_valid_ip('9.255.255.255', blacklist)
+        assert self.is_valid_ip('12.0.0.0', blacklist)
+
+    def test_ipv6(self):
+        blacklist = ['127.0.0.0/8', '2001:db8::/32']
+        assert not self.is_valid_ip('2001:db8::1', blacklist)
+        assert self.is_valid_ip('2001:db9::1', blacklist)
+        assert self.is_valid_ip('::ffff:7f00:1', blacklist)
+
+    def test_option_change(self):
+        assert not self.is_valid_ip('127.0.0.1', ['127.0.0.0/8'])
+        assert self.is_valid_ip('127.0.0.1', ['10.0.0.0/8'])
 
 
 class IsValidReleaseTestCase(TestCase):
@@ -313,6 +332,17 @@ class IsValidErrorMessageTestCase(TestCase):
         assert self.is_valid_error_message({}, ['ImportError*'])
 
 
+class GetEnabledFiltersTestCase(TestCase):
+    def test_rebuilt_on_option_change(self):
+        self.project.update_option('filters:localhost', '0')
+        assert 'localhost' not in [f.id for f in get_enabled_filters(self.project)]
+
+        self.project.update_option('filters:localhost', '1')
+        enabled = get_enabled_filters(self.project)
+        assert 'localhost' in [f.id for f in enabled]
+        assert get_enabled_filters(self.project) is enabled
+
+
 class OriginFromRequestTestCase(TestCase):
     def test_nothing(self):
         request = HttpRequest()
@@ -4,7 +4,7 @@ from __future__ import absolute_import
 
 from sentry.constants import FILTER_MASK
 from sentry.testutils import TestCase
-from sentry.utils.data_scrubber import SensitiveDataFilter
+from sentry.utils.data_scrubber import SensitiveDataFilter, get_field_matcher
 
 VARS = {
     'foo': 'bar',
@@ -442,3 +442,64 @@ class SensitiveDataFilterTest(TestCase):
         assert 'sentry.interfaces.Csp' in data
         csp = data['sentry.interfaces.Csp']
         assert csp['blocked_uri'] == 'https://example.com/?foo=[Filtered]&bar=baz'
+
+    def test_no_fields(self):
+        data = {
+            'extra': {
+                'password': 'xxx',
+                'foo': '4571234567890111',
+            },
+        }
+
+        proc = SensitiveDataFilter(include_defaults=False)
+        proc.apply(data)
+        assert data['extra'] == {
+            'password': 'xxx',
+            'foo': FILTER_MASK,
+        }
+
+    def test_many_explicit_fields(self):
+        fields = ['field%d' % i for i in range(100)]
+        data = {
+            'extra': {
+                'field1': 'xxx',
+                'my_field99_value': 'xxx',
+                'field': 'xxx',
+                'foo': 'contains FIELD42 in value',
+                'nested': [{'field50': 'xxx'}, ['bar', 'field7']],
+            },
+        }
+
+        proc = SensitiveDataFilter(fields=fields, include_defaults=False)
+        proc.apply(data)
+        assert data['extra'] == {
+            'field1': FILTER_MASK,
+            'my_field99_value': FILTER_MASK,
+            'field': 'xxx',
+            'foo': FILTER_MASK,
+            'nested': [{'field50': FILTER_MASK}, ['bar', FILTER_MASK]],
+        }
+
+    def test_recursive_value(self):
+        value = {'foo': 'bar'}
+        value['self'] = value
+        data = {'extra': {'value': value}}
+
+        proc = SensitiveDataFilter()
+        proc.apply(data)
+        assert data['extra'] == {'value': {'foo': 'bar', 'self': '<...>'}}
+
+
+class GetFieldMatcherTest(TestCase):
+    def test_cached_by_fields(self):
+        matcher = get_field_matcher(['foo', 'bar'])
+        assert get_field_matcher(('bar', 'foo')) is matcher
+        assert get_field_matcher(['foo']) is not matcher
+
+    def test_escapes_fields(self):
+        matcher = get_field_matcher(['card[number]'])
+        assert matcher.search('card[number]')
+        assert not matcher.search('cardn')
+
+    def test_empty(self):
+        assert get_field_matcher([]) is None
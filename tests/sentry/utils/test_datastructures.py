@@ -2,7 +2,7 @@ from __future__ import absolute_import
 
 import pytest
 
-from sentry.utils.datastructures import BidirectionalMapping
+from sentry.utils.datastructures import BidirectionalMapping, LRUCache
 
 
 def test_bidirectional_mapping():
@@ -38,3 +38,63 @@ def test_bidirectional_mapping():
     del value['c']
 
     assert len(value) == len(value.inverse()) == 2
+
+
+def test_lru_cache():
+    cache = LRUCache(2)
+
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+
+    # 'b' is the least recently used entry at this point
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert len(cache) == 2
+
+    assert cache.delete('a') is True
+    assert cache.delete('a') is False
+    assert 'a' not in cache
+    assert 'c' in cache
+
+
+def test_lru_cache_ttl():
+    now = [100]
+    cache = LRUCache(10, ttl=5, clock=lambda: now[0])
+
+    cache.set('a', 1)
+    now[0] = 104
+    assert cache.get('a') == 1
+    now[0] = 105
+    assert cache.get('a') is None
+    assert cache.get('a', 'missing') == 'missing'
+
+
+def test_lru_cache_disabled():
+    cache = LRUCache(0)
+    cache.set('a', 1)
+    assert cache.get('a') is None
+
+
+def test_lru_cache_weigher():
+    cache = LRUCache(10, weigher=len)
+
+    cache.set('a', 'x' * 4)
+    cache.set('b', 'x' * 4)
+    assert cache.weight == 8
+
+    # evicts 'a' to make room
+    cache.set('c', 'x' * 4)
+    assert 'a' not in cache
+    assert 'b' in cache
+    assert cache.weight == 8
+
+    # too heavy to store at all
+    cache.set('d', 'x' * 11)
+    assert 'd' not in cache
+    assert cache.weight == 8
+
+    cache.clear()
+    assert cache.weight == 0